@@ -4,6 +4,7 @@ from . import open_telemetry_utils
 from . import persistence
 from . import service_clients
 from . import utils
+from . import worker_runtime
 
 __all__ = [
     "open_telemetry_utils",
@@ -12,4 +13,5 @@ __all__ = [
     "service_clients",
     "utils",
     "persistence",
+    "worker_runtime",
 ]
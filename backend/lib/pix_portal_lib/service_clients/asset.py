@@ -1,5 +1,7 @@
 import asyncio
+import hashlib
 import logging
+import os
 import uuid
 from collections import namedtuple
 from dataclasses import dataclass
@@ -13,13 +15,20 @@ import httpx
 
 from pix_portal_lib.utils import get_env
 
-from .file import File, FileServiceClient, FileType
+from .asset_cache import asset_cache
+from .file import ChecksumMismatch, File, FileServiceClient, FileType
 from .self_authenticating_client import SelfAuthenticatingClient
 
 logger = logging.getLogger()
 
 
 asset_service_url = get_env("ASSET_SERVICE_URL")
+# Maximum number of files downloaded at the same time by AssetServiceClient.download_assets
+asset_download_concurrency = int(os.getenv("ASSET_DOWNLOAD_CONCURRENCY", 8))
+# Number of times a download is resumed after the connection has been dropped
+asset_download_max_resumes = int(os.getenv("ASSET_DOWNLOAD_MAX_RESUMES", 3))
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
 
 
 class AssetType(str, Enum):
@@ -50,7 +59,8 @@ class Asset:
     users_ids: list[str]
     processing_requests_ids: list[str]
     url: Optional[str] = None
-    files: Optional[list[File_]] = None
+    # downloaded files or, if fetched with get_assets_by_ids, metadata of the files
+    files: Optional[Union[list[File_], list[File]]] = None
 
     def is_deleted(self) -> bool:
         return self.deletion_time is not None
@@ -65,27 +75,95 @@ class AssetServiceClient(SelfAuthenticatingClient):
     def __init__(self):
         super().__init__()
         self._base_url = asset_service_url
-        self._http_client = httpx.AsyncClient()
         self._file_client = FileServiceClient()
+        self._cache = asset_cache
 
     async def download_asset(
-        self, asset_id: str, output_dir: Path, is_internal: bool, token: Optional[str] = None
+        self,
+        asset_id: str,
+        output_dir: Path,
+        is_internal: bool,
+        token: Optional[str] = None,
+        verify_checksum: bool = True,
     ) -> Asset:
         """
         Download asset files to disk and returns the asset with files field filled with File objects.
         """
-        asset = await self.get_asset(asset_id, token=token)
+        assets = await self.download_assets(
+            [asset_id], output_dir, is_internal, token=token, verify_checksum=verify_checksum
+        )
+        return assets[0]
+
+    async def download_assets(
+        self,
+        assets_ids: list[str],
+        output_dir: Path,
+        is_internal: bool,
+        token: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        verify_checksum: bool = True,
+    ) -> list[Asset]:
+        """
+        Downloads files of all assets to disk concurrently and returns the assets in the same order
+        with files field filled with File objects.
 
-        files: list[File_] = []
-        for file_id in asset.files_ids:
-            file = await self._file_client.get_file(file_id, token=token)
-            file_path = await self._compose_file_path(file, output_dir)
-            await self._download_file_to_disk(asset_id, file_id, file_path, is_internal, token)
-            files.append(File_(name=file.name, type=file.type, path=file_path))
+        At most max_concurrency files, ASSET_DOWNLOAD_CONCURRENCY by default, are downloaded at the same time.
+        If verify_checksum is set, the content of each file is checked against its content hash.
+        Files found in the local asset cache, if enabled, aren't downloaded, see the asset_cache module.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or asset_download_concurrency)
+
+        assets = await asyncio.gather(*[self.get_asset(asset_id, token=token) for asset_id in assets_ids])
+        downloads = [
+            self._download_asset_file(asset.id, file_id, output_dir, is_internal, semaphore, token, verify_checksum)
+            for asset in assets
+            for file_id in asset.files_ids
+        ]
+        # all downloads are awaited before raising, so no download is left running in the background
+        results = await asyncio.gather(*downloads, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        files = iter(results)
+        for asset in assets:
+            asset.files = [next(files) for _ in asset.files_ids]
 
-        asset.files = files
+        return assets
 
-        return asset
+    async def _download_asset_file(
+        self,
+        asset_id: str,
+        file_id: str,
+        output_dir: Path,
+        is_internal: bool,
+        semaphore: asyncio.Semaphore,
+        token: Optional[str],
+        verify_checksum: bool,
+    ) -> File_:
+        async with semaphore:
+            if self._cache is None:
+                file, file_url = await asyncio.gather(
+                    self._file_client.get_file(file_id, token=token),
+                    self.get_file_location(asset_id=asset_id, file_id=file_id, is_internal=is_internal, token=token),
+                )
+                file_path = await self._compose_file_path(file, output_dir)
+            else:
+                file = await self._file_client.get_file(file_id, token=token)
+                file_path = await self._compose_file_path(file, output_dir)
+                if await asyncio.to_thread(self._cache.get, file.content_hash, file_path):
+                    logger.info(f"Asset file taken from the cache: file_id={file_id}, path={file_path}")
+                    return File_(name=file.name, type=file.type, path=file_path)
+                file_url = await self.get_file_location(
+                    asset_id=asset_id, file_id=file_id, is_internal=is_internal, token=token
+                )
+
+            content_hash = file.content_hash if verify_checksum else None
+            await self._download_file_to_disk(file_url, file_path, token, content_hash=content_hash)
+            # only files checked against their hash are cached by it
+            if self._cache is not None and content_hash is not None:
+                await asyncio.to_thread(self._cache.put, content_hash, file_path)
+            return File_(name=file.name, type=file.type, path=file_path)
 
     @staticmethod
     async def _compose_file_path(file: File, output_dir: Path):
@@ -104,27 +182,95 @@ class AssetServiceClient(SelfAuthenticatingClient):
         return local_disk_path
 
     async def _download_file_to_disk(
-        self, asset_id: str, file_id: str, file_path: Path, is_internal: bool, token: Optional[str] = None
+        self, file_url: str, file_path: Path, token: Optional[str] = None, content_hash: Optional[str] = None
     ):
-        file_url = await self.get_file_location(
-            asset_id=asset_id, file_id=file_id, is_internal=is_internal, token=token
-        )
-        response = await self._http_client.get(file_url, headers=await self.request_headers(token))
-        response.raise_for_status()
-        with open(file_path, "wb") as f:
-            f.write(response.content)
+        """
+        Streams the file to a partial file next to file_path, which is renamed to file_path once the download
+        is complete and matches content_hash, so only complete files ever appear at file_path.
+        After a dropped connection, the download is resumed from the last received byte.
+        """
+        partial_path = file_path.with_name(f"{file_path.name}.part")
+        sha256 = hashlib.sha256()
+        size = 0
+        resumes = 0
+        try:
+            with partial_path.open("wb") as f:
+                while True:
+                    headers = None
+                    if size > 0:
+                        # ranges refer to the uncompressed content, the rest is requested without compression
+                        headers = {"Range": f"bytes={size}-", "Accept-Encoding": "identity"}
+                        if content_hash is not None:
+                            # the file service tags the content with its hash, the rest is sent only if it matches
+                            headers["If-Range"] = f'"{content_hash}"'
+
+                    try:
+                        async with self._client.stream(
+                            "GET", file_url, headers=headers, auth=self.auth(token)
+                        ) as response:
+                            response.raise_for_status()
+                            if size > 0 and response.status_code != 206:
+                                # the server doesn't support ranges and sends the whole file again
+                                f.seek(0)
+                                f.truncate()
+                                sha256 = hashlib.sha256()
+                                size = 0
+                            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                                f.write(chunk)
+                                sha256.update(chunk)
+                                size += len(chunk)
+                        break
+                    except httpx.TransportError as e:
+                        resumes += 1
+                        if resumes > asset_download_max_resumes:
+                            raise
+                        logger.warning(f"Download interrupted, resuming: url={file_url}, size={size}, error={e!r}")
+
+            if content_hash is not None and sha256.hexdigest() != content_hash:
+                raise ChecksumMismatch(
+                    f"Downloaded file doesn't match its hash: url={file_url}, "
+                    f"expected={content_hash}, actual={sha256.hexdigest()}"
+                )
+            partial_path.replace(file_path)
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
 
     async def get_asset(self, asset_id: Union[str, UUID], token: Optional[str] = None) -> Asset:
         url = urljoin(self._base_url, f"{asset_id}")
-        response = await self._http_client.get(url, headers=await self.request_headers(token))
+        response = await self._client.get(url, auth=self.auth(token))
         response.raise_for_status()
         return Asset(**response.json())
 
-    async def get_assets_by_ids(self, assets_ids: list[UUID], token: str) -> list[Asset]:
-        return [await self.get_asset(asset_id, token) for asset_id in assets_ids]
+    async def get_assets_by_ids(
+        self, assets_ids: list[UUID], token: Optional[str] = None, lazy: bool = True
+    ) -> list[Asset]:
+        """
+        Fetches many assets in one request. Unless lazy is set, the files field is filled with the metadata
+        of the assets' files as File objects.
+        """
+        if len(assets_ids) == 0:
+            return []
+        url = urljoin(self._base_url, "batch")
+        response = await self._client.post(
+            url,
+            auth=self.auth(token),
+            params={"lazy": lazy},
+            json={"assets_ids": self._uuid_list_to_str_list(assets_ids)},
+            extensions={"idempotent": True},
+        )
+        response.raise_for_status()
+
+        assets = []
+        for asset_data in response.json():
+            asset = Asset(**asset_data)
+            if asset.files is not None:
+                asset.files = [File(**file) for file in asset.files]
+            assets.append(asset)
+        return assets
 
     async def get_assets_by_project_id(self, project_id: UUID, token: str) -> list[Asset]:
-        response = await self._http_client.get(
+        response = await self._client.get(
             self._base_url,
             params={"project_id": str(project_id)},
             headers={"Authorization": f"Bearer {token}"},
@@ -134,7 +280,7 @@ class AssetServiceClient(SelfAuthenticatingClient):
     async def does_asset_exist(self, asset_id: UUID, token: str) -> bool:
         url = urljoin(self._base_url, str(asset_id))
 
-        response = await self._http_client.get(url, headers=await self.request_headers(token))
+        response = await self._client.get(url, auth=self.auth(token))
 
         if response.status_code != 200:
             return False
@@ -154,8 +300,8 @@ class AssetServiceClient(SelfAuthenticatingClient):
         token: Optional[str] = None,
     ) -> str:
         url = urljoin(self._base_url, f"{asset_id}/files/{file_id}/location")
-        response = await self._http_client.get(
-            url, headers=await self.request_headers(token), params={"is_internal": is_internal}
+        response = await self._client.get(
+            url, auth=self.auth(token), params={"is_internal": is_internal}
         )
         response.raise_for_status()
         return AssetLocationResponse(**response.json()).location
@@ -180,9 +326,9 @@ class AssetServiceClient(SelfAuthenticatingClient):
             ]
         )
 
-        response = await self._http_client.post(
+        response = await self._client.post(
             self._base_url,
-            headers=await self.request_headers(token),
+            auth=self.auth(token),
             json={
                 "name": asset_name,
                 "type": asset_type,
@@ -221,10 +367,11 @@ class AssetServiceClient(SelfAuthenticatingClient):
             ]
         )
 
-        response = await self._http_client.patch(
+        response = await self._client.patch(
             urljoin(self._base_url, asset_id),
-            headers=await self.request_headers(token),
+            auth=self.auth(token),
             json={"files_ids": self._uuid_list_to_str_list(files_ids)},
+            extensions={"idempotent": True},
         )
         response.raise_for_status()
         return True
@@ -280,13 +427,28 @@ class AssetServiceClient(SelfAuthenticatingClient):
 
     async def delete_asset(self, asset_id: UUID, token: str) -> bool:
         url = urljoin(self._base_url, str(asset_id))
-        response = await self._http_client.delete(url, headers={"Authorization": f"Bearer {token}"})
+        response = await self._client.delete(url, headers={"Authorization": f"Bearer {token}"})
+        if response.status_code == 204:
+            return True
+        raise Exception(response.text)
+
+    async def delete_assets(self, assets_ids: list[UUID], token: Optional[str] = None) -> bool:
+        """
+        Deletes many assets and their files in one request.
+        """
+        if len(assets_ids) == 0:
+            return True
+        url = urljoin(self._base_url, "batch/delete")
+        response = await self._client.post(
+            url,
+            auth=self.auth(token),
+            json={"assets_ids": self._uuid_list_to_str_list(assets_ids)},
+            extensions={"idempotent": True},
+        )
         if response.status_code == 204:
             return True
         raise Exception(response.text)
 
     async def delete_assets_by_project_id(self, project_id: UUID, token: str) -> bool:
         assets = await self.get_assets_by_project_id(project_id, token)
-        for asset in assets:
-            await self.delete_asset(uuid.UUID(asset.id), token)
-        return True
+        return await self.delete_assets([uuid.UUID(asset.id) for asset in assets], token)
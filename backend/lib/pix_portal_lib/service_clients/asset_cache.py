@@ -0,0 +1,198 @@
+"""
+Local cache of downloaded asset files, shared by the jobs of a worker.
+
+Files are stored by their content hash, so a file downloaded by one job is handed out to the next jobs using the same
+content without downloading it again. Files are handed out to the job directories as hard links, or reflinks or copies
+if the job directory is on another file system. Jobs must replace the handed out files instead of modifying them in
+place, otherwise the cached content changes too. Cached files are read-only to catch that.
+
+A cached file is in use while a job still has a hard link to it, i.e., until the job deletes its files. Files in use
+aren't evicted. Other files are evicted, least recently used first, once the cache grows over its maximum size.
+
+The cache is enabled by setting ASSET_CACHE_DIR. ASSET_CACHE_MAX_SIZE sets its size in bytes, 10 GiB by default.
+The cache directory is created and scanned on first use, not when the module is imported.
+
+The methods of AssetCache do blocking file system calls and copy files, async callers run them in a thread, e.g.,
+with asyncio.to_thread. They are safe to call from several threads at the same time.
+"""
+import fcntl
+import logging
+import os
+import shutil
+import stat
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger()
+
+# ioctl cloning a file on file systems supporting reflinks, e.g., Btrfs and XFS
+FICLONE = 0x40049409
+
+
+class AssetCache:
+    def __init__(self, cache_dir: Path, max_size: int):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        # file size and last use of each cached file
+        self._entries: dict[str, tuple[int, float]] = {}
+        # files being handed out at the moment, they're not hard-linked to the job directories yet
+        self._handouts: Counter[str] = Counter()
+        # guards the fields above, files are linked and copied without holding it
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def get(self, content_hash: str, path: Path) -> bool:
+        """
+        Hands out the cached file to the path. Returns False if the file isn't cached.
+        """
+        with self._lock:
+            self._load()
+            if content_hash not in self._entries:
+                return False
+            self._handouts[content_hash] += 1
+
+        try:
+            _link(self._entry_path(content_hash), path)
+        except FileNotFoundError:
+            # removed by someone else
+            with self._lock:
+                self._entries.pop(content_hash, None)
+            return False
+        finally:
+            with self._lock:
+                self._handouts[content_hash] -= 1
+                if self._handouts[content_hash] == 0:
+                    del self._handouts[content_hash]
+
+        with self._lock:
+            self._touch(content_hash)
+        return True
+
+    def put(self, content_hash: str, path: Path):
+        """
+        Adds the downloaded file to the cache. The content of the file must match the hash.
+        """
+        entry_path = self._entry_path(content_hash)
+        with self._lock:
+            self._load()
+            is_cached = content_hash in self._entries
+
+        if not is_cached:
+            entry_path.parent.mkdir(exist_ok=True)
+            tmp_path = entry_path.with_name(f"{content_hash}.{uuid.uuid4().hex}.tmp")
+            try:
+                _link(path, tmp_path)
+                tmp_path.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+                tmp_path.replace(entry_path)
+            except OSError as e:
+                logger.warning(f"Adding a file to the asset cache failed: path={path}, error={e}")
+                tmp_path.unlink(missing_ok=True)
+                return
+            entry_size = entry_path.stat().st_size
+            with self._lock:
+                self._entries[content_hash] = (entry_size, time.time())
+        else:
+            with self._lock:
+                self._touch(content_hash)
+
+        with self._lock:
+            self._evict()
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            self._load()
+            return self._size()
+
+    def _size(self) -> int:
+        return sum(size for size, _ in self._entries.values())
+
+    def _evict(self):
+        size = self._size()
+        if size <= self.max_size:
+            return
+
+        for content_hash, (entry_size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if size <= self.max_size:
+                break
+            if self._is_in_use(content_hash):
+                continue
+            self._entry_path(content_hash).unlink(missing_ok=True)
+            del self._entries[content_hash]
+            size -= entry_size
+            logger.info(f"Evicted a file from the asset cache: content_hash={content_hash}, size={entry_size}")
+
+    def _is_in_use(self, content_hash: str) -> bool:
+        if content_hash in self._handouts:
+            return True
+        try:
+            return self._entry_path(content_hash).stat().st_nlink > 1
+        except FileNotFoundError:
+            return False
+
+    def _touch(self, content_hash: str):
+        if content_hash not in self._entries:
+            # evicted in the meantime
+            return
+        now = time.time()
+        size, _ = self._entries[content_hash]
+        self._entries[content_hash] = (size, now)
+        # the modification time keeps the order of use when the worker restarts
+        try:
+            os.utime(self._entry_path(content_hash), (now, now))
+        except OSError:
+            pass
+
+    def _load(self):
+        if self._loaded:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._scan()
+        self._loaded = True
+
+    def _scan(self):
+        for entry_path in self.cache_dir.glob("*/*"):
+            if entry_path.name.endswith(".tmp"):
+                # left by an interrupted put
+                entry_path.unlink(missing_ok=True)
+                continue
+            stat_result = entry_path.stat()
+            self._entries[entry_path.name] = (stat_result.st_size, stat_result.st_mtime)
+
+    def _entry_path(self, content_hash: str) -> Path:
+        return self.cache_dir / content_hash[:2] / content_hash
+
+
+def _link(src: Path, dst: Path):
+    """
+    Makes dst have the content of src, sharing the data on disk if possible.
+    """
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        if not src.exists():
+            raise FileNotFoundError(src)
+
+    try:
+        with src.open("rb") as src_file, dst.open("wb") as dst_file:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _create_asset_cache() -> Optional[AssetCache]:
+    cache_dir = os.getenv("ASSET_CACHE_DIR")
+    if not cache_dir:
+        return None
+    max_size = int(os.getenv("ASSET_CACHE_MAX_SIZE", 10 * 1024**3))
+    return AssetCache(Path(cache_dir), max_size)
+
+
+# Cache shared by all asset clients of the process, None if disabled
+asset_cache = _create_asset_cache()
@@ -1,6 +1,8 @@
 """
 Commonly used authentication service for user authentication and authorization.
 """
+import base64
+import json
 import logging
 from pathlib import Path
 from typing import Optional
@@ -11,6 +13,8 @@ from pydantic import BaseModel
 
 from pix_portal_lib.utils import get_env
 
+from .transport import get_http_client
+
 logger = logging.getLogger()
 
 auth_service_url = get_env("AUTH_SERVICE_URL")
@@ -27,12 +31,15 @@ class TokenVerificationResponse(BaseModel):
 
 class AuthServiceClient:
     def __init__(self):
-        self._client = httpx.AsyncClient()
         self._base_url = auth_service_url
 
         if self._base_url is None:
             raise ValueError("AUTH_SERVICE_URL must be set in the environment")
 
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        return get_http_client()
+
     async def verify_token(self, token: str, is_superuser: bool = False) -> tuple[bool, Optional[dict]]:
         """
         Verifies a JWT token and returns a tuple of (status, user).
@@ -44,6 +51,7 @@ class AuthServiceClient:
             headers={"Authorization": f"Bearer {token}"},
             params=params,
             follow_redirects=True,
+            extensions={"idempotent": True},
         )
 
         if response.status_code != 200:
@@ -67,6 +75,7 @@ class AuthServiceClient:
                 url,
                 headers=headers,
                 data=request_payload,
+                extensions={"idempotent": True},
             )
             response.raise_for_status()
 
@@ -76,3 +85,16 @@ class AuthServiceClient:
         except Exception as e:
             logger.error(f"SYSTEM user login failed, error={e}, url={url}, request_payload={request_payload}")
             raise e
+
+
+def get_token_expiration_time(token: str) -> Optional[float]:
+    """
+    Returns the expiration time of a JWT token as a Unix timestamp, or None if the token has none.
+    The signature isn't verified.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
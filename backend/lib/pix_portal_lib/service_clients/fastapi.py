@@ -1,9 +1,14 @@
-from typing import AsyncGenerator
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncGenerator, Optional
 
 from fastapi import Depends, Header, HTTPException, Request
 
 from .asset import AssetServiceClient
-from .auth import AuthServiceClient
+from .auth import AuthServiceClient, get_token_expiration_time
 from .project import ProjectServiceClient
 from .user import UserServiceClient
 
@@ -23,45 +28,121 @@ async def get_user_service_client() -> AsyncGenerator[UserServiceClient, None]:
 # Auth utils
 
 
+class VerifiedTokenCache:
+    """
+    Users of the tokens verified by the auth service, so a token isn't verified again on each request.
+
+    A token is kept for at most ttl seconds and never after it expires, so a revoked or deactivated user is
+    accepted for ttl seconds at most. Rejected tokens aren't cached.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, bool], tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str, is_superuser: bool) -> Optional[dict]:
+        key = self._key(token, is_superuser)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def set(self, token: str, is_superuser: bool, user: dict):
+        expires_at = time.time() + self.ttl
+        token_expires_at = get_token_expiration_time(token)
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+
+        key = self._key(token, is_superuser)
+        with self._lock:
+            self._entries[key] = (expires_at, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _key(token: str, is_superuser: bool) -> tuple[str, bool]:
+        # tokens aren't kept in memory as they are
+        return hashlib.sha256(token.encode("utf-8")).hexdigest(), is_superuser
+
+
+verified_tokens = VerifiedTokenCache(
+    max_entries=int(os.getenv("VERIFIED_TOKEN_CACHE_MAX_ENTRIES", 10000)),
+    ttl=float(os.getenv("VERIFIED_TOKEN_CACHE_TTL", 60)),
+)
+
+
 async def get_auth_service_client() -> AsyncGenerator[AuthServiceClient, None]:
     yield AuthServiceClient()
 
 
+async def verify_token(
+    auth_service: AuthServiceClient, token: str, is_superuser: bool = False
+) -> tuple[bool, Optional[dict]]:
+    """
+    Verifies a JWT token using the cache of verified tokens first, and returns a tuple of (status, user).
+    """
+    user = verified_tokens.get(token, is_superuser)
+    if user is not None:
+        return True, user
+
+    ok, user = await auth_service.verify_token(token, is_superuser=is_superuser)
+    if ok and user is not None:
+        verified_tokens.set(token, is_superuser, user)
+    return ok, user
+
+
 async def get_current_user(
     request: Request,
     auth_service: AuthServiceClient = Depends(get_auth_service_client),
     authorization: str = Header(...),
 ) -> dict:
-    # check if user is already in app state
-    if hasattr(request.app.state, "user") and request.app.state.user is not None:
-        return request.app.state.user
+    # check if user is already in request state
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
 
-    # otherwise, make a request to Auth Service to verify the token
+    # otherwise, verify the token
     token = authorization.split(" ")[1]
-    ok, user = await auth_service.verify_token(token)
+    ok, user = await verify_token(auth_service, token)
     if not ok:
         raise HTTPException(status_code=401, detail=f"Invalid authentication token: {token}")
+    request.state.user = user
     return user
 
 
-async def add_user_to_app_state_if_present(
+async def add_user_to_request_state_if_present(
     request: Request,
     auth_service: AuthServiceClient = Depends(get_auth_service_client),
     authorization: str = Header(...),
 ):
     token = authorization.split(" ")[1]
-    ok, user = await auth_service.verify_token(token)
+    ok, user = await verify_token(auth_service, token)
     if not ok:
         user = None
-    request.app.state.user = user
+    request.state.user = user
+
+
+# NOTE: kept for compatibility, the user used to be stored in the app state shared by all requests
+add_user_to_app_state_if_present = add_user_to_request_state_if_present
 
 
 async def get_current_superuser(
+    request: Request,
     auth_service: AuthServiceClient = Depends(get_auth_service_client),
     authorization: str = Header(...),
 ) -> dict:
     token = authorization.split(" ")[1]
-    ok, user = await auth_service.verify_token(token, is_superuser=True)
+    ok, user = await verify_token(auth_service, token, is_superuser=True)
     if not ok:
         raise HTTPException(status_code=401, detail=f"Invalid authentication token: {token}")
+    request.state.user = user
     return user
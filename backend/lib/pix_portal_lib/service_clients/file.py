@@ -1,12 +1,15 @@
+import asyncio
+import hashlib
+import os
+import zlib
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Optional, Union
+from typing import Any, AsyncIterator, BinaryIO, Optional, Union
 from urllib.parse import urljoin
 from uuid import UUID
 
-import httpx
 from pix_portal_lib.utils import get_env
 
 from .self_authenticating_client import SelfAuthenticatingClient
@@ -14,6 +17,14 @@ from .self_authenticating_client import SelfAuthenticatingClient
 file_service_url = get_env("FILE_SERVICE_URL")
 blobs_base_public_url = get_env("BLOBS_BASE_PUBLIC_URL")
 blobs_base_internal_url = get_env("BLOBS_BASE_INTERNAL_URL")
+# Compress uploads with gzip if set to "true", already compressed files are sent as they are.
+# The file service decompresses them before storing, so the stored content and its hash don't change.
+file_upload_gzip = os.getenv("FILE_UPLOAD_GZIP", "false").lower() == "true"
+# Ask the file service whether it already has the content before uploading it if set to "true".
+# The file is read twice then, once for the hash and once for the upload, so it pays off for large shared files.
+file_upload_hash_first = os.getenv("FILE_UPLOAD_HASH_FIRST", "false").lower() == "true"
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
 
 
 class FileType(str, Enum):
@@ -31,6 +42,10 @@ class FileType(str, Enum):
     OPTIMIZATION_REPORT_OPTIMOS_JSON = "optimization_report_optimos_json"
 
 
+class ChecksumMismatch(Exception):
+    pass
+
+
 @dataclass
 class File:
     id: UUID
@@ -48,11 +63,10 @@ class File:
 
 # some of the services that use this class could have access to an expired token,
 # in that case, the service has to be able to authenticate itself, SelfAuthenticatingClient provides
-# the self.token property that calls the auth service to get a new token if the current one is None
+# the system token that is refreshed before it expires or when it's rejected
 class FileServiceClient(SelfAuthenticatingClient):
     def __init__(self):
         super().__init__()
-        self._client = httpx.AsyncClient()
         self._base_url = file_service_url
         self._blobs_base_public_url = blobs_base_public_url
         self._blobs_base_internal_url = blobs_base_internal_url
@@ -62,7 +76,7 @@ class FileServiceClient(SelfAuthenticatingClient):
         Fetches a file using the file service.
         """
         url = self._file_resource_url(file_id)
-        response = await self._client.get(url, headers=await self.request_headers(token))
+        response = await self._client.get(url, auth=self.auth(token))
         response.raise_for_status()
 
         return File(**response.json())
@@ -73,7 +87,7 @@ class FileServiceClient(SelfAuthenticatingClient):
         Returns True if the file was deleted successfully.
         """
         url = self._file_resource_url(file_id)
-        response = await self._client.delete(url, headers=await self.request_headers(token))
+        response = await self._client.delete(url, auth=self.auth(token))
 
         if response.status_code == 204:
             return True
@@ -86,31 +100,102 @@ class FileServiceClient(SelfAuthenticatingClient):
         return urljoin(base, relative_url)
 
     async def upload_file(
-        self, name: str, path: Path, type: FileType, users_ids: list[UUID], token: Optional[str] = None
+        self,
+        name: str,
+        path: Path,
+        type: FileType,
+        users_ids: list[UUID],
+        token: Optional[str] = None,
+        gzip: Optional[bool] = None,
     ) -> str:
         """
         Uploads a file to the file service and returns the file ID.
         If token is not provided, the service will authenticate itself as a SYSTEM user.
+
+        The file is streamed from disk in chunks, compressed with gzip on the fly if gzip is set,
+        FILE_UPLOAD_GZIP by default. The SHA-256 of the content is computed while streaming and checked against
+        the hash of the file stored by the service.
+
+        If FILE_UPLOAD_HASH_FIRST is set, the hash is sent first and the content is uploaded
+        only if the service doesn't have it yet.
         """
-        content = path.read_bytes()
-        t = token or await self.token
+        compress = (file_upload_gzip if gzip is None else gzip) and path.suffix != ".gz"
+        sha256 = hashlib.sha256()
         params = {
             "name": name,
             "type": type.value,
             "users_ids": ",".join([str(user_id) for user_id in users_ids]),
         }
+
+        if file_upload_hash_first:
+            content_hash = await asyncio.to_thread(self._compute_file_hash, path)
+            file_id = await self._create_file_by_hash(params, content_hash, token)
+            if file_id is not None:
+                return file_id
+
+        headers = {"Content-Type": "application/octet-stream"}
+        if compress:
+            headers["Content-Encoding"] = "gzip"
         response = await self._client.post(
             self._base_url,
             params=params,
-            headers={
-                "Authorization": f"Bearer {t}",
-                "Content-Type": "application/octet-stream",
-            },
-            content=content,
+            headers=headers,
+            auth=self.auth(token),
+            content=self._read_chunks(path, sha256, compress),
         )
         response.raise_for_status()
+
+        data = response.json()
+        if data["content_hash"] != sha256.hexdigest():
+            raise ChecksumMismatch(
+                f"Uploaded file doesn't match its hash: path={path}, "
+                f"expected={sha256.hexdigest()}, actual={data['content_hash']}"
+            )
+        return data["id"]
+
+    async def _create_file_by_hash(self, params: dict, content_hash: str, token: Optional[str]) -> Optional[str]:
+        """
+        Creates a file with the content the service already has and returns the file ID,
+        or None if the content has to be uploaded.
+        """
+        response = await self._client.post(
+            urljoin(self._base_url, "by-hash"),
+            params={**params, "content_hash": content_hash},
+            auth=self.auth(token),
+        )
+        if response.status_code != 201:
+            # 404 if the service doesn't have the content, the content is uploaded in any other case too
+            return None
         return response.json()["id"]
 
+    @staticmethod
+    def _compute_file_hash(path: Path) -> str:
+        sha256 = hashlib.sha256()
+        with path.open("rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK_SIZE):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    @staticmethod
+    async def _read_chunks(path: Path, sha256: Any, compress: bool) -> AsyncIterator[bytes]:
+        # reading, hashing and compressing run in a thread to not block the event loop
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+
+        def read_chunk(f: BinaryIO) -> Optional[bytes]:
+            chunk = f.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                return None
+            sha256.update(chunk)
+            return compressor.compress(chunk) if compressor is not None else chunk
+
+        with path.open("rb") as f:
+            while (chunk := await asyncio.to_thread(read_chunk, f)) is not None:
+                if chunk:
+                    yield chunk
+
+        if compressor is not None:
+            yield compressor.flush()
+
     async def is_deleted(self, file_id: UUID, token: str) -> bool:
         file = await self.get_file(file_id, token)
         return file.is_deleted()
@@ -5,7 +5,6 @@ from enum import Enum
 from typing import Optional
 from urllib.parse import urljoin
 
-import httpx
 
 from pix_portal_lib.utils import get_env
 
@@ -52,7 +51,6 @@ class ProcessingRequestStatus(str, Enum):
 class ProcessingRequestServiceClient(SelfAuthenticatingClient):
     def __init__(self):
         super().__init__()
-        self._client = httpx.AsyncClient()
         self._base_url = processing_request_service_url
         if self._base_url is None:
             raise ValueError("PROCESSING_REQUEST_SERVICE_URL environment variable is not set")
@@ -61,7 +59,7 @@ class ProcessingRequestServiceClient(SelfAuthenticatingClient):
         self, processing_request_id: str, asset_id: str, token: Optional[str] = None
     ) -> dict:
         url = urljoin(self._base_url, f"{processing_request_id}/output-assets")
-        response = await self._client.post(url, headers=await self.request_headers(token), json={"asset_id": asset_id})
+        response = await self._client.post(url, auth=self.auth(token), json={"asset_id": asset_id})
         response.raise_for_status()
         return response.json()
 
@@ -73,8 +71,10 @@ class ProcessingRequestServiceClient(SelfAuthenticatingClient):
         token: Optional[str] = None,
     ) -> dict:
         url = urljoin(self._base_url, f"{processing_request_id}")
-        headers = await self.request_headers(token)
-        response = await self._client.patch(url, headers=headers, json={"status": status, "message": message})
+        auth = self.auth(token)
+        response = await self._client.patch(
+            url, auth=auth, json={"status": status, "message": message}, extensions={"idempotent": True}
+        )
         response.raise_for_status()
         return response.json()
 
@@ -88,7 +88,7 @@ class ProcessingRequestServiceClient(SelfAuthenticatingClient):
         token: Optional[str] = None,
     ) -> dict:
         url = urljoin(self._base_url, f"{processing_request_id}")
-        headers = await self.request_headers(token)
+        auth = self.auth(token)
 
         payload = {}
         if status is not None:
@@ -102,8 +102,9 @@ class ProcessingRequestServiceClient(SelfAuthenticatingClient):
 
         response = await self._client.patch(
             url,
-            headers=headers,
+            auth=auth,
             json=payload,
+            extensions={"idempotent": True},
         )
         response.raise_for_status()
         return response.json()
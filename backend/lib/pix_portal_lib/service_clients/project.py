@@ -2,7 +2,6 @@ from typing import Optional
 from urllib.parse import urljoin
 from uuid import UUID
 
-import httpx
 
 from pix_portal_lib.utils import get_env
 
@@ -18,12 +17,11 @@ class ProjectNotFound(Exception):
 class ProjectServiceClient(SelfAuthenticatingClient):
     def __init__(self):
         super().__init__()
-        self._client = httpx.AsyncClient()
         self._base_url = project_service_url
 
     async def add_asset_to_project(self, project_id: str, asset_id: str, token: Optional[str] = None) -> dict:
         url = urljoin(self._base_url, f"{project_id}/assets")
-        response = await self._client.post(url, headers=await self.request_headers(token), json={"asset_id": asset_id})
+        response = await self._client.post(url, auth=self.auth(token), json={"asset_id": asset_id})
         response.raise_for_status()
         return response.json()
 
@@ -0,0 +1,177 @@
+"""
+Retries of failed requests to the PIX services and circuit breaking per upstream.
+
+Requests are retried with exponential backoff and full jitter when the connection fails or the upstream answers with
+a status code of a transient failure, e.g., 502 from the proxy while a service restarts. Only requests that are safe
+to send again are retried:
+
+- requests with idempotent methods, i.e., GET, HEAD, OPTIONS, PUT and DELETE;
+- requests marked as idempotent with the "idempotent" request extension, e.g., PATCH requests setting absolute values;
+- any request that failed before it was sent, i.e., when the connection couldn't be established.
+
+Requests with streamed bodies are never sent again, because the body has been consumed.
+
+Each upstream, i.e., scheme, host and port, has its own circuit breaker. After HTTP_CIRCUIT_FAILURE_THRESHOLD
+consecutive failures, the circuit opens and requests to the upstream fail immediately with CircuitOpenError for
+HTTP_CIRCUIT_RESET_TIMEOUT seconds. Then one trial request is let through, which closes the circuit if it succeeds.
+A request that opens the circuit isn't retried, its last response or error is returned.
+
+Retries are configured with HTTP_RETRIES, 3 by default, HTTP_RETRY_BACKOFF, 0.5 seconds by default,
+and HTTP_RETRY_MAX_BACKOFF, 10 seconds by default.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger()
+
+max_retries = int(os.getenv("HTTP_RETRIES", 3))
+retry_backoff = float(os.getenv("HTTP_RETRY_BACKOFF", 0.5))
+retry_max_backoff = float(os.getenv("HTTP_RETRY_MAX_BACKOFF", 10))
+circuit_failure_threshold = int(os.getenv("HTTP_CIRCUIT_FAILURE_THRESHOLD", 5))
+circuit_reset_timeout = float(os.getenv("HTTP_CIRCUIT_RESET_TIMEOUT", 30))
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+# Errors raised before the request has been sent, so it's safe to send any request again
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CircuitOpenError(httpx.TransportError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_progress or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # half-open, one request tries whether the upstream has recovered
+            self._trial_in_progress = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self) -> bool:
+        """
+        Records a failure and returns True if it has opened the circuit, or opened it again after a failed trial.
+        """
+        with self._lock:
+            self._failures += 1
+            is_opening = self._trial_in_progress or (
+                self._opened_at is None and self._failures >= self.failure_threshold
+            )
+            if is_opening:
+                self._opened_at = time.monotonic()
+            self._trial_in_progress = False
+            return is_opening
+
+    def release_trial(self):
+        """
+        Lets another request try the upstream when the trial request ended without a result, e.g., was cancelled.
+        """
+        with self._lock:
+            self._trial_in_progress = False
+
+
+_circuit_breakers: dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(url: httpx.URL) -> CircuitBreaker:
+    upstream = f"{url.scheme}://{url.host}:{url.port}"
+    with _circuit_breakers_lock:
+        circuit_breaker = _circuit_breakers.get(upstream)
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker(circuit_failure_threshold, circuit_reset_timeout)
+            _circuit_breakers[upstream] = circuit_breaker
+        return circuit_breaker
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """
+    Transport retrying the requests sent by the wrapped transport, see the module's description.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        circuit_breaker = get_circuit_breaker(request.url)
+        is_idempotent = request.method in IDEMPOTENT_METHODS or request.extensions.get("idempotent", False)
+        is_replayable = isinstance(request.stream, httpx.ByteStream)
+
+        attempt = 0
+        while True:
+            if not circuit_breaker.allow_request():
+                raise CircuitOpenError(
+                    f"Circuit is open for {request.url.host}, request={request.url}", request=request
+                )
+            is_trial = circuit_breaker.is_open
+
+            try:
+                response = await self._transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                is_circuit_opened = self._record_failure(circuit_breaker, request)
+                can_retry = is_replayable and (is_idempotent or isinstance(e, NOT_SENT_ERRORS))
+                if not can_retry or is_circuit_opened or attempt >= max_retries:
+                    raise
+                error = repr(e)
+            except BaseException:
+                # e.g., the request is cancelled, the circuit would stay open without a trial otherwise
+                if is_trial:
+                    circuit_breaker.release_trial()
+                raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    circuit_breaker.record_success()
+                    return response
+                is_circuit_opened = self._record_failure(circuit_breaker, request)
+                if not (is_replayable and is_idempotent) or is_circuit_opened or attempt >= max_retries:
+                    return response
+                error = f"status_code={response.status_code}"
+                await response.aclose()
+
+            attempt += 1
+            delay = random.uniform(0, min(retry_max_backoff, retry_backoff * 2**attempt))
+            logger.warning(
+                f"Request failed, retrying in {delay:.2f} seconds: "
+                f"method={request.method}, url={request.url}, attempt={attempt}, error={error}"
+            )
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+    @staticmethod
+    def _record_failure(circuit_breaker: CircuitBreaker, request: httpx.Request) -> bool:
+        # the last failure is returned to the caller instead of retrying into the opened circuit
+        is_circuit_opened = circuit_breaker.record_failure()
+        if is_circuit_opened:
+            logger.error(f"Circuit opened after consecutive failures: upstream={request.url.host}")
+        return is_circuit_opened
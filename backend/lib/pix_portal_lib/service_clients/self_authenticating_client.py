@@ -1,33 +1,143 @@
+import asyncio
 import logging
-from typing import Optional
+import os
+import time
+import weakref
+from typing import AsyncGenerator, Optional
 
-from .auth import AuthServiceClient
+import httpx
+
+from .auth import AuthServiceClient, get_token_expiration_time
+from .transport import get_http_client
 
 logger = logging.getLogger()
 
+# The system token is refreshed this many seconds before it expires
+system_token_refresh_margin = float(os.getenv("SYSTEM_TOKEN_REFRESH_MARGIN", 60))
 
-class SelfAuthenticatingClient:
+
+class SystemToken:
     """
-    A client that can authenticate itself using the system JWT token if no token is provided.
+    JWT token of the SYSTEM user shared by all clients of the process.
+
+    The token is reused until shortly before it expires. Concurrent refreshes are merged into a single login.
     """
 
     def __init__(self):
-        self._auth_service_client = AuthServiceClient()
-        self._token = None
+        self._token: Optional[str] = None
+        self._expires_at: Optional[float] = None
+        self._auth_service_client: Optional[AuthServiceClient] = None
+        # asyncio locks are bound to an event loop, so there is one lock per event loop
+        self._locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = (
+            weakref.WeakKeyDictionary()
+        )
 
-    @property
-    async def token(self) -> str:
-        if self._token is None:
+    async def get(self) -> str:
+        """
+        Returns a valid token, logging in if there is no token or it's about to expire.
+        """
+        token = self._token
+        if token is not None and not self._is_expiring():
+            return token
+        return await self.refresh(stale_token=token)
+
+    async def refresh(self, stale_token: Optional[str] = None) -> str:
+        """
+        Logs in again unless the stale token has already been replaced by a concurrent refresh.
+        """
+        async with self._lock():
+            if self._token is not None and self._token != stale_token and not self._is_expiring():
+                return self._token
+
+            if self._auth_service_client is None:
+                self._auth_service_client = AuthServiceClient()
             try:
-                self._token = await self._auth_service_client.get_system_jwt_token()
+                token = await self._auth_service_client.get_system_jwt_token()
             except Exception as e:
                 logger.error(f"Error getting system JWT token: {e}")
                 raise e
-        return self._token
+
+            self._token = token
+            self._expires_at = get_token_expiration_time(token)
+            if self._expires_at is None:
+                logger.warning("System JWT token has no expiration time, it's refreshed only when rejected")
+            return token
+
+    def invalidate(self):
+        self._token = None
+        self._expires_at = None
+
+    def _is_expiring(self) -> bool:
+        return self._expires_at is not None and self._expires_at - system_token_refresh_margin <= time.time()
+
+    def _lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[loop] = lock
+        return lock
+
+
+system_token = SystemToken()
+
+
+class SystemTokenAuth(httpx.Auth):
+    """
+    Authenticates requests with the shared system token. A request rejected with 401 is sent once more
+    with a new token, unless its body is a stream that can't be sent again.
+    """
+
+    async def async_auth_flow(self, request: httpx.Request) -> AsyncGenerator[httpx.Request, httpx.Response]:
+        token = await system_token.get()
+        request.headers["Authorization"] = f"Bearer {token}"
+        response = yield request
+
+        if response.status_code == 401:
+            token = await system_token.refresh(stale_token=token)
+            if isinstance(request.stream, httpx.ByteStream):
+                request.headers["Authorization"] = f"Bearer {token}"
+                yield request
+
+
+class SelfAuthenticatingClient:
+    """
+    A client that can authenticate itself using the system JWT token if no token is provided.
+    Requests are sent with the process-wide HTTP client, see the transport module.
+    """
+
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        return get_http_client()
+
+    @property
+    async def token(self) -> str:
+        return await system_token.get()
+
+    def auth(self, token: Optional[str] = None) -> httpx.Auth:
+        """
+        Returns the authentication of a request, with the given token or the system token if no token is provided.
+        """
+        if token is not None:
+            return _BearerAuth(token)
+        return SystemTokenAuth()
 
     async def request_headers(self, token: Optional[str] = None) -> dict[str, str]:
         t = token or await self.token
         return {"Authorization": f"Bearer {t}"}
 
     def nullify_token(self) -> None:
-        self._token = None
+        """
+        Forces a new login for the next request authenticated with the system token.
+        """
+        system_token.invalidate()
+
+
+class _BearerAuth(httpx.Auth):
+    def __init__(self, token: str):
+        self._token = token
+
+    def auth_flow(self, request: httpx.Request):
+        request.headers["Authorization"] = f"Bearer {self._token}"
+        yield request
+
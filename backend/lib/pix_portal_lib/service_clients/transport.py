@@ -0,0 +1,150 @@
+"""
+Process-wide HTTP transport shared by all service clients.
+
+Every service client used to create its own httpx.AsyncClient, and with it its own connection pool. The clients now
+take the shared client from this registry, so all requests of a process to the PIX services reuse the same pooled
+keep-alive connections.
+
+httpx clients are bound to the event loop they are used in, so the registry keeps one client per event loop.
+Clients are created on first use and must be closed with close_http_clients() before the event loop is closed.
+
+The pool is configured with the following environment variables:
+
+- HTTP_MAX_CONNECTIONS, maximum number of open connections, 100 by default;
+- HTTP_MAX_KEEPALIVE_CONNECTIONS, maximum number of idle connections kept open, 20 by default;
+- HTTP_KEEPALIVE_EXPIRY, seconds an idle connection is kept open, 30 by default;
+- HTTP_CONNECT_TIMEOUT, seconds to establish a connection, 5 by default;
+- HTTP_TIMEOUT, seconds to read, write, or wait for a connection from the pool, 60 by default;
+- HTTP2, enables HTTP/2 if set to "true".
+
+Failed requests are retried by the transport, see the retry module.
+"""
+import asyncio
+import logging
+import os
+import weakref
+from typing import Iterable, Optional
+
+import httpx
+from opentelemetry import metrics
+from opentelemetry.metrics import CallbackOptions, Observation
+
+from .retry import RetryTransport
+
+logger = logging.getLogger()
+
+max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+max_keepalive_connections = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+timeout = float(os.getenv("HTTP_TIMEOUT", 60))
+http2 = os.getenv("HTTP2", "false").lower() == "true"
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared client of the running event loop. Must be called from a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _create_http_client()
+        _clients[loop] = client
+    return client
+
+
+async def close_http_clients():
+    """
+    Closes the shared client of the running event loop and forgets the clients of the closed event loops.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+    for other_loop in [other_loop for other_loop in _clients if other_loop.is_closed()]:
+        logger.warning("HTTP client of a closed event loop hasn't been closed, dropping it")
+        del _clients[other_loop]
+
+
+def get_pool_stats() -> dict:
+    """
+    Returns the usage of the connection pools of all shared clients.
+    """
+    stats = {
+        "clients": 0,
+        "max_connections": max_connections,
+        "max_keepalive_connections": max_keepalive_connections,
+        "connections": 0,
+        "active_connections": 0,
+        "idle_connections": 0,
+        "queued_requests": 0,
+    }
+    for client in list(_clients.values()):
+        if client.is_closed:
+            continue
+        stats["clients"] += 1
+        pool = _get_connection_pool(client)
+        if pool is None:
+            continue
+        # NOTE: httpx and httpcore don't expose the pool state publicly, the stats are skipped if their internals change
+        try:
+            connections = list(pool.connections)
+            idle_connections = sum(1 for connection in connections if connection.is_idle())
+            queued_requests = sum(1 for request in getattr(pool, "_requests", []) if request.connection is None)
+        except AttributeError as e:
+            logger.debug(f"Failed to read the HTTP connection pool stats: {e}")
+            continue
+        stats["connections"] += len(connections)
+        stats["idle_connections"] += idle_connections
+        stats["active_connections"] += len(connections) - idle_connections
+        stats["queued_requests"] += queued_requests
+    return stats
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        http2=http2,
+    )
+    return httpx.AsyncClient(
+        transport=RetryTransport(transport),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+    )
+
+
+def _get_connection_pool(client: httpx.AsyncClient) -> Optional[object]:
+    # The pool of the HTTP transport wrapped by the retry transport, the clients don't use mounts
+    transport = getattr(getattr(client, "_transport", None), "_transport", None)
+    return getattr(transport, "_pool", None)
+
+
+def _observe_pool(_: CallbackOptions) -> Iterable[Observation]:
+    stats = get_pool_stats()
+    yield Observation(stats["active_connections"], {"state": "active"})
+    yield Observation(stats["idle_connections"], {"state": "idle"})
+
+
+def _observe_queued_requests(_: CallbackOptions) -> Iterable[Observation]:
+    yield Observation(get_pool_stats()["queued_requests"])
+
+
+_meter = metrics.get_meter(__name__)
+_meter.create_observable_gauge(
+    "http.client.pool.connections",
+    callbacks=[_observe_pool],
+    unit="{connection}",
+    description="Connections of the shared HTTP client pools",
+)
+_meter.create_observable_gauge(
+    "http.client.pool.queued_requests",
+    callbacks=[_observe_queued_requests],
+    unit="{request}",
+    description="Requests waiting for a connection from the shared HTTP client pools",
+)
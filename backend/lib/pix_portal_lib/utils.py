@@ -11,15 +11,13 @@ def get_env(env_var_name: str) -> str:
 
 
 def get_user_id(request: Request) -> str:
-    user_id = _get_user_id_from_app_state(request) or _get_user_id_from_headers(request)
+    user_id = _get_user_id_from_request_state(request) or _get_user_id_from_headers(request)
     return user_id
 
 
-def _get_user_id_from_app_state(request: Request):
-    user_id = "anonymous"
-    if hasattr(request.app.state, "user"):
-        user = request.app.state.user or {}
-        user_id = user.get("id", "anonymous")
+def _get_user_id_from_request_state(request: Request):
+    user = getattr(request.state, "user", None) or {}
+    user_id = user.get("id", "anonymous")
     return user_id
 
 
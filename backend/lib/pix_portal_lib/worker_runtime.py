@@ -0,0 +1,164 @@
+"""
+Runtime of the PIX workers that process Kafka messages with the async service clients.
+
+Workers consume Kafka messages synchronously, one by one, and process them with coroutines. The runtime keeps one
+long-lived event loop per worker thread. The shared HTTP clients are bound to the event loop they're used in,
+see the transport module, so their connection pools are reused between messages instead of being recreated
+with a new event loop for each message.
+
+Example:
+
+    runtime = WorkerRuntime(name="kronos")
+    runtime.on_shutdown(kronos_service.aclose)
+
+    with runtime:
+        for message in consumer:
+            runtime.run(process_message(message))
+
+Startup hooks run on each event loop before any message is processed, shutdown hooks run on each event loop after
+the pending coroutines have been cancelled. The shared HTTP clients are closed after the shutdown hooks.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, Optional
+
+from .service_clients.transport import close_http_clients
+
+logger = logging.getLogger()
+
+Hook = Callable[[], Awaitable[Any]]
+
+
+class EventLoopThread:
+    """
+    Thread running an event loop until it's stopped. Coroutines are submitted to the loop from other threads.
+    """
+
+    def __init__(self, name: str):
+        self.loop = asyncio.new_event_loop()
+        self.pending = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout: Optional[float] = None):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            # NOTE: the default executor isn't awaited, blocking calls running in it can take long to finish
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+
+class WorkerRuntime:
+    """
+    Event loops of a worker, one per thread, with startup and shutdown hooks. See the module's description.
+    """
+
+    def __init__(self, name: str = "worker", threads: int = 1):
+        if threads < 1:
+            raise ValueError(f"Worker runtime needs at least one thread, threads={threads}")
+        self.name = name
+        self._threads = [EventLoopThread(name=f"{name}-loop-{i}") for i in range(threads)]
+        self._startup_hooks: list[Hook] = []
+        self._shutdown_hooks: list[Hook] = []
+        self._lock = threading.Lock()
+        self._is_running = False
+
+    def on_startup(self, hook: Hook) -> Hook:
+        """
+        Registers a coroutine function called on each event loop when the runtime starts. Can be used as a decorator.
+        """
+        self._startup_hooks.append(hook)
+        return hook
+
+    def on_shutdown(self, hook: Hook) -> Hook:
+        """
+        Registers a coroutine function called on each event loop when the runtime stops. Can be used as a decorator.
+        """
+        self._shutdown_hooks.append(hook)
+        return hook
+
+    def start(self):
+        if self._is_running:
+            return
+        self._is_running = True
+        for thread in self._threads:
+            thread.start()
+        for thread in self._threads:
+            for hook in self._startup_hooks:
+                thread.submit(hook()).result()
+        logger.info(f"Worker runtime started: name={self.name}, threads={len(self._threads)}")
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Cancels the pending coroutines, runs the shutdown hooks and closes the event loops.
+        """
+        if not self._is_running:
+            return
+        self._is_running = False
+        for thread in self._threads:
+            try:
+                thread.submit(self._shutdown()).result(timeout)
+            except Exception as e:
+                logger.exception(f"Worker runtime failed to shut down the event loop of {thread.loop}: {e}")
+            thread.stop(timeout)
+        logger.info(f"Worker runtime stopped: name={self.name}")
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """
+        Schedules the coroutine on the event loop with the fewest pending coroutines and returns its future.
+        """
+        if not self._is_running:
+            coro.close()
+            raise RuntimeError(f"Worker runtime {self.name} isn't running")
+
+        with self._lock:
+            thread = min(self._threads, key=lambda t: t.pending)
+            thread.pending += 1
+        future = thread.submit(coro)
+        future.add_done_callback(lambda _: self._release(thread))
+        return future
+
+    def run(self, coro: Coroutine) -> Any:
+        """
+        Runs the coroutine on one of the event loops and waits for its result.
+        """
+        return self.submit(coro).result()
+
+    def __enter__(self) -> "WorkerRuntime":
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def _release(self, thread: EventLoopThread):
+        with self._lock:
+            thread.pending -= 1
+
+    async def _shutdown(self):
+        current_task = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current_task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for hook in self._shutdown_hooks:
+            try:
+                await hook()
+            except Exception as e:
+                logger.exception(f"Worker runtime shutdown hook {hook} failed: {e}")
+
+        await close_http_clients()
@@ -0,0 +1,16 @@
+import os
+
+# the service clients read the URLs of the services when they're imported
+for name in [
+    "ASSET_SERVICE_URL",
+    "AUTH_SERVICE_URL",
+    "BLOBS_BASE_INTERNAL_URL",
+    "BLOBS_BASE_PUBLIC_URL",
+    "FILE_SERVICE_URL",
+    "PROCESSING_REQUEST_SERVICE_URL",
+    "PROJECT_SERVICE_URL",
+    "USER_SERVICE_URL",
+]:
+    os.environ.setdefault(name, "http://localhost/")
+for name in ["SYSTEM_EMAIL_FILE", "SYSTEM_PASSWORD_FILE"]:
+    os.environ.setdefault(name, "/dev/null")
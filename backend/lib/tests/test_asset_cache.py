@@ -0,0 +1,79 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from pix_portal_lib.service_clients.asset_cache import AssetCache
+
+CONTENT = b"case_id,activity,start_time\n" * 100
+HASH = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path) -> Path:
+    return tmp_path / "cache"
+
+
+@pytest.fixture
+def job_dir(tmp_path: Path) -> Path:
+    job_dir = tmp_path / "job"
+    job_dir.mkdir()
+    return job_dir
+
+
+def test_cache_dir_is_created_on_first_use(cache_dir: Path, job_dir: Path):
+    cache = AssetCache(cache_dir, max_size=1024**2)
+
+    assert not cache_dir.exists()
+
+    assert not cache.get(HASH, job_dir / "log.csv")
+    assert cache_dir.is_dir()
+
+
+def test_hands_out_put_file(cache_dir: Path, job_dir: Path):
+    cache = AssetCache(cache_dir, max_size=1024**2)
+    (job_dir / "downloaded.csv").write_bytes(CONTENT)
+
+    cache.put(HASH, job_dir / "downloaded.csv")
+
+    assert cache.get(HASH, job_dir / "log.csv")
+    assert (job_dir / "log.csv").read_bytes() == CONTENT
+    assert cache.size == len(CONTENT)
+
+
+def test_finds_files_cached_before_restart(cache_dir: Path, job_dir: Path):
+    (job_dir / "downloaded.csv").write_bytes(CONTENT)
+    AssetCache(cache_dir, max_size=1024**2).put(HASH, job_dir / "downloaded.csv")
+
+    cache = AssetCache(cache_dir, max_size=1024**2)
+
+    assert cache.get(HASH, job_dir / "log.csv")
+    assert (job_dir / "log.csv").read_bytes() == CONTENT
+
+
+def test_evicts_files_not_in_use(cache_dir: Path, job_dir: Path):
+    cache = AssetCache(cache_dir, max_size=len(CONTENT))
+    other_content = CONTENT * 2
+    other_hash = hashlib.sha256(other_content).hexdigest()
+    (job_dir / "first.csv").write_bytes(CONTENT)
+    (job_dir / "second.csv").write_bytes(other_content)
+
+    cache.put(HASH, job_dir / "first.csv")
+    (job_dir / "first.csv").unlink()
+    cache.put(other_hash, job_dir / "second.csv")
+
+    assert not cache.get(HASH, job_dir / "log.csv")
+    assert cache.get(other_hash, job_dir / "log.csv")
+
+
+def test_concurrent_handouts(cache_dir: Path, job_dir: Path):
+    cache = AssetCache(cache_dir, max_size=1024**2)
+    (job_dir / "downloaded.csv").write_bytes(CONTENT)
+    cache.put(HASH, job_dir / "downloaded.csv")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda i: cache.get(HASH, job_dir / f"{i}.csv"), range(32)))
+
+    assert all(results)
+    assert all((job_dir / f"{i}.csv").read_bytes() == CONTENT for i in range(32))
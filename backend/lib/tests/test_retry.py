@@ -0,0 +1,193 @@
+import asyncio
+
+import httpx
+import pytest
+
+from pix_portal_lib.service_clients import retry
+from pix_portal_lib.service_clients.retry import CircuitBreaker, CircuitOpenError, RetryTransport
+
+URL = "http://upstream:8000/resource"
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(retry, "retry_backoff", 0)
+    monkeypatch.setattr(retry, "max_retries", 3)
+    monkeypatch.setattr(retry, "_circuit_breakers", {})
+
+
+def send(handler, method: str = "GET", **kwargs) -> httpx.Response:
+    async def main():
+        async with httpx.AsyncClient(transport=RetryTransport(httpx.MockTransport(handler))) as client:
+            return await client.request(method, URL, **kwargs)
+
+    return asyncio.run(main())
+
+
+def responses(*status_codes: int):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(status_codes[min(len(requests), len(status_codes)) - 1])
+
+    return handler, requests
+
+
+def test_retries_idempotent_request_until_it_succeeds():
+    handler, requests = responses(502, 503, 200)
+
+    response = send(handler)
+
+    assert response.status_code == 200
+    assert len(requests) == 3
+
+
+def test_returns_last_response_when_retries_are_exhausted():
+    handler, requests = responses(502)
+
+    response = send(handler)
+
+    assert response.status_code == 502
+    assert len(requests) == 4
+
+
+def test_does_not_retry_non_idempotent_request_after_response():
+    handler, requests = responses(502, 200)
+
+    response = send(handler, "POST", content=b"data")
+
+    assert response.status_code == 502
+    assert len(requests) == 1
+
+
+def test_retries_request_marked_as_idempotent():
+    handler, requests = responses(502, 200)
+
+    response = send(handler, "PATCH", content=b"data", extensions={"idempotent": True})
+
+    assert response.status_code == 200
+    assert len(requests) == 2
+
+
+def test_retries_non_idempotent_request_that_was_not_sent():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if len(requests) == 1:
+            raise httpx.ConnectError("Connection refused", request=request)
+        return httpx.Response(201)
+
+    response = send(handler, "POST", content=b"data")
+
+    assert response.status_code == 201
+    assert len(requests) == 2
+
+
+def test_does_not_retry_non_idempotent_request_that_may_have_been_sent():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        raise httpx.ReadTimeout("Timed out", request=request)
+
+    with pytest.raises(httpx.ReadTimeout):
+        send(handler, "POST", content=b"data")
+    assert len(requests) == 1
+
+
+def test_does_not_retry_streamed_request():
+    handler, requests = responses(502, 200)
+
+    async def body():
+        yield b"data"
+
+    response = send(handler, "PUT", content=body())
+
+    assert response.status_code == 502
+    assert len(requests) == 1
+
+
+def test_does_not_retry_client_errors():
+    handler, requests = responses(404)
+
+    response = send(handler)
+
+    assert response.status_code == 404
+    assert len(requests) == 1
+
+
+def test_stops_retrying_and_fails_fast_when_circuit_opens(monkeypatch):
+    monkeypatch.setattr(retry, "circuit_failure_threshold", 2)
+    handler, requests = responses(502)
+
+    response = send(handler)
+
+    # the failure opening the circuit is returned instead of retrying into the opened circuit
+    assert response.status_code == 502
+    assert len(requests) == 2
+    with pytest.raises(CircuitOpenError):
+        send(handler)
+    assert len(requests) == 2
+
+
+def test_circuit_opens_after_consecutive_failures():
+    circuit_breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    assert circuit_breaker.record_failure() is False
+    assert circuit_breaker.record_failure() is False
+    circuit_breaker.record_success()
+    assert circuit_breaker.record_failure() is False
+    assert circuit_breaker.record_failure() is False
+    assert circuit_breaker.record_failure() is True
+
+    assert circuit_breaker.is_open
+    assert circuit_breaker.allow_request() is False
+
+
+def test_half_open_circuit_lets_one_trial_through_and_closes_on_success():
+    circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    circuit_breaker.record_failure()
+
+    assert circuit_breaker.allow_request() is True
+    assert circuit_breaker.allow_request() is False
+
+    circuit_breaker.record_success()
+
+    assert not circuit_breaker.is_open
+    assert circuit_breaker.allow_request() is True
+    assert circuit_breaker.allow_request() is True
+
+
+def test_failed_trial_opens_circuit_again():
+    circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    circuit_breaker.record_failure()
+    assert circuit_breaker.allow_request() is True
+
+    assert circuit_breaker.record_failure() is True
+    assert circuit_breaker.is_open
+
+
+def test_cancelled_trial_releases_circuit():
+    circuit_breaker = retry.get_circuit_breaker(httpx.URL(URL))
+    circuit_breaker.reset_timeout = 0
+    circuit_breaker.failure_threshold = 1
+    circuit_breaker.record_failure()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(10)
+        return httpx.Response(200)
+
+    async def main():
+        async with httpx.AsyncClient(transport=RetryTransport(httpx.MockTransport(handler))) as client:
+            task = asyncio.create_task(client.get(URL))
+            await asyncio.sleep(0.01)
+            assert circuit_breaker.allow_request() is False
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(main())
+
+    assert circuit_breaker.allow_request() is True
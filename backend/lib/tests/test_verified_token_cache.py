@@ -0,0 +1,83 @@
+import base64
+import json
+
+import pytest
+
+from pix_portal_lib.service_clients import fastapi
+from pix_portal_lib.service_clients.fastapi import VerifiedTokenCache
+
+USER = {"id": "00000000-0000-0000-0000-000000000001"}
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock(1_700_000_000)
+    monkeypatch.setattr(fastapi, "time", clock)
+    return clock
+
+
+def make_token(payload: dict) -> str:
+    encoded = base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii").rstrip("=")
+    return f"header.{encoded}.signature"
+
+
+def test_returns_cached_user_until_ttl_expires(clock):
+    cache = VerifiedTokenCache(max_entries=10, ttl=60)
+    token = make_token({"sub": USER["id"]})
+    cache.set(token, False, USER)
+
+    clock.now += 59
+    assert cache.get(token, False) == USER
+
+    clock.now += 1
+    assert cache.get(token, False) is None
+
+
+def test_entry_expires_with_token(clock):
+    cache = VerifiedTokenCache(max_entries=10, ttl=60)
+    token = make_token({"sub": USER["id"], "exp": clock.now + 10})
+    cache.set(token, False, USER)
+
+    clock.now += 9
+    assert cache.get(token, False) == USER
+
+    clock.now += 1
+    assert cache.get(token, False) is None
+
+
+def test_expired_token_is_not_served(clock):
+    cache = VerifiedTokenCache(max_entries=10, ttl=60)
+    token = make_token({"sub": USER["id"], "exp": clock.now - 1})
+    cache.set(token, False, USER)
+
+    assert cache.get(token, False) is None
+
+
+def test_superuser_verification_is_cached_separately(clock):
+    cache = VerifiedTokenCache(max_entries=10, ttl=60)
+    token = make_token({"sub": USER["id"]})
+    cache.set(token, False, USER)
+
+    assert cache.get(token, True) is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = VerifiedTokenCache(max_entries=2, ttl=60)
+    tokens = [make_token({"sub": str(i)}) for i in range(3)]
+    cache.set(tokens[0], False, USER)
+    cache.set(tokens[1], False, USER)
+    cache.get(tokens[0], False)
+
+    cache.set(tokens[2], False, USER)
+
+    assert cache.get(tokens[0], False) == USER
+    assert cache.get(tokens[1], False) is None
+    assert cache.get(tokens[2], False) == USER
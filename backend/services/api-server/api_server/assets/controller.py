@@ -1,5 +1,5 @@
 import uuid
-from typing import Annotated, Any, Optional
+from typing import Annotated, Any, Optional, Sequence
 
 from fastapi import APIRouter, Depends, Header, HTTPException
 
@@ -12,7 +12,7 @@ from api_server.utils.exceptions.http_exceptions import (
     NotEnoughPermissionsHTTP,
 )
 
-from .schemas import AssetIn, AssetOut, AssetPatchIn, LocationOut
+from .schemas import AssetIn, AssetOut, AssetPatchIn, AssetsIdsIn, LocationOut
 
 router = APIRouter()
 
@@ -54,6 +54,37 @@ async def create_asset(
     return await asset_service.get_asset(asset.id)
 
 
+@router.post("/batch", response_model=list[AssetOut])
+async def get_assets_by_ids(
+    assets_ids_data: AssetsIdsIn,
+    lazy: bool = True,
+    asset_service: AssetService = Depends(get_asset_service),
+    user: User = Depends(current_user),  # raises 401 if user is not authenticated
+) -> Any:
+    """
+    Returns many assets at once, in the requested order. Files are included unless lazy is set.
+    """
+    assets_ids = assets_ids_data.assets_ids
+    if lazy:
+        assets = await asset_service.get_assets_by_ids(assets_ids)
+    else:
+        assets = await asset_service.get_assets_with_files_by_ids(assets_ids)
+    assets_by_id = _assets_by_id(assets, assets_ids, user)
+    return [assets_by_id[asset_id] for asset_id in assets_ids]
+
+
+@router.post("/batch/delete", status_code=204)
+async def delete_assets_by_ids(
+    assets_ids_data: AssetsIdsIn,
+    asset_service: AssetService = Depends(get_asset_service),
+    user: User = Depends(current_user),  # raises 401 if user is not authenticated
+) -> None:
+    assets_ids = assets_ids_data.assets_ids
+    assets = await asset_service.get_assets_by_ids(assets_ids)
+    _assets_by_id(assets, assets_ids, user)
+    await asset_service.delete_assets(assets)
+
+
 @router.get("/{asset_id}", response_model=AssetOut)
 async def get_asset(
     asset_id: uuid.UUID,
@@ -122,6 +153,21 @@ def _raise_for_not_superuser(user: User) -> None:
         raise NotEnoughPermissionsHTTP()
 
 
+def _assets_by_id(assets: Sequence[Any], assets_ids: list[uuid.UUID], user: User) -> dict[uuid.UUID, Any]:
+    """
+    Checks that all requested assets exist and the user has access to them.
+    """
+    assets_by_id = {asset.id: asset for asset in assets}
+    missing_ids = [str(asset_id) for asset_id in assets_ids if asset_id not in assets_by_id]
+    if len(missing_ids) > 0:
+        raise HTTPException(status_code=404, detail=f"Assets not found: {', '.join(missing_ids)}")
+    if not user.is_superuser:
+        for asset in assets:
+            if str(user.id) not in [str(user_id) for user_id in asset.users_ids]:
+                raise NotEnoughPermissionsHTTP()
+    return assets_by_id
+
+
 async def _raise_no_access(asset_service: AssetService, user: User, asset_id: uuid.UUID) -> None:
     if user.is_superuser is True:
         return
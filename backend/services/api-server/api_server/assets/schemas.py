@@ -43,5 +43,9 @@ class AssetPatchIn(BaseModel):
     processing_requests_ids: Optional[list[uuid.UUID]] = None
 
 
+class AssetsIdsIn(BaseModel):
+    assets_ids: list[uuid.UUID]
+
+
 class LocationOut(BaseModel):
     location: str
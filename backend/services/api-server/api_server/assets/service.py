@@ -29,6 +29,10 @@ class AssetService:
     async def get_assets_by_ids(self, assets_ids: list[uuid.UUID]) -> Sequence[Asset]:
         return await self.asset_repository.get_assets_by_ids(assets_ids)
 
+    async def get_assets_with_files_by_ids(self, assets_ids: list[uuid.UUID]) -> Sequence[AssetOut]:
+        assets = await self.asset_repository.get_assets_by_ids(assets_ids)
+        return await self._post_process(assets)
+
     async def get_assets_by_project_id(self, project_id: uuid.UUID) -> Sequence[Asset]:
         return await self.asset_repository.get_assets_by_project_id(project_id)
 
@@ -101,13 +105,13 @@ class AssetService:
                 logger.error(f"Failed to delete file {file_id}: {e}")
         return asset
 
+    async def delete_assets(self, assets: Sequence[Asset]) -> None:
+        await self.asset_repository.delete_assets([asset.id for asset in assets])
+        await self.file_service.delete_files([file_id for asset in assets for file_id in asset.files_ids])
+
     async def delete_assets_by_project_id(self, project_id: uuid.UUID) -> None:
         assets = await self.get_assets_by_project_id(project_id)
-        asset_ids = [asset.id for asset in assets]
-        await self.asset_repository.delete_assets(asset_ids)
-        for asset in assets:
-            for file_id in asset.files_ids:
-                await self.file_service.delete_file(file_id)
+        await self.delete_assets(assets)
 
     async def does_asset_exist(self, asset_id: uuid.UUID) -> bool:
         asset = await self.asset_repository.get_asset(asset_id)
@@ -144,10 +148,13 @@ class AssetService:
         return user_id in users_ids
 
     async def _post_process(self, assets: Sequence[Asset]) -> Sequence[AssetOut]:
-        # convert to AssetOut and fetch files
+        # convert to AssetOut and fetch files of all assets at once
         assets_ = [AssetOut(**asset.__dict__) for asset in assets]
+        files_ids = [file_id for asset in assets_ for file_id in asset.files_ids]
+        files = await self.file_service.get_files_by_ids(files_ids) if files_ids else []
+        files_by_id = {file.id: file for file in files}
         for asset in assets_:
-            asset.files = await self._fetch_files(asset.files_ids)
+            asset.files = [files_by_id[file_id] for file_id in asset.files_ids if file_id in files_by_id]
         return assets_
 
 
@@ -1,27 +1,153 @@
+import re
+from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from api_server.files.service import FileService, get_file_service
+from api_server.files.storage import BlobStorage
 from api_server.users.db import User
 from api_server.users.users import current_user
 from api_server.utils.exceptions.http_exceptions import NotEnoughPermissionsHTTP
 
 router = APIRouter()
 
+# The content is addressed by its hash and never changes, clients can keep it forever.
+# It's private, because it's served to authenticated users only.
+BLOB_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
 
 @router.get("/{hash}")
 async def get_file_content_by_hash(
     hash: str,
+    request: Request,
     file_service: FileService = Depends(get_file_service),
     user: User = Depends(current_user),  # raises 401 if user is not authenticated
-) -> FileResponse:
+) -> Response:
     file = await file_service.get_file_by_hash(hash)
     # TODO: disable access check for the demo, for some reason even if file.users_ids has a user_id file_service returns False in some cases and True in others
     # await _raise_no_access(file_service, user, file.id)
-    file_path = file_service.base_dir / hash
-    return FileResponse(file_path)
+    return await blob_response(request, file_service.storage, file.content_hash)
+
+
+async def blob_response(request: Request, storage: BlobStorage, hash: str) -> Response:
+    """
+    Serves the content with a strong ETag derived from its hash, answering conditional requests with 304
+    and range requests with 206. Content stored compressed is sent as it is with Content-Encoding: gzip to clients
+    accepting gzip, and decompressed for other clients and range requests. The stored bytes are served from
+    the local disk if the storage keeps them there, otherwise they're streamed from the storage.
+    """
+    etag = f'"{hash}"'
+    gzip_etag = f'"{hash}-gzip"'
+    headers = {"ETag": etag, "Cache-Control": BLOB_CACHE_CONTROL, "Accept-Ranges": "bytes", "Vary": "Accept-Encoding"}
+
+    # both representations have the same content, so the client can keep using the one it has
+    if_none_match = request.headers.get("if-none-match")
+    for matched_etag in (etag, gzip_etag):
+        if _etag_matches(if_none_match, matched_etag):
+            return Response(status_code=304, headers={**headers, "ETag": matched_etag})
+
+    try:
+        info = await storage.info(hash)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File content not found")
+
+    # ranges refer to the uncompressed content
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range == etag:
+        byte_range = _parse_range(request.headers.get("range"), info.size)
+    if byte_range == (-1, -1):
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{info.size}"})
+
+    if byte_range is not None:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            storage.read(hash, start, end), status_code=206, media_type="application/octet-stream", headers=headers
+        )
+
+    if info.encoding == "gzip" and _accepts_gzip(request.headers.get("accept-encoding")):
+        headers["ETag"] = gzip_etag
+        headers["Content-Encoding"] = "gzip"
+        return _stored_bytes_response(request, storage, hash, info.stored_size, headers)
+
+    if info.encoding is None:
+        return _stored_bytes_response(request, storage, hash, info.size, headers)
+    headers["Content-Length"] = str(info.size)
+    return StreamingResponse(storage.read(hash), media_type="application/octet-stream", headers=headers)
+
+
+def _stored_bytes_response(
+    request: Request, storage: BlobStorage, hash: str, stored_size: int, headers: dict[str, str]
+) -> Response:
+    # NOTE: newer Starlette versions handle ranges in FileResponse too, so it's used only for requests without ranges
+    path = storage.local_path(hash)
+    if path is not None and "range" not in request.headers:
+        return FileResponse(path, media_type="application/octet-stream", headers=headers)
+    headers["Content-Length"] = str(stored_size)
+    return StreamingResponse(storage.read_stored(hash), media_type="application/octet-stream", headers=headers)
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    if accept_encoding is None:
+        return False
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, W/"..." matches the strong ETag too
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _parse_range(range_header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Returns the inclusive (start, end) of a single byte range, (-1, -1) if the range can't be satisfied,
+    or None if the whole content has to be served, e.g., for no, invalid, or multiple ranges.
+    """
+    if range_header is None:
+        return None
+    match = RANGE_PATTERN.match(range_header.strip())
+    if match is None:
+        return None
+
+    start, end = match.group(1), match.group(2)
+    if start == "" and end == "":
+        return None
+    if start == "":
+        # suffix range, the last bytes of the content
+        suffix_length = int(end)
+        if suffix_length == 0:
+            return -1, -1
+        return max(size - suffix_length, 0), size - 1
+
+    start = int(start)
+    if end != "" and int(end) < start:
+        # syntactically invalid, the header is ignored
+        return None
+    if start >= size:
+        return -1, -1
+    end = size - 1 if end == "" else min(int(end), size - 1)
+    return start, end
 
 
 async def _raise_no_access(file_service: FileService, user: User, file_id: UUID) -> None:
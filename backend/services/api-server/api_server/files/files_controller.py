@@ -1,45 +1,128 @@
 import uuid
-from typing import Annotated, Any, Optional, Sequence
+import zlib
+from typing import Any, AsyncIterator, Optional, Sequence
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Response
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from starlette.datastructures import UploadFile
 
+from api_server.files.blobs_controller import blob_response
 from api_server.files.model import File, FileType
 from api_server.files.schemas import FileOut, LocationOut
-from api_server.files.service import FileExists, FileService, get_file_service
+from api_server.files.service import FileService, get_file_service
 from api_server.users.db import User
 from api_server.users.users import current_user, current_superuser
 from api_server.utils.exceptions.http_exceptions import NotEnoughPermissionsHTTP
 
 router = APIRouter()
 
-
-@router.post("/", response_model=FileOut, status_code=201)
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class InvalidGzipContent(Exception):
+    pass
+
+
+@router.post(
+    "/",
+    response_model=FileOut,
+    status_code=201,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"],
+                    }
+                },
+            },
+        }
+    },
+)
 async def create_file(
     name: str,
     type: FileType,
-    content: Annotated[bytes, Body()],
+    request: Request,
     response: Response,
     file_service: FileService = Depends(get_file_service),
     user: User = Depends(current_user),  # raises 401 if user is not authenticated,
     users_ids: Optional[str] = None,  # list of users ids separated by commas
+    content_encoding: Optional[str] = Header(None),
 ) -> Any:
     if not type.is_valid():
         raise HTTPException(status_code=400, detail="Invalid file type")
 
+    # clients can compress the upload, files are stored and hashed uncompressed
+    if content_encoding not in (None, "identity", "gzip"):
+        raise HTTPException(status_code=415, detail=f"Unsupported content encoding: {content_encoding}")
+
+    users_ids = _parse_users_ids(users_ids, user)
+
+    # the content is streamed to disk chunk by chunk, it's either the raw body or the "file" field of a multipart form
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        # Starlette spools the form files to disk, they're read back in chunks
+        form = await request.form()
+        upload = form.get("file")
+        if not isinstance(upload, UploadFile):
+            await form.close()
+            raise HTTPException(status_code=400, detail="Multipart form has no file field")
+        chunks = _read_upload_file(upload)
+    else:
+        form = None
+        chunks = request.stream()
+
+    if content_encoding == "gzip":
+        chunks = _decompress_gzip(chunks)
+
     try:
-        if users_ids is None or len(users_ids) == 0:
-            users_ids = [str(user.id)]
-        else:
-            users_ids = [uuid.UUID(user_id.strip()) for user_id in users_ids.split(",")]
-        result = await file_service.save_file(name=name, file_type=type, file_bytes=content, users_ids=users_ids)
+        result = await file_service.save_file_stream(name=name, file_type=type, chunks=chunks, users_ids=users_ids)
         response.status_code = 201
-    except FileExists as e:
-        result = e.file
-        response.status_code = 200
+    except InvalidGzipContent:
+        raise HTTPException(status_code=400, detail="Invalid gzip content")
+    except FileNotFoundError:
+        # the stored content has been deleted along with its last file while the upload was finishing
+        raise HTTPException(status_code=409, detail="Content was deleted concurrently, upload the file again")
+    finally:
+        if form is not None:
+            await form.close()
     return result
 
 
+@router.post("/by-hash", response_model=FileOut, status_code=201)
+async def create_file_by_hash(
+    name: str,
+    type: FileType,
+    content_hash: str,
+    file_service: FileService = Depends(get_file_service),
+    user: User = Depends(current_user),  # raises 401 if user is not authenticated,
+    users_ids: Optional[str] = None,  # list of users ids separated by commas
+) -> Any:
+    """
+    Creates a file with the content the server already has, the client checks this way whether the content
+    has to be uploaded at all. Returns 404 if the content has to be uploaded with POST /files/.
+    """
+    if not type.is_valid():
+        raise HTTPException(status_code=400, detail="Invalid file type")
+    if not file_service.is_valid_hash(content_hash):
+        raise HTTPException(status_code=400, detail="Invalid content hash, expected a hex-encoded SHA-256")
+
+    # knowing a hash mustn't give access to the content of other users
+    if not user.is_superuser and not await file_service.user_has_access_to_hash(user.id, content_hash):
+        raise HTTPException(status_code=404, detail="Content not found")
+
+    users_ids = _parse_users_ids(users_ids, user)
+    try:
+        return await file_service.save_file_by_hash(
+            name=name, file_type=type, content_hash=content_hash, users_ids=users_ids
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Content not found")
+
+
 @router.get("/", response_model=list[FileOut])
 async def get_files(
     file_service: FileService = Depends(get_file_service),
@@ -96,14 +179,15 @@ async def get_file_location(
 @router.get("/{file_id}/content")
 async def get_file_content(
     file_id: uuid.UUID,
+    request: Request,
     file_service: FileService = Depends(get_file_service),
     user: User = Depends(current_user),  # raises 401 if user is not authenticated
-) -> FileResponse:
+) -> Response:
     await _raise_no_access(file_service, user, file_id)
 
     try:
-        file_path = await file_service.get_file_path(file_id)
-        return FileResponse(file_path)
+        content_hash = await file_service.get_file_hash(file_id)
+        return await blob_response(request, file_service.storage, content_hash)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
 
@@ -113,3 +197,32 @@ async def _raise_no_access(file_service: FileService, user: User, file_id: uuid.
         return
     if not await file_service.user_has_access_to_file(user_id=user.id, file_id=file_id):
         raise NotEnoughPermissionsHTTP()
+
+
+def _parse_users_ids(users_ids: Optional[str], user: User) -> list:
+    if users_ids is None or len(users_ids) == 0:
+        return [str(user.id)]
+    return [uuid.UUID(user_id.strip()) for user_id in users_ids.split(",")]
+
+
+async def _read_upload_file(upload: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+async def _decompress_gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # The output is limited per call, so a small compressed chunk doesn't expand into a huge one in memory.
+    # gzip files can consist of several members, each member needs a new decompressor.
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    try:
+        async for chunk in chunks:
+            while chunk:
+                if decompressor.eof:
+                    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+                yield decompressor.decompress(chunk, UPLOAD_CHUNK_SIZE)
+                chunk = decompressor.unused_data if decompressor.eof else decompressor.unconsumed_tail
+        yield decompressor.flush()
+    except zlib.error as e:
+        raise InvalidGzipContent(str(e))
+    if not decompressor.eof:
+        raise InvalidGzipContent("Truncated gzip content")
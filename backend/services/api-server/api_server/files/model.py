@@ -26,6 +26,10 @@ class FileType(str, Enum):
     def is_valid(self) -> bool:
         return self in FileType.__members__.values()
 
+    def is_compressible(self) -> bool:
+        # text formats, EVENT_LOG_CSV_GZ is compressed already
+        return self != FileType.EVENT_LOG_CSV_GZ
+
 
 class Base(AsyncAttrs, DeclarativeBase):
     pass
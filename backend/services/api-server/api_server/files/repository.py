@@ -1,9 +1,10 @@
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import AsyncGenerator, Sequence
+from typing import AsyncGenerator, AsyncIterator, Sequence
 
 from fastapi import Depends
-from sqlalchemy import select, update
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api_server.files.model import File, FileType
@@ -25,6 +26,10 @@ class FileRepository:
             raise FileNotFoundError()
         return file
 
+    async def get_files_by_ids(self, files_ids: list[uuid.UUID]) -> Sequence[File]:
+        result = await self.session.execute(select(File).where(File.id.in_(files_ids)))
+        return result.scalars().all()
+
     async def get_file_by_hash(self, hash: str) -> File:
         result = await self.session.execute(select(File).where(File.content_hash == hash))
         file = result.scalar()
@@ -36,6 +41,29 @@ class FileRepository:
         result = await self.session.execute(select(File).where(File.content_hash == hash))
         return result.scalars().all()
 
+    async def get_referenced_hashes(self, hashes: list[str]) -> set[str]:
+        """
+        Returns the hashes referenced by files that aren't deleted.
+        """
+        result = await self.session.execute(
+            select(File.content_hash).where(File.content_hash.in_(hashes), File.deletion_time.is_(None)).distinct()
+        )
+        return set(result.scalars().all())
+
+    @asynccontextmanager
+    async def lock_hash(self, hash: str) -> AsyncIterator[None]:
+        """
+        Runs the block in a transaction holding an advisory lock on the content hash, so creating a file with
+        the content and deleting the unreferenced content don't interleave. The transaction is committed at the end.
+        """
+        await self.session.execute(select(func.pg_advisory_xact_lock(func.hashtext(hash))))
+        try:
+            yield
+        except BaseException:
+            await self.session.rollback()
+            raise
+        await self.session.commit()
+
     async def get_file_hash(self, file_id: uuid.UUID) -> str:
         result = await self.session.execute(select(File.content_hash).where(File.id == file_id))
         content_hash = result.scalar()
@@ -68,6 +96,12 @@ class FileRepository:
         await self.session.execute(update(File).where(File.id == file_id).values(deletion_time=datetime.utcnow()))
         await self.session.commit()
 
+    async def delete_files(self, files_ids: list[uuid.UUID]) -> None:
+        await self.session.execute(
+            update(File).where(File.id.in_(files_ids)).values(deletion_time=datetime.utcnow())
+        )
+        await self.session.commit()
+
 
 async def get_file_repository(
     session: AsyncSession = Depends(get_async_session),
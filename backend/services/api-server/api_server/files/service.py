@@ -1,44 +1,52 @@
-import hashlib
+import re
 import uuid
-from pathlib import Path
-from typing import AsyncGenerator, Sequence
+from typing import AsyncGenerator, AsyncIterable, Sequence
 from urllib.parse import urljoin
 
 from fastapi import Depends
 
 from api_server.files.model import File, FileType
 from api_server.files.repository import FileRepository, get_file_repository
+from api_server.files.storage import BlobStorage, get_blob_storage
 from api_server.settings import settings
 
 
-class FileExists(Exception):
-    def __init__(self, file: File) -> None:
-        super().__init__(f"File with hash {file.content_hash} already exists: {file.id}")
-        self.file = file
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
 
 
 class FileService:
-    def __init__(self, file_repository: FileRepository) -> None:
-        self.base_dir = settings.base_dir
+    def __init__(self, file_repository: FileRepository, storage: BlobStorage) -> None:
         self.file_repository = file_repository
+        self.storage = storage
         self._blobs_base_public_url = settings.blobs_base_public_url.unicode_string()
         self._blobs_base_internal_url = settings.blobs_base_internal_url.unicode_string()
 
-        self.base_dir.mkdir(parents=True, exist_ok=True)
-
-    async def save_file(self, name: str, file_type: FileType, file_bytes: bytes, users_ids: list[uuid.UUID]) -> File:
-        hash = self._compute_sha256(file_bytes)
-        file_path = self.base_dir / hash
-        with file_path.open("wb") as file:
-            file.write(file_bytes)
-        url = self._generate_url(hash)
-        return await self.file_repository.create_file(
-            name=name,
-            content_hash=hash,
-            url=url,
-            file_type=file_type,
-            users_ids=users_ids,
-        )
+    # NOTE: files with the same content share the stored content, but each upload gets its own File entity.
+    #   Assets delete their files, so a File entity shared by several assets would disappear with the first asset.
+
+    async def save_file_stream(
+        self, name: str, file_type: FileType, chunks: AsyncIterable[bytes], users_ids: list[uuid.UUID]
+    ) -> File:
+        """
+        Saves the content read chunk by chunk, so the content is never kept in memory as a whole.
+
+        The hash is computed while the content is written to the blob storage, a failed upload leaves nothing
+        behind. If the content is already stored, the existing content is reused.
+        Raises FileNotFoundError if the content has been deleted by a concurrent deletion in the meantime.
+        """
+        hash = await self.storage.write(chunks, compress=self._should_compress(file_type))
+        return await self._create_file(name, file_type, hash, users_ids)
+
+    async def save_file_by_hash(
+        self, name: str, file_type: FileType, content_hash: str, users_ids: list[uuid.UUID]
+    ) -> File:
+        """
+        Creates a file with the content already stored under the given hash, so the content isn't uploaded again.
+        Raises FileNotFoundError if there is no such content.
+        """
+        if not self.is_valid_hash(content_hash):
+            raise FileNotFoundError()
+        return await self._create_file(name, file_type, content_hash, users_ids)
 
     async def get_files(self) -> Sequence[File]:
         return await self.file_repository.get_files()
@@ -46,6 +54,9 @@ class FileService:
     async def get_file(self, file_id: uuid.UUID) -> File:
         return await self.file_repository.get_file(file_id)
 
+    async def get_files_by_ids(self, files_ids: list[uuid.UUID]) -> Sequence[File]:
+        return await self.file_repository.get_files_by_ids(files_ids)
+
     async def get_file_by_hash(self, hash: str) -> File:
         return await self.file_repository.get_file_by_hash(hash)
 
@@ -56,16 +67,25 @@ class FileService:
         #   because we create new files only when the hash of the file content is different.
         try:
             content_hash = await self.file_repository.get_file_hash(file_id)
-            other_references = await self.file_repository.get_files_by_hash(content_hash)
-            other_references = [file for file in other_references if file.id != file_id and file.deletion_time is None]
-            if len(other_references) == 0:
-                self._remove_file_from_disk(content_hash)
+            await self._delete_unreferenced_content(content_hash)
         except Exception as e:
             raise Exception(f"Failed to delete file {file_id}: {e}")
 
-    async def get_file_path(self, file_id: uuid.UUID) -> Path:
+    async def delete_files(self, files_ids: list[uuid.UUID]) -> None:
+        """
+        Deletes many files at once, removing their content from the blob storage when no other file references it.
+        """
+        if len(files_ids) == 0:
+            return
+        files = await self.file_repository.get_files_by_ids(files_ids)
+        hashes = list({file.content_hash for file in files})
+        await self.file_repository.delete_files(files_ids)
+        for hash in hashes:
+            await self._delete_unreferenced_content(hash)
+
+    async def get_file_hash(self, file_id: uuid.UUID) -> str:
         file = await self.get_file(file_id)
-        return self._file_path(file.content_hash)
+        return file.content_hash
 
     async def get_file_url(self, file_id: uuid.UUID) -> str:
         file = await self.get_file(file_id)
@@ -82,6 +102,17 @@ class FileService:
         users_ids = [str(user_id) for user_id in file.users_ids]
         return user_id in users_ids
 
+    async def user_has_access_to_hash(self, user_id: uuid.UUID, hash: str) -> bool:
+        """
+        Checks if the user has access to any file that isn't deleted with the given content hash.
+        """
+        files = await self.file_repository.get_files_by_hash(hash)
+        user_id = str(user_id)
+        return any(
+            file.deletion_time is None and user_id in [str(file_user_id) for file_user_id in file.users_ids]
+            for file in files
+        )
+
     async def users_have_access_to_file(self, users_ids: list[uuid.UUID], file_id: uuid.UUID) -> bool:
         file = await self.get_file(file_id)
         users_ids = [str(user_id) for user_id in users_ids]
@@ -98,26 +129,40 @@ class FileService:
         return urljoin(base, relative_url)
 
     @staticmethod
-    def _compute_sha256(content: bytes) -> str:
-        return hashlib.sha256(content).hexdigest()
+    def is_valid_hash(hash: str) -> bool:
+        return SHA256_PATTERN.match(hash) is not None
 
-    def _file_path(self, hash: str) -> Path:
-        return self.base_dir / hash
+    @staticmethod
+    def _should_compress(file_type: FileType) -> bool:
+        return settings.blob_compression and FileType(file_type).is_compressible()
 
-    def _hash_exists_on_disk(self, hash: str) -> bool:
-        file_path = self._file_path(hash)
-        return file_path.exists()
+    async def _create_file(self, name: str, file_type: FileType, hash: str, users_ids: list[uuid.UUID]) -> File:
+        url = self._generate_url(hash)
+        # the content can't be deleted as unreferenced between the check and the creation of the file
+        async with self.file_repository.lock_hash(hash):
+            if not await self.storage.exists(hash):
+                raise FileNotFoundError()
+            return await self.file_repository.create_file(
+                name=name,
+                content_hash=hash,
+                url=url,
+                file_type=file_type,
+                users_ids=users_ids,
+            )
+
+    async def _delete_unreferenced_content(self, hash: str) -> None:
+        # files with the content can't be created between the check and the deletion of the content
+        async with self.file_repository.lock_hash(hash):
+            if hash not in await self.file_repository.get_referenced_hashes([hash]):
+                await self.storage.delete(hash)
 
     @staticmethod
     def _generate_url(hash: str) -> str:
         return f"/blobs/{hash}"
 
-    def _remove_file_from_disk(self, hash: str) -> None:
-        file_path = self._file_path(hash)
-        file_path.unlink()
-
 
 async def get_file_service(
     file_repository: FileRepository = Depends(get_file_repository),
+    storage: BlobStorage = Depends(get_blob_storage),
 ) -> AsyncGenerator[FileService, None]:
-    yield FileService(file_repository)
+    yield FileService(file_repository, storage)
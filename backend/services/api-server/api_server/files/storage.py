@@ -0,0 +1,434 @@
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, AsyncIterable, AsyncIterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from api_server.settings import settings
+
+CHUNK_SIZE = 64 * 1024
+
+# The gzip trailer keeps the content size modulo 2^32, so larger content is stored uncompressed
+MAX_COMPRESSED_CONTENT_SIZE = 2**32 - 1
+
+
+@dataclass
+class BlobInfo:
+    size: int  # size of the content
+    stored_size: int  # size of the stored bytes, differs from size if the content is compressed
+    encoding: Optional[str] = None  # "gzip" if the content is stored compressed
+
+
+class BlobStorage(ABC):
+    """
+    Storage of the files' content, addressed by the hex-encoded SHA-256 of the content.
+
+    The content can be stored compressed with gzip. The hash, size and ranges always refer to the uncompressed
+    content, the stored bytes can be read as they are to send them to clients accepting gzip.
+    """
+
+    def __init__(self, compression_level: int = 6):
+        self.compression_level = compression_level
+
+    @abstractmethod
+    async def info(self, hash: str) -> BlobInfo:
+        """
+        Raises FileNotFoundError if there is no such content.
+        """
+        pass
+
+    @abstractmethod
+    async def write(self, chunks: AsyncIterable[bytes], compress: bool = False) -> str:
+        """
+        Stores the content read chunk by chunk and returns its hash. If the content is already stored, it's reused.
+        A failed write leaves nothing behind. If compress is set, the content is stored compressed with gzip.
+        """
+        pass
+
+    @abstractmethod
+    def read_stored(self, hash: str) -> AsyncIterator[bytes]:
+        """
+        Reads the stored bytes chunk by chunk, compressed if the content is stored compressed.
+        Raises FileNotFoundError if there is no such content.
+        """
+        pass
+
+    @abstractmethod
+    async def delete(self, hash: str) -> None:
+        pass
+
+    async def exists(self, hash: str) -> bool:
+        try:
+            await self.info(hash)
+        except FileNotFoundError:
+            return False
+        return True
+
+    async def size(self, hash: str) -> int:
+        """
+        Returns the size of the content in bytes. Raises FileNotFoundError if there is no such content.
+        """
+        return (await self.info(hash)).size
+
+    async def read(self, hash: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Reads the uncompressed content from start up to end, both inclusive, chunk by chunk.
+        Raises FileNotFoundError if there is no such content.
+        """
+        info = await self.info(hash)
+        chunks = self.read_stored(hash)
+        if info.encoding == "gzip":
+            chunks = _decompress_gzip(chunks)
+        async for chunk in _slice(chunks, start, end):
+            yield chunk
+
+    def local_path(self, hash: str) -> Optional[Path]:
+        """
+        Returns the path of the stored bytes if they're on the local disk, so they can be served from there.
+        """
+        return None
+
+    @staticmethod
+    def shard_prefix(hash: str, depth: int) -> str:
+        # two characters per level, e.g., "ab/cd" for depth 2, keeps directories and key listings small
+        return "/".join(hash[i * 2 : i * 2 + 2] for i in range(depth))
+
+    def _compress_file(self, source: IO[bytes], target: IO[bytes]) -> None:
+        source.seek(0)
+        # mtime is fixed, so the same content is always compressed to the same bytes
+        with gzip.GzipFile(fileobj=target, mode="wb", compresslevel=self.compression_level, mtime=0) as gzip_file:
+            shutil.copyfileobj(source, gzip_file, CHUNK_SIZE)
+
+
+class LocalBlobStorage(BlobStorage):
+    """
+    Stores the content in a directory on the local disk, sharded by the hash prefix, e.g., base_dir/ab/cd/abcd...
+    Compressed content is stored with the .gz suffix.
+
+    Content stored by the previous versions directly in base_dir is moved to its shard when it's first accessed.
+    """
+
+    def __init__(self, base_dir: Path, shard_depth: int = 2, compression_level: int = 6):
+        super().__init__(compression_level)
+        self.base_dir = base_dir
+        self.shard_depth = shard_depth
+        self._tmp_dir = base_dir / ".tmp"
+        self._tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    async def info(self, hash: str) -> BlobInfo:
+        path = self._resolve(hash)
+        if path is None:
+            raise FileNotFoundError()
+        stored_size = path.stat().st_size
+        if path.suffix != ".gz":
+            return BlobInfo(size=stored_size, stored_size=stored_size)
+        return BlobInfo(size=_read_gzip_size(path), stored_size=stored_size, encoding="gzip")
+
+    async def write(self, chunks: AsyncIterable[bytes], compress: bool = False) -> str:
+        tmp_paths = []
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir, prefix="upload-")
+            tmp_paths.append(tmp_path)
+            with os.fdopen(fd, "w+b") as file:
+                hash, size = await _spool(chunks, file)
+                if self._resolve(hash) is not None:
+                    return hash
+
+                path = self._path(hash)
+                if compress and size <= MAX_COMPRESSED_CONTENT_SIZE:
+                    fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir, prefix="upload-", suffix=".gz")
+                    tmp_paths.append(tmp_path)
+                    with os.fdopen(fd, "wb") as compressed_file:
+                        await run_in_threadpool(self._compress_file, file, compressed_file)
+                    path = path.with_name(f"{hash}.gz")
+
+            # mkstemp creates files readable by the owner only
+            os.chmod(tmp_path, 0o644)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # the rename is atomic, readers never see a partially written file under its hash
+            os.replace(tmp_path, path)
+            return hash
+        finally:
+            for tmp_path in tmp_paths:
+                Path(tmp_path).unlink(missing_ok=True)
+
+    async def read_stored(self, hash: str) -> AsyncIterator[bytes]:
+        path = self._resolve(hash)
+        if path is None:
+            raise FileNotFoundError()
+        with path.open("rb") as file:
+            while chunk := await run_in_threadpool(file.read, CHUNK_SIZE):
+                yield chunk
+
+    async def read(self, hash: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        path = self._resolve(hash)
+        if path is None:
+            raise FileNotFoundError()
+        if path.suffix == ".gz":
+            async for chunk in super().read(hash, start, end):
+                yield chunk
+            return
+
+        # uncompressed content is read from the start of the range right away
+        with path.open("rb") as file:
+            file.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = await run_in_threadpool(
+                    file.read, CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+                )
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    async def delete(self, hash: str) -> None:
+        path = self._resolve(hash)
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    def local_path(self, hash: str) -> Optional[Path]:
+        return self._resolve(hash)
+
+    def _path(self, hash: str) -> Path:
+        return self.base_dir / self.shard_prefix(hash, self.shard_depth) / hash
+
+    def _resolve(self, hash: str) -> Optional[Path]:
+        path = self._path(hash)
+        if path.exists():
+            return path
+        compressed_path = path.with_name(f"{hash}.gz")
+        if compressed_path.exists():
+            return compressed_path
+
+        flat_path = self.base_dir / hash
+        if not flat_path.is_file():
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(flat_path, path)
+        except FileNotFoundError:
+            # moved concurrently by another request or worker process
+            pass
+        return path if path.exists() else None
+
+
+class S3BlobStorage(BlobStorage):
+    """
+    Stores the content in a bucket of S3 or an S3-compatible storage, e.g., MinIO, under keys sharded by the
+    hash prefix. API servers don't need a shared volume then. Requires the boto3 package from the s3 extra.
+
+    Uploads are spooled to a local temporary file while the hash is computed, and then uploaded under the hash.
+    Compressed content is stored with the .gz suffix and the content size in the object's metadata.
+    Credentials are read by boto3 from the environment, e.g., AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        shard_depth: int = 2,
+        compression_level: int = 6,
+    ):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError(
+                "S3 blob storage requires the boto3 package, install the s3 extra of the API server: "
+                "poetry install --extras s3, or pip install boto3"
+            )
+
+        super().__init__(compression_level)
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.shard_depth = shard_depth
+        self._client: Any = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+
+    async def info(self, hash: str) -> BlobInfo:
+        response = await self._head_object(self._key(hash))
+        if response is not None:
+            return BlobInfo(size=response["ContentLength"], stored_size=response["ContentLength"])
+
+        response = await self._head_object(self._key(hash, compressed=True))
+        if response is None:
+            raise FileNotFoundError()
+        return BlobInfo(
+            size=int(response["Metadata"]["content-size"]), stored_size=response["ContentLength"], encoding="gzip"
+        )
+
+    async def write(self, chunks: AsyncIterable[bytes], compress: bool = False) -> str:
+        with tempfile.TemporaryFile() as file:
+            hash, size = await _spool(chunks, file)
+            if await self.exists(hash):
+                return hash
+
+            if compress and size <= MAX_COMPRESSED_CONTENT_SIZE:
+                with tempfile.TemporaryFile() as compressed_file:
+                    await run_in_threadpool(self._compress_file, file, compressed_file)
+                    compressed_file.seek(0)
+                    await run_in_threadpool(
+                        self._client.upload_fileobj,
+                        compressed_file,
+                        self.bucket,
+                        self._key(hash, compressed=True),
+                        ExtraArgs={"Metadata": {"content-size": str(size)}},
+                    )
+            else:
+                file.seek(0)
+                await run_in_threadpool(self._client.upload_fileobj, file, self.bucket, self._key(hash))
+        return hash
+
+    async def read_stored(self, hash: str) -> AsyncIterator[bytes]:
+        info = await self.info(hash)
+        async for chunk in self._get_object(self._key(hash, compressed=info.encoding == "gzip")):
+            yield chunk
+
+    async def read(self, hash: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        info = await self.info(hash)
+        if info.encoding == "gzip":
+            async for chunk in super().read(hash, start, end):
+                yield chunk
+            return
+
+        # uncompressed content is read from the start of the range right away
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        async for chunk in self._get_object(self._key(hash), byte_range):
+            yield chunk
+
+    async def delete(self, hash: str) -> None:
+        for key in (self._key(hash), self._key(hash, compressed=True)):
+            await run_in_threadpool(self._client.delete_object, Bucket=self.bucket, Key=key)
+
+    async def _head_object(self, key: str) -> Optional[dict]:
+        try:
+            return await run_in_threadpool(self._client.head_object, Bucket=self.bucket, Key=key)
+        except self._client.exceptions.ClientError as e:
+            if self._is_not_found(e):
+                return None
+            raise
+
+    async def _get_object(self, key: str, byte_range: Optional[str] = None) -> AsyncIterator[bytes]:
+        kwargs = {"Bucket": self.bucket, "Key": key}
+        if byte_range is not None:
+            kwargs["Range"] = byte_range
+        try:
+            response = await run_in_threadpool(self._client.get_object, **kwargs)
+        except self._client.exceptions.ClientError as e:
+            if self._is_not_found(e):
+                raise FileNotFoundError()
+            raise
+
+        body = response["Body"]
+        try:
+            while chunk := await run_in_threadpool(body.read, CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    def _key(self, hash: str, compressed: bool = False) -> str:
+        key = f"{self.shard_prefix(hash, self.shard_depth)}/{hash}{'.gz' if compressed else ''}"
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    @staticmethod
+    def _is_not_found(error: Exception) -> bool:
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+
+async def _spool(chunks: AsyncIterable[bytes], file: IO[bytes]) -> tuple[str, int]:
+    """
+    Writes the chunks to the file and returns the hash and the size of the content. Writing and hashing run in
+    the thread pool, so a large upload doesn't block the event loop. Small chunks are batched up to CHUNK_SIZE.
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+
+    def write(data: bytes) -> None:
+        sha256.update(data)
+        file.write(data)
+
+    batch = []
+    batch_size = 0
+    async for chunk in chunks:
+        batch.append(chunk)
+        batch_size += len(chunk)
+        size += len(chunk)
+        if batch_size >= CHUNK_SIZE:
+            await run_in_threadpool(write, b"".join(batch))
+            batch = []
+            batch_size = 0
+    if batch:
+        await run_in_threadpool(write, b"".join(batch))
+    return sha256.hexdigest(), size
+
+
+def _read_gzip_size(path: Path) -> int:
+    # the last 4 bytes of a gzip file are the size of the uncompressed content, little-endian
+    with path.open("rb") as file:
+        file.seek(-4, os.SEEK_END)
+        return int.from_bytes(file.read(4), "little")
+
+
+async def _decompress_gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # the output is limited per call, so a small compressed chunk doesn't expand into a huge one in memory
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        while chunk:
+            yield decompressor.decompress(chunk, CHUNK_SIZE)
+            chunk = decompressor.unconsumed_tail
+    yield decompressor.flush()
+
+
+async def _slice(chunks: AsyncIterator[bytes], start: int, end: Optional[int]) -> AsyncIterator[bytes]:
+    position = 0
+    async for chunk in chunks:
+        chunk_start = position
+        position += len(chunk)
+        if position <= start:
+            continue
+        if end is not None and chunk_start > end:
+            break
+        yield chunk[max(start - chunk_start, 0) : None if end is None else end - chunk_start + 1]
+    if hasattr(chunks, "aclose"):
+        await chunks.aclose()
+
+
+_blob_storage: Optional[BlobStorage] = None
+
+
+def get_blob_storage() -> BlobStorage:
+    """
+    Returns the blob storage configured with the blob_storage setting, "local" or "s3".
+    """
+    global _blob_storage
+    if _blob_storage is None:
+        if settings.blob_storage == "local":
+            _blob_storage = LocalBlobStorage(
+                settings.base_dir,
+                shard_depth=settings.blob_storage_shard_depth,
+                compression_level=settings.blob_compression_level,
+            )
+        elif settings.blob_storage == "s3":
+            if not settings.blob_storage_s3_bucket:
+                raise RuntimeError("S3 blob storage requires the blob_storage_s3_bucket setting")
+            _blob_storage = S3BlobStorage(
+                bucket=settings.blob_storage_s3_bucket,
+                prefix=settings.blob_storage_s3_prefix,
+                endpoint_url=settings.blob_storage_s3_endpoint_url,
+                region=settings.blob_storage_s3_region,
+                shard_depth=settings.blob_storage_shard_depth,
+                compression_level=settings.blob_compression_level,
+            )
+        else:
+            raise RuntimeError(f"Unknown blob storage: {settings.blob_storage}, expected local or s3")
+    return _blob_storage
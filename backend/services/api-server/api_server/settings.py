@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 
 from pydantic import HttpUrl, PostgresDsn
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -29,6 +30,16 @@ class Settings(BaseSettings):
     # files
     base_dir: Path = Path('/var/tmp/uploads/')
     blobs_base_public_url: HttpUrl
+    # where the files' content is stored, "local" for base_dir or "s3" for an S3-compatible bucket
+    blob_storage: str = "local"
+    blob_storage_shard_depth: int = 2
+    blob_storage_s3_bucket: Optional[str] = None
+    blob_storage_s3_prefix: str = ""
+    blob_storage_s3_endpoint_url: Optional[str] = None
+    blob_storage_s3_region: Optional[str] = None
+    # store the content of compressible file types, e.g., CSV and JSON, compressed with gzip
+    blob_compression: bool = False
+    blob_compression_level: int = 6
 
     # assets
     blobs_base_internal_url: HttpUrl
@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import AsyncIterator
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from api_server.files.blobs_controller import blob_response
+from api_server.files.storage import LocalBlobStorage
+
+CONTENT = b"case_id,activity,start_time\n" * 1000
+HASH = hashlib.sha256(CONTENT).hexdigest()
+ETAG = f'"{HASH}"'
+GZIP_ETAG = f'"{HASH}-gzip"'
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+async def chunks() -> AsyncIterator[bytes]:
+    yield CONTENT
+
+
+def make_client(tmp_path: Path, compress: bool) -> TestClient:
+    storage = LocalBlobStorage(tmp_path)
+    asyncio.run(storage.write(chunks(), compress=compress))
+
+    app = FastAPI()
+
+    @app.get("/blobs/{hash}")
+    async def get_blob(hash: str, request: Request):
+        return await blob_response(request, storage, hash)
+
+    return TestClient(app)
+
+
+@pytest.fixture(params=[False, True], ids=["uncompressed", "compressed"])
+def client(request, tmp_path: Path) -> TestClient:
+    return make_client(tmp_path, compress=request.param)
+
+
+@pytest.fixture
+def compressed_client(tmp_path: Path) -> TestClient:
+    return make_client(tmp_path, compress=True)
+
+
+def test_serves_content_with_etag(client: TestClient):
+    response = client.get(f"/blobs/{HASH}", headers=IDENTITY)
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["ETag"] == ETAG
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Content-Length"] == str(len(CONTENT))
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+
+def test_missing_content(client: TestClient):
+    response = client.get(f"/blobs/{'0' * 64}", headers=IDENTITY)
+
+    assert response.status_code == 404
+
+
+def test_serves_range(client: TestClient):
+    response = client.get(f"/blobs/{HASH}", headers={**IDENTITY, "Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(CONTENT)}"
+    assert response.headers["Content-Length"] == "10"
+
+
+def test_serves_suffix_range(client: TestClient):
+    response = client.get(f"/blobs/{HASH}", headers={**IDENTITY, "Range": "bytes=-5"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[-5:]
+
+
+@pytest.mark.parametrize("range_header", ["bytes=20-10", "bytes=0-1,5-6", "lines=1-2"])
+def test_ignores_invalid_or_multiple_ranges(client: TestClient, range_header: str):
+    response = client.get(f"/blobs/{HASH}", headers={**IDENTITY, "Range": range_header})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_unsatisfiable_range(client: TestClient):
+    response = client.get(f"/blobs/{HASH}", headers={**IDENTITY, "Range": f"bytes={len(CONTENT)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_serves_range_if_etag_matches_if_range(client: TestClient):
+    response = client.get(f"/blobs/{HASH}", headers={**IDENTITY, "Range": "bytes=0-9", "If-Range": ETAG})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[:10]
+
+
+def test_serves_whole_content_if_if_range_does_not_match(client: TestClient):
+    response = client.get(f"/blobs/{HASH}", headers={**IDENTITY, "Range": "bytes=0-9", "If-Range": '"other"'})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+@pytest.mark.parametrize("if_none_match", [ETAG, f"W/{ETAG}", f'"other", {ETAG}', "*"])
+def test_not_modified(client: TestClient, if_none_match: str):
+    response = client.get(f"/blobs/{HASH}", headers={**IDENTITY, "If-None-Match": if_none_match})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == ETAG
+
+
+def test_not_modified_returns_matched_gzip_etag(compressed_client: TestClient):
+    response = compressed_client.get(f"/blobs/{HASH}", headers={"If-None-Match": GZIP_ETAG})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == GZIP_ETAG
+
+
+def test_serves_compressed_content_to_clients_accepting_gzip(compressed_client: TestClient):
+    response = compressed_client.get(f"/blobs/{HASH}", headers={"Accept-Encoding": "br, gzip;q=0.5"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == GZIP_ETAG
+    assert int(response.headers["Content-Length"]) < len(CONTENT)
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.content == CONTENT
+
+
+@pytest.mark.parametrize("accept_encoding", ["identity", "gzip;q=0", "br", "*;q=0"])
+def test_decompresses_content_for_clients_not_accepting_gzip(compressed_client: TestClient, accept_encoding: str):
+    response = compressed_client.get(f"/blobs/{HASH}", headers={"Accept-Encoding": accept_encoding})
+
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == ETAG
+    assert response.content == CONTENT
+
+
+def test_serves_range_of_uncompressed_content_to_clients_accepting_gzip(compressed_client: TestClient):
+    response = compressed_client.get(f"/blobs/{HASH}", headers={"Accept-Encoding": "gzip", "Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert "Content-Encoding" not in response.headers
+    assert response.content == CONTENT[10:20]
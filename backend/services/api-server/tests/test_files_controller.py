@@ -0,0 +1,167 @@
+import gzip
+import hashlib
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import AsyncIterator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api_server.files import files_controller
+from api_server.files.model import File, FileType
+from api_server.files.service import FileService, get_file_service
+from api_server.files.storage import LocalBlobStorage
+from api_server.users.users import current_user
+
+CONTENT = b"case_id,activity,start_time\n" * 10000
+HASH = hashlib.sha256(CONTENT).hexdigest()
+USER = SimpleNamespace(id=uuid.uuid4(), is_superuser=False)
+
+
+class InMemoryFileRepository:
+    def __init__(self):
+        self.files: dict[uuid.UUID, File] = {}
+
+    async def get_file(self, file_id: uuid.UUID) -> File:
+        if file_id not in self.files:
+            raise FileNotFoundError()
+        return self.files[file_id]
+
+    async def get_file_hash(self, file_id: uuid.UUID) -> str:
+        return (await self.get_file(file_id)).content_hash
+
+    async def get_referenced_hashes(self, hashes: list[str]) -> set[str]:
+        return {file.content_hash for file in self.files.values() if file.deletion_time is None} & set(hashes)
+
+    @asynccontextmanager
+    async def lock_hash(self, hash: str) -> AsyncIterator[None]:
+        yield
+
+    async def create_file(
+        self, name: str, file_type: FileType, content_hash: str, url: str, users_ids: list[uuid.UUID]
+    ) -> File:
+        file = File(
+            id=uuid.uuid4(),
+            creation_time=datetime.utcnow(),
+            name=name,
+            content_hash=content_hash,
+            url=url,
+            type=file_type,
+            users_ids=users_ids,
+        )
+        self.files[file.id] = file
+        return file
+
+    async def delete_file(self, file_id: uuid.UUID) -> None:
+        (await self.get_file(file_id)).deletion_time = datetime.utcnow()
+
+
+@pytest.fixture
+def repository() -> InMemoryFileRepository:
+    return InMemoryFileRepository()
+
+
+@pytest.fixture
+def storage(tmp_path: Path) -> LocalBlobStorage:
+    return LocalBlobStorage(tmp_path)
+
+
+@pytest.fixture
+def client(repository: InMemoryFileRepository, storage: LocalBlobStorage) -> TestClient:
+    app = FastAPI()
+    app.include_router(files_controller.router, prefix="/files")
+    app.dependency_overrides[get_file_service] = lambda: FileService(repository, storage)
+    app.dependency_overrides[current_user] = lambda: USER
+    return TestClient(app)
+
+
+def upload(client: TestClient, **kwargs):
+    return client.post("/files/", params={"name": "log.csv", "type": FileType.EVENT_LOG_CSV.value}, **kwargs)
+
+
+def assert_stored(response, repository: InMemoryFileRepository, storage: LocalBlobStorage):
+    assert response.status_code == 201, response.text
+    file = response.json()
+    assert file["content_hash"] == HASH
+    assert file["url"] == f"/blobs/{HASH}"
+    assert file["users_ids"] == [str(USER.id)]
+    assert uuid.UUID(file["id"]) in repository.files
+    assert storage.local_path(HASH).read_bytes() == CONTENT
+
+
+def test_uploads_raw_body(client: TestClient, repository: InMemoryFileRepository, storage: LocalBlobStorage):
+    response = upload(client, content=CONTENT, headers={"Content-Type": "application/octet-stream"})
+
+    assert_stored(response, repository, storage)
+
+
+def test_uploads_multipart_form(client: TestClient, repository: InMemoryFileRepository, storage: LocalBlobStorage):
+    response = upload(client, files={"file": ("log.csv", CONTENT, "text/csv")})
+
+    assert_stored(response, repository, storage)
+
+
+def test_multipart_form_without_file_field(client: TestClient, repository: InMemoryFileRepository):
+    response = upload(client, data={"name": "log.csv"}, files={"other": ("log.csv", CONTENT)})
+
+    assert response.status_code == 400
+    assert repository.files == {}
+
+
+def test_uploads_gzip_body(client: TestClient, repository: InMemoryFileRepository, storage: LocalBlobStorage):
+    response = upload(client, content=gzip.compress(CONTENT), headers={"Content-Encoding": "gzip"})
+
+    assert_stored(response, repository, storage)
+
+
+def test_uploads_multi_member_gzip_body(
+    client: TestClient, repository: InMemoryFileRepository, storage: LocalBlobStorage
+):
+    half = len(CONTENT) // 2
+    body = gzip.compress(CONTENT[:half]) + gzip.compress(CONTENT[half:])
+
+    response = upload(client, content=body, headers={"Content-Encoding": "gzip"})
+
+    assert_stored(response, repository, storage)
+
+
+@pytest.mark.parametrize("body", [b"not gzip", gzip.compress(CONTENT)[:-100]], ids=["invalid", "truncated"])
+def test_rejects_invalid_gzip_body(
+    client: TestClient, repository: InMemoryFileRepository, storage: LocalBlobStorage, tmp_path: Path, body: bytes
+):
+    response = upload(client, content=body, headers={"Content-Encoding": "gzip"})
+
+    assert response.status_code == 400
+    assert repository.files == {}
+    assert [path for path in tmp_path.rglob("*") if path.is_file()] == []
+
+
+def test_rejects_unsupported_content_encoding(client: TestClient, repository: InMemoryFileRepository):
+    response = upload(client, content=CONTENT, headers={"Content-Encoding": "br"})
+
+    assert response.status_code == 415
+    assert repository.files == {}
+
+
+def test_same_content_is_stored_once(client: TestClient, repository: InMemoryFileRepository, tmp_path: Path):
+    first = upload(client, content=CONTENT)
+    second = upload(client, files={"file": ("log.csv", CONTENT)})
+
+    assert first.json()["id"] != second.json()["id"]
+    assert first.json()["content_hash"] == second.json()["content_hash"] == HASH
+    assert len([path for path in tmp_path.rglob("*") if path.is_file()]) == 1
+
+
+def test_content_is_deleted_with_its_last_file(client: TestClient, storage: LocalBlobStorage):
+    first = upload(client, content=CONTENT).json()
+    second = upload(client, content=CONTENT).json()
+
+    assert client.delete(f"/files/{first['id']}").status_code == 204
+    assert storage.local_path(HASH) is not None
+
+    assert client.delete(f"/files/{second['id']}").status_code == 204
+    assert storage.local_path(HASH) is None
@@ -0,0 +1,118 @@
+import asyncio
+import gzip
+import hashlib
+from pathlib import Path
+from typing import AsyncIterator
+
+import pytest
+
+from api_server.files.storage import LocalBlobStorage
+
+CONTENT = b"case_id,activity,start_time\n" * 1000
+HASH = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture
+def storage(tmp_path: Path) -> LocalBlobStorage:
+    return LocalBlobStorage(tmp_path, shard_depth=2)
+
+
+async def chunks(content: bytes, size: int = 1000) -> AsyncIterator[bytes]:
+    for i in range(0, len(content), size):
+        yield content[i : i + size]
+
+
+async def read_all(iterator: AsyncIterator[bytes]) -> bytes:
+    return b"".join([chunk async for chunk in iterator])
+
+
+def test_write_stores_content_in_shard_of_hash(storage: LocalBlobStorage, tmp_path: Path):
+    hash = asyncio.run(storage.write(chunks(CONTENT)))
+
+    assert hash == HASH
+    assert (tmp_path / HASH[:2] / HASH[2:4] / HASH).read_bytes() == CONTENT
+    assert asyncio.run(storage.size(HASH)) == len(CONTENT)
+    assert asyncio.run(read_all(storage.read(HASH))) == CONTENT
+
+
+def test_write_leaves_no_temporary_files(storage: LocalBlobStorage, tmp_path: Path):
+    asyncio.run(storage.write(chunks(CONTENT)))
+    asyncio.run(storage.write(chunks(CONTENT)))
+
+    assert list((tmp_path / ".tmp").iterdir()) == []
+
+
+def test_failed_write_leaves_nothing_behind(storage: LocalBlobStorage, tmp_path: Path):
+    async def failing_chunks() -> AsyncIterator[bytes]:
+        yield CONTENT
+        raise ConnectionError("Client disconnected")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(storage.write(failing_chunks()))
+
+    assert list((tmp_path / ".tmp").iterdir()) == []
+    assert not asyncio.run(storage.exists(HASH))
+
+
+def test_shard_depth_sets_directory_levels(tmp_path: Path):
+    storage = LocalBlobStorage(tmp_path, shard_depth=1)
+
+    asyncio.run(storage.write(chunks(CONTENT)))
+
+    assert (tmp_path / HASH[:2] / HASH).is_file()
+
+
+def test_flat_content_is_moved_to_its_shard_on_first_access(storage: LocalBlobStorage, tmp_path: Path):
+    flat_path = tmp_path / HASH
+    flat_path.write_bytes(CONTENT)
+
+    assert asyncio.run(storage.exists(HASH))
+    assert asyncio.run(read_all(storage.read(HASH))) == CONTENT
+    assert not flat_path.exists()
+    assert (tmp_path / HASH[:2] / HASH[2:4] / HASH).read_bytes() == CONTENT
+    assert storage.local_path(HASH) == tmp_path / HASH[:2] / HASH[2:4] / HASH
+
+
+def test_write_reuses_flat_content(storage: LocalBlobStorage, tmp_path: Path):
+    (tmp_path / HASH).write_bytes(CONTENT)
+
+    assert asyncio.run(storage.write(chunks(CONTENT))) == HASH
+
+    assert list((tmp_path / HASH[:2] / HASH[2:4]).iterdir()) == [tmp_path / HASH[:2] / HASH[2:4] / HASH]
+
+
+def test_missing_content(storage: LocalBlobStorage):
+    assert not asyncio.run(storage.exists(HASH))
+    assert storage.local_path(HASH) is None
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(storage.info(HASH))
+
+
+def test_delete_removes_content(storage: LocalBlobStorage):
+    asyncio.run(storage.write(chunks(CONTENT)))
+
+    asyncio.run(storage.delete(HASH))
+
+    assert not asyncio.run(storage.exists(HASH))
+
+
+def test_compressed_content_keeps_hash_and_size(storage: LocalBlobStorage, tmp_path: Path):
+    hash = asyncio.run(storage.write(chunks(CONTENT), compress=True))
+    info = asyncio.run(storage.info(HASH))
+
+    assert hash == HASH
+    assert info.encoding == "gzip"
+    assert info.size == len(CONTENT)
+    assert info.stored_size < len(CONTENT)
+    compressed_path = tmp_path / HASH[:2] / HASH[2:4] / f"{HASH}.gz"
+    assert gzip.decompress(compressed_path.read_bytes()) == CONTENT
+    assert asyncio.run(read_all(storage.read_stored(HASH))) == compressed_path.read_bytes()
+    assert asyncio.run(read_all(storage.read(HASH))) == CONTENT
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_read_range(storage: LocalBlobStorage, compress: bool):
+    asyncio.run(storage.write(chunks(CONTENT), compress=compress))
+
+    assert asyncio.run(read_all(storage.read(HASH, 10, 19))) == CONTENT[10:20]
+    assert asyncio.run(read_all(storage.read(HASH, len(CONTENT) - 5))) == CONTENT[-5:]
@@ -0,0 +1,559 @@
+"""
+Async serving mode of the Kronos service, e.g., `uvicorn kronos.asgi:app`.
+
+The routes and JSON responses are the same as in kronos.app, the SQL comes from kronos.queries. Handlers don't block
+the worker: queries run on an asyncpg pool, the independent queries of an endpoint run concurrently on separate
+connections, and the batching discovery runs in the background.
+
+A report uses at most DB_REPORT_CONCURRENCY connections at once, 2 by default, so a report with many queries
+doesn't take most of the pool and concurrent requests don't time out waiting for a connection.
+"""
+import asyncio
+import functools
+import json
+import os
+import zlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional, Tuple
+
+import asyncpg
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+
+from kronos import batching, queries, rollups
+from kronos.cache import ResultCache
+from kronos.errors import DatabaseUnavailable, PoolTimeout, error_response
+
+
+class AsyncDBHandler:
+    """
+    Pool of PostgreSQL connections of the event loop. Settings are the same as for the pool of the Flask app.
+    """
+
+    _pool: Optional[asyncpg.Pool] = None
+    _pool_lock: Optional[asyncio.Lock] = None
+
+    min_size = int(os.environ.get("DB_POOL_MIN_SIZE", 1))
+    max_size = int(os.environ.get("DB_POOL_MAX_SIZE", 10))
+    timeout = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+    report_concurrency = max(int(os.environ.get("DB_REPORT_CONCURRENCY", 2)), 1)
+
+    @classmethod
+    async def open(cls):
+        # NOTE: the lock must be created inside the running event loop
+        cls._pool_lock = asyncio.Lock()
+        try:
+            await cls._get_pool()
+        except DatabaseUnavailable:
+            # the pool is created on the first request then, the service starts even if the database isn't up yet
+            pass
+
+    @classmethod
+    async def _get_pool(cls) -> asyncpg.Pool:
+        if cls._pool is not None:
+            return cls._pool
+
+        async with cls._pool_lock:
+            if cls._pool is None:
+                cls._pool = await cls._create_pool()
+        return cls._pool
+
+    @classmethod
+    async def _create_pool(cls) -> asyncpg.Pool:
+        database_url = os.environ.get("DATABASE_URL")
+        if not database_url:
+            print("DATABASE_URL not set in environment.")
+            raise DatabaseUnavailable()
+
+        try:
+            return await asyncpg.create_pool(database_url, min_size=cls.min_size, max_size=cls.max_size)
+        except (OSError, asyncpg.PostgresError) as e:
+            print("Error connecting to the database:", e)
+            raise DatabaseUnavailable()
+
+    @classmethod
+    async def close(cls):
+        if cls._pool is not None:
+            await cls._pool.close()
+            cls._pool = None
+
+    @classmethod
+    @asynccontextmanager
+    async def connection(cls) -> AsyncIterator[asyncpg.Connection]:
+        pool = await cls._get_pool()
+        try:
+            conn = await pool.acquire(timeout=cls.timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(cls.timeout)
+        except (OSError, asyncpg.PostgresError) as e:
+            print("Error connecting to the database:", e)
+            raise DatabaseUnavailable()
+
+        try:
+            yield conn
+        finally:
+            await pool.release(conn)
+
+    @classmethod
+    def stats(cls) -> dict:
+        size = cls._pool.get_size() if cls._pool is not None else 0
+        idle = cls._pool.get_idle_size() if cls._pool is not None else 0
+        in_use = size - idle
+        return {
+            "in_use": in_use,
+            "size": size,
+            "max_size": cls.max_size,
+            "available": cls.max_size - in_use,
+            "saturation": in_use / cls.max_size if cls.max_size > 0 else 1.0,
+        }
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await AsyncDBHandler.open()
+    yield
+    await AsyncDBHandler.close()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+result_cache = ResultCache.from_env(namespace=queries.sanitize_table_name)
+
+
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable(request: Request, e: DatabaseUnavailable):
+    return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.exception_handler(queries.InvalidRequest)
+async def invalid_request(request: Request, e: queries.InvalidRequest):
+    return JSONResponse({"error": str(e)}, status_code=400)
+
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout(request: Request, e: PoolTimeout):
+    return JSONResponse(error_response(e, "Database is busy, try again later"), status_code=503)
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def compose(text: str, **identifiers: str) -> str:
+    """
+    Puts the quoted identifiers into the query template and turns %s placeholders into asyncpg's $1, $2, ...
+    """
+    parts = text.format(**{key: quote_identifier(value) for key, value in identifiers.items()}).split("%s")
+    return parts[0] + "".join(f"${i}{part}" for i, part in enumerate(parts[1:], start=1))
+
+
+async def ensure_rollup(conn: asyncpg.Connection, table_name: str, rollup: str) -> str:
+    """
+    Returns the name of the rollup table and builds the rollup if it's missing.
+    """
+    rollup_name = rollups.rollup_table_name(table_name, rollup)
+    if await rollup_exists(conn, rollup_name):
+        return rollup_name
+
+    # concurrent requests build the rollup once, the others wait for it
+    async with conn.transaction():
+        await conn.execute(compose(rollups.LOCK_ROLLUP), rollup_name)
+        if not await rollup_exists(conn, rollup_name):
+            await conn.execute(compose(rollups.rollup_query(rollup), rollup=rollup_name, table=table_name))
+    return rollup_name
+
+
+async def rollup_exists(conn: asyncpg.Connection, rollup_name: str) -> bool:
+    return await conn.fetchval("SELECT to_regclass($1)::TEXT", quote_identifier(rollup_name)) is not None
+
+
+async def execute_query(conn: asyncpg.Connection, report: queries.Report, query: queries.Query):
+    identifiers = {"table": report.table_name}
+    if query.rollup is not None:
+        identifiers["rollup"] = await ensure_rollup(conn, report.table_name, query.rollup)
+    if query.column is not None:
+        identifiers["column"] = query.column
+    text = compose(query.text, **identifiers)
+    if query.fetch_one:
+        return await conn.fetchrow(text, *query.params)
+    return await conn.fetch(text, *query.params)
+
+
+async def fetch(report: queries.Report, query: queries.Query, slots: asyncio.Semaphore):
+    async with slots, AsyncDBHandler.connection() as conn:
+        return await execute_query(conn, report, query)
+
+
+async def run_report(report: queries.Report) -> JSONResponse:
+    """
+    Runs the queries of the report concurrently, on at most DB_REPORT_CONCURRENCY connections,
+    and returns the JSON response.
+    """
+    try:
+        names = list(report.queries)
+        # the rollups are built before the queries run, so the queries don't build the same rollup concurrently
+        report_rollups = {query.rollup for query in report.queries.values() if query.rollup is not None}
+        if report_rollups:
+            async with AsyncDBHandler.connection() as conn:
+                for rollup in sorted(report_rollups):
+                    await ensure_rollup(conn, report.table_name, rollup)
+
+        slots = asyncio.Semaphore(min(len(names), AsyncDBHandler.report_concurrency) or 1)
+        rows = await asyncio.gather(*(fetch(report, report.queries[name], slots) for name in names))
+        return JSONResponse(report.build(dict(zip(names, rows))))
+    except (DatabaseUnavailable, PoolTimeout):
+        raise
+    except Exception as e:
+        print("Error executing query:", e)
+        return JSONResponse(error_response(e), status_code=500)
+
+
+async def fetch_table_version(conn: asyncpg.Connection, jobid: str) -> Optional[str]:
+    oid = await conn.fetchval(compose(queries.TABLE_VERSION), quote_identifier(queries.result_table_name(jobid)))
+    return None if oid is None else str(oid)
+
+
+async def get_table_version(jobid: str, conn: Optional[asyncpg.Connection] = None) -> Optional[str]:
+    """
+    Returns the version of the job's table the cached responses are keyed by, a connection is only needed
+    if the version isn't remembered.
+    """
+    if not result_cache.needs_version:
+        return None
+    version = result_cache.known_version(jobid)
+    if version is None:
+        if conn is None:
+            async with AsyncDBHandler.connection() as conn:
+                version = await fetch_table_version(conn, jobid)
+        else:
+            version = await fetch_table_version(conn, jobid)
+        result_cache.remember_version(jobid, version)
+    return version
+
+
+def cached(endpoint: Callable) -> Callable:
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        version = await get_table_version(kwargs["jobid"])
+
+        value = result_cache.get(endpoint.__name__, kwargs, version)
+        if value is not None:
+            return Response(value[0], media_type=value[1])
+
+        response = await endpoint(**kwargs)
+        if response.status_code == 200:
+            result_cache.set(endpoint.__name__, kwargs, (response.body, response.media_type), version)
+        return response
+
+    return wrapper
+
+
+@app.post("/batch/{jobid}")
+async def batch(jobid: str, request: Request):
+    """
+    Computes several metrics of the job in one request on one connection. Queries shared by the metrics run once,
+    cached metrics aren't computed again. Each result carries its own status, a failing metric doesn't fail the batch.
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    metrics = queries.batch_metrics(jobid, body)
+
+    results = []
+    rows_by_query = {}
+    async with AsyncDBHandler.connection() as conn:
+        version = await get_table_version(jobid, conn)
+
+        for metric in metrics:
+            kwargs = {"jobid": jobid, **metric.params}
+            result = {"name": metric.name, "params": metric.params}
+
+            cached = result_cache.get(metric.name, kwargs, version)
+            if cached is not None:
+                results.append({**result, "status": 200, "data": json.loads(cached[0])})
+                continue
+
+            try:
+                rows = {}
+                for name, query in metric.report.queries.items():
+                    key = queries.query_key(metric.report, query)
+                    if key not in rows_by_query:
+                        rows_by_query[key] = await execute_query(conn, metric.report, query)
+                    rows[name] = rows_by_query[key]
+                data = metric.report.build(rows)
+                response = JSONResponse(data)
+            except Exception as e:
+                print("Error executing query:", e)
+                results.append({**result, "status": 500, **error_response(e)})
+                continue
+
+            result_cache.set(metric.name, kwargs, (response.body, response.media_type), version)
+            results.append({**result, "status": 200, "data": data})
+
+    return JSONResponse({"results": results})
+
+
+@app.get("/db_pool_stats")
+async def db_pool_stats():
+    return AsyncDBHandler.stats()
+
+
+async def request_body(request: Request) -> AsyncIterator[bytes]:
+    decompressor = None
+    if request.headers.get("content-encoding") == "gzip":
+        decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+
+    async for chunk in request.stream():
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        if chunk:
+            yield chunk
+
+    if decompressor is not None:
+        chunk = decompressor.flush()
+        if chunk:
+            yield chunk
+
+
+async def read_header(body: AsyncIterator[bytes]) -> Tuple[str, AsyncIterator[bytes]]:
+    """
+    Reads the body up to the end of the header line, returns the header and the rest of the body.
+    """
+    buffer = b""
+    async for chunk in body:
+        buffer += chunk
+        if b"\n" in buffer:
+            break
+    header, _, remainder = buffer.partition(b"\n")
+
+    async def rest() -> AsyncIterator[bytes]:
+        if remainder:
+            yield remainder
+        async for chunk in body:
+            yield chunk
+
+    return header.decode("utf-8").strip(), rest()
+
+
+@app.post("/create_table/{jobid}")
+async def create_table(jobid: str, request: Request):
+    # only the header line is read here, the rest of the body is streamed to the database as is
+    try:
+        csv_header, csv_body = await read_header(request_body(request))
+    except (zlib.error, UnicodeDecodeError) as e:
+        return JSONResponse(error_response(e, "Cannot read CSV data"), status_code=400)
+
+    if csv_header == "":
+        return JSONResponse({"error": "No CSV data provided"}, status_code=400)
+
+    # map headers to database column names, the column list in COPY makes the import independent of the column order
+    columns = queries.csv_columns(csv_header)
+
+    table_name = queries.result_table_name(jobid)
+
+    async with AsyncDBHandler.connection() as conn:
+        # create table, the table and its rollups are replaced if the upload is retried
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            for rollup in rollups.ROLLUPS:
+                rollup_name = rollups.rollup_table_name(table_name, rollup)
+                await conn.execute(compose("DROP TABLE IF EXISTS {rollup}", rollup=rollup_name))
+            await conn.execute(compose("DROP TABLE IF EXISTS {table}", table=table_name))
+            await conn.execute(compose(queries.CREATE_RESULT_TABLE, table=table_name))
+        except Exception as e:
+            await transaction.rollback()
+            print("Error creating table:", e)
+            return JSONResponse(error_response(e), status_code=500)
+
+        # import CSV, the table is committed only together with the data, so a failed upload leaves nothing behind
+        try:
+            await conn.copy_to_table(table_name, source=csv_body, columns=columns, format="csv")
+            await transaction.commit()
+        except Exception as e:
+            await transaction.rollback()
+            print("Error inserting data:", e)
+            return JSONResponse({"error": "Cannot import CSV file into the database"}, status_code=500)
+
+        # the job's table has been replaced, responses cached for the previous one are stale
+        result_cache.invalidate(jobid)
+
+        # index the table once it's loaded, bulk loading into an unindexed table is faster
+        try:
+            async with conn.transaction():
+                for suffix, index_columns in queries.RESULT_TABLE_INDEXES:
+                    index_name = queries.index_name(table_name, suffix)
+                    await conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {quote_identifier(index_name)} "
+                        f"ON {quote_identifier(table_name)} ({index_columns})"
+                    )
+                await conn.execute(compose("ANALYZE {table}", table=table_name))
+        except Exception as e:
+            print("Error indexing table:", e)
+            return JSONResponse(error_response(e), status_code=500)
+
+        # precompute the aggregates served by the dashboard endpoints
+        try:
+            async with conn.transaction():
+                for rollup in rollups.ROLLUPS:
+                    # requests could have built the rollup since the table was committed
+                    rollup_name = rollups.rollup_table_name(table_name, rollup)
+                    await conn.execute(compose(rollups.LOCK_ROLLUP), rollup_name)
+                    await conn.execute(compose(rollups.rollup_query(rollup), rollup=rollup_name, table=table_name))
+        except Exception as e:
+            print("Error creating rollups:", e)
+            return JSONResponse(error_response(e), status_code=500)
+
+    return {"message": "Table created successfully", "table_name": table_name}
+
+
+# NOTE: the batching strategies endpoints are plain functions, FastAPI runs them in the thread pool
+@app.get("/batching_strategies/{jobid}")
+def batching_strategies(jobid: str):
+    # the discovery takes long, it runs in the background and its result is stored,
+    # 202 is returned with the status of the job until the result is available
+    characteristics = batching.get_result(jobid)
+    if characteristics is not None:
+        return characteristics
+
+    status = batching.submit(jobid)
+    if status["status"] == batching.FAILED:
+        return JSONResponse({"error": status["error"]}, status_code=500)
+    return JSONResponse(status, status_code=202)
+
+
+@app.post("/batching_strategies/{jobid}")
+def submit_batching_strategies(jobid: str):
+    # runs the discovery again, the stored result is reused if the event log hasn't changed
+    return JSONResponse(batching.submit(jobid, force=True), status_code=202)
+
+
+@app.get("/batching_strategies/{jobid}/status")
+def batching_strategies_status(jobid: str):
+    status = batching.get_status(jobid)
+    if status is None:
+        return JSONResponse({"error": f"No batching strategies job for jobid {jobid}"}, status_code=404)
+    return status
+
+
+@app.get("/overview/{jobid}")
+@cached
+async def overview(jobid: str):
+    return await run_report(queries.overview(jobid))
+
+
+@app.get("/wt_overview/{jobid}/{wt_type}")
+@cached
+async def wt_overview(jobid: str, wt_type: str):
+    return await run_report(queries.wt_overview(jobid, wt_type))
+
+
+@app.get("/wt_overview/{jobid}/{wt_type}/{sourceactivity}/{destinationactivity}")
+@cached
+async def wt_overview_activity(jobid: str, wt_type: str, sourceactivity: str, destinationactivity: str):
+    return await run_report(queries.wt_overview_activity(jobid, wt_type, sourceactivity, destinationactivity))
+
+
+@app.get("/potential_cte/{jobid}")
+@cached
+async def potential_cte(jobid: str):
+    return await run_report(queries.potential_cte(jobid))
+
+
+@app.get("/potential_cte_filtered/{jobid}/{source_activity}/{destination_activity}")
+@cached
+async def potential_cte_filtered(jobid: str, source_activity: str, destination_activity: str):
+    return await run_report(queries.potential_cte_filtered(jobid, source_activity, destination_activity))
+
+
+@app.get("/cte_improvement/{jobid}")
+@cached
+async def cte_improvement(jobid: str):
+    return await run_report(queries.cte_improvement(jobid))
+
+
+@app.get("/case_overview/{jobid}/{sourceactivity}/{destinationactivity}")
+@cached
+async def case_overview(jobid: str, sourceactivity: str, destinationactivity: str):
+    return await run_report(queries.case_overview(jobid, sourceactivity, destinationactivity))
+
+
+@app.get("/daily_summary/{jobid}")
+@cached
+async def daily_summary(jobid: str):
+    return await run_report(queries.daily_summary(jobid))
+
+
+@app.get("/daily_summary/{jobid}/{sourceactivity}/{destinationactivity}")
+@cached
+async def daily_summary_specific_pair(jobid: str, sourceactivity: str, destinationactivity: str):
+    return await run_report(queries.daily_summary_specific_pair(jobid, sourceactivity, destinationactivity))
+
+
+@app.get("/activity_transitions/{jobid}")
+@cached
+async def all_activity_transitions(jobid: str):
+    return await run_report(queries.all_activity_transitions(jobid))
+
+
+@app.get("/activity_wt/{jobid}")
+@cached
+async def activity_wt(jobid: str):
+    return await run_report(queries.activity_wt(jobid))
+
+
+@app.get("/activity_avg_wt/{jobid}")
+@cached
+async def activity_avg_wt(jobid: str):
+    return await run_report(queries.activity_avg_wt(jobid))
+
+
+@app.get("/activity_transitions_average/{jobid}")
+@cached
+async def activity_transitions_average(jobid: str):
+    return await run_report(queries.activity_transitions_average(jobid))
+
+
+@app.get("/activity_transitions_average_case/{jobid}")
+@cached
+async def activity_transitions_average_case(jobid: str):
+    return await run_report(queries.activity_transitions_average_case(jobid))
+
+
+@app.get("/activity_resource_wt/{jobid}")
+@cached
+async def activity_resource_wt(jobid: str):
+    return await run_report(queries.activity_resource_wt(jobid))
+
+
+@app.get("/activity_transitions_by_resource/{jobid}/{sourceactivity}/{destinationactivity}")
+@cached
+async def activity_transitions_by_resource(jobid: str, sourceactivity: str, destinationactivity: str):
+    return await run_report(queries.activity_transitions_by_resource(jobid, sourceactivity, destinationactivity))
+
+
+@app.get("/activity_transitions_avg_by_resource/{jobid}/{sourceactivity}/{destinationactivity}")
+@cached
+async def activity_transitions_avg_by_resource(jobid: str, sourceactivity: str, destinationactivity: str):
+    return await run_report(queries.activity_transitions_avg_by_resource(jobid, sourceactivity, destinationactivity))
+
+
+@app.get("/activity_transitions/{jobid}/{sourceactivity}/{targetactivity}")
+@cached
+async def specific_activity_transitions(jobid: str, sourceactivity: str, targetactivity: str):
+    return await run_report(queries.specific_activity_transitions(jobid, sourceactivity, targetactivity))
+
+
+@app.get("/activity_date_range_global/{jobid}")
+@cached
+async def activity_date_range_global(jobid: str):
+    return await run_report(queries.activity_date_range_global(jobid))
+
+
+@app.get("/activity_pairs/{jobid}")
+@cached
+async def activity_pairs(jobid: str):
+    return await run_report(queries.activity_pairs(jobid))
@@ -0,0 +1,282 @@
+"""
+Discovery of batching strategies as background jobs.
+
+A submitted job downloads the job's event log, discovers the batching characteristics and stores them in the database
+keyed by the job ID and the hash of the event log and its column mapping. The event log is downloaded again when a job
+is resubmitted, but the characteristics are only recomputed when the hash has changed.
+
+Jobs run in a thread pool of the process that submitted them, BATCHING_WORKERS threads at most. The job table
+deduplicates submissions across processes: a job is only started if it isn't pending or running already.
+Every start of a job is a new attempt, a run only updates the job's status while its attempt is the latest one,
+so a lost run that is started again can't overwrite the status of the new run.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+
+import requests
+from pix_framework.discovery.batch_processing.batch_characteristics import discover_batch_processing_and_characteristics
+from pix_framework.enhancement.start_time_estimator.config import (
+    ConcurrencyOracleType,
+    Configuration,
+    ReEstimationMethod,
+    ResourceAvailabilityType,
+)
+from pix_framework.enhancement.start_time_estimator.estimator import StartTimeEstimator
+from pix_framework.io.event_log import EventLogIDs, read_csv_log
+from psycopg2.extras import Json
+
+from kronos.db import DBHandler
+
+JOBS_BASE_URL = "http://154.56.63.127:8080"
+
+# Connect and read timeouts of the requests fetching the job's details and event log
+REQUEST_TIMEOUT = (10, 300)
+
+PENDING = "pending"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+_CREATE_TABLES = """
+    CREATE TABLE IF NOT EXISTS batching_strategies_jobs (
+        jobid TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        attempt INTEGER NOT NULL DEFAULT 1,
+        content_hash TEXT,
+        error TEXT,
+        submitted_at TIMESTAMP NOT NULL DEFAULT now(),
+        finished_at TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS batching_strategies_results (
+        jobid TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        characteristics JSONB NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT now(),
+        PRIMARY KEY (jobid, content_hash)
+    );
+"""
+
+# Serializes the creation of the tables across processes, CREATE TABLE IF NOT EXISTS isn't atomic
+_LOCK_TABLES = "SELECT pg_advisory_xact_lock(hashtext('batching_strategies_tables'))"
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+_tables_created = False
+
+max_workers = int(os.environ.get("BATCHING_WORKERS", 1))
+# Jobs pending or running for longer than this are considered lost, e.g., because their process was restarted
+job_timeout = int(os.environ.get("BATCHING_JOB_TIMEOUT", 3600))
+
+
+class JobDataUnavailable(Exception):
+    pass
+
+
+def submit(jobid: str, force: bool = False) -> dict:
+    """
+    Starts a job unless one is pending or running already, and returns the job's status.
+    Without force, a job that has already finished or failed isn't started again.
+    """
+    _ensure_tables()
+    with DBHandler.cursor() as cur:
+        condition = "" if force else f"AND batching_strategies_jobs.status NOT IN ('{FINISHED}', '{FAILED}')"
+        cur.execute(
+            f"""
+            INSERT INTO batching_strategies_jobs (jobid, status) VALUES (%s, %s)
+            ON CONFLICT (jobid) DO UPDATE
+                SET
+                    status = EXCLUDED.status,
+                    attempt = batching_strategies_jobs.attempt + 1,
+                    error = NULL,
+                    submitted_at = now(),
+                    finished_at = NULL
+                WHERE (
+                    batching_strategies_jobs.status NOT IN ('{PENDING}', '{RUNNING}')
+                    OR batching_strategies_jobs.submitted_at < now() - make_interval(secs => %s)
+                ) {condition}
+            RETURNING attempt
+            """,
+            (jobid, PENDING, job_timeout),
+        )
+        row = cur.fetchone()
+
+    if row is not None:
+        _get_executor().submit(_run, jobid, row[0])
+    return get_status(jobid)
+
+
+def get_status(jobid: str) -> Optional[dict]:
+    _ensure_tables()
+    with DBHandler.cursor() as cur:
+        cur.execute(
+            """
+            SELECT status, content_hash, error, submitted_at, finished_at
+            FROM batching_strategies_jobs WHERE jobid = %s
+            """,
+            (jobid,),
+        )
+        row = cur.fetchone()
+
+    if row is None:
+        return None
+    return {
+        "jobid": jobid,
+        "status": row[0],
+        "content_hash": row[1],
+        "error": row[2],
+        "submitted_at": row[3].strftime("%Y-%m-%d %H:%M:%S"),
+        "finished_at": row[4].strftime("%Y-%m-%d %H:%M:%S") if row[4] else None,
+    }
+
+
+def get_result(jobid: str) -> Optional[list]:
+    """
+    Returns the batching characteristics of the job's latest finished run.
+    """
+    _ensure_tables()
+    with DBHandler.cursor() as cur:
+        cur.execute(
+            """
+            SELECT results.characteristics
+            FROM batching_strategies_jobs AS jobs
+            JOIN batching_strategies_results AS results
+                ON results.jobid = jobs.jobid AND results.content_hash = jobs.content_hash
+            WHERE jobs.jobid = %s
+            """,
+            (jobid,),
+        )
+        row = cur.fetchone()
+    return row[0] if row is not None else None
+
+
+def discover_batching_strategies(event_log_path: Path, column_mapping: dict) -> list:
+    """
+    Discovers the batching strategies from the event log. It's a blocking, CPU-bound call.
+    """
+    log_ids = EventLogIDs(
+        case=column_mapping.get("case", "case"),
+        activity=column_mapping.get("activity", "activity"),
+        start_time=column_mapping.get("start_timestamp", "start_time"),
+        end_time=column_mapping.get("end_timestamp", "end_time"),
+        resource=column_mapping.get("resource", "resource"),
+    )
+
+    event_log = read_csv_log(log_path=event_log_path, log_ids=log_ids, sort=False)
+
+    configuration = Configuration(
+        log_ids=log_ids,
+        concurrency_oracle_type=ConcurrencyOracleType.HEURISTICS,
+        re_estimation_method=ReEstimationMethod.MODE,
+        resource_availability_type=ResourceAvailabilityType.SIMPLE,
+    )
+
+    extended_event_log = StartTimeEstimator(event_log, configuration).estimate()
+    return discover_batch_processing_and_characteristics(event_log=extended_event_log, log_ids=log_ids)
+
+
+def fetch_job_inputs(jobid: str, directory: Path) -> Tuple[dict, Path, str]:
+    """
+    Downloads the job's event log into the directory and returns the column mapping, the path to the event log,
+    and the hash of both.
+    """
+    # Fetch column_mapping first
+    response = requests.get(f"{JOBS_BASE_URL}/jobs/{jobid}", timeout=REQUEST_TIMEOUT)
+    if response.status_code != 200:
+        raise JobDataUnavailable(f"Failed to retrieve job details for jobid {jobid}")
+    column_mapping = response.json().get("column_mapping", {})
+
+    content_hash = hashlib.sha256()
+    content_hash.update(json.dumps(column_mapping, sort_keys=True).encode("utf-8"))
+
+    # Fetch the CSV
+    event_log_path = directory / "event_log.csv"
+    with requests.get(
+        f"{JOBS_BASE_URL}/assets/results/{jobid}/event_log.csv", stream=True, timeout=REQUEST_TIMEOUT
+    ) as response:
+        if response.status_code != 200:
+            raise JobDataUnavailable(f"Failed to retrieve CSV for jobid {jobid}")
+        with event_log_path.open("wb") as f:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                content_hash.update(chunk)
+                f.write(chunk)
+
+    return column_mapping, event_log_path, content_hash.hexdigest()
+
+
+def _run(jobid: str, attempt: int):
+    try:
+        _set_status(jobid, attempt, RUNNING)
+
+        # each job works in its own directory, concurrent jobs don't share files
+        with tempfile.TemporaryDirectory(prefix="kronos-batching-") as directory:
+            column_mapping, event_log_path, content_hash = fetch_job_inputs(jobid, Path(directory))
+
+            with DBHandler.cursor() as cur:
+                cur.execute(
+                    "SELECT 1 FROM batching_strategies_results WHERE jobid = %s AND content_hash = %s",
+                    (jobid, content_hash),
+                )
+                is_computed = cur.fetchone() is not None
+
+            if not is_computed:
+                characteristics = discover_batching_strategies(event_log_path, column_mapping)
+                with DBHandler.cursor() as cur:
+                    cur.execute(
+                        """
+                        INSERT INTO batching_strategies_results (jobid, content_hash, characteristics)
+                        VALUES (%s, %s, %s)
+                        ON CONFLICT (jobid, content_hash) DO NOTHING
+                        """,
+                        (jobid, content_hash, Json(characteristics, dumps=lambda obj: json.dumps(obj, default=str))),
+                    )
+
+        _set_status(jobid, attempt, FINISHED, content_hash=content_hash)
+    except Exception as e:
+        print("Error discovering batching strategies:", e)
+        _set_status(jobid, attempt, FAILED, error=str(e))
+
+
+def _set_status(
+    jobid: str, attempt: int, status: str, content_hash: Optional[str] = None, error: Optional[str] = None
+):
+    # a run started again after the timeout has a newer attempt, the status of the older run is ignored then
+    is_done = status in (FINISHED, FAILED)
+    with DBHandler.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE batching_strategies_jobs
+            SET
+                status = %s,
+                content_hash = COALESCE(%s, content_hash),
+                error = %s,
+                finished_at = CASE WHEN %s THEN now() ELSE NULL END
+            WHERE jobid = %s AND attempt = %s
+            """,
+            (status, content_hash, error, is_done, jobid, attempt),
+        )
+
+
+def _ensure_tables():
+    global _tables_created
+    if not _tables_created:
+        with DBHandler.cursor() as cur:
+            cur.execute(_LOCK_TABLES)
+            cur.execute(_CREATE_TABLES)
+        _tables_created = True
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+    # NOTE: gunicorn forks workers, threads of the parent process don't exist in the workers
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batching")
+            _executor_pid = os.getpid()
+    return _executor
@@ -0,0 +1,233 @@
+"""
+Cache of the responses of the read endpoints.
+
+Result tables are write-once, so a response stays valid until the table of the job is imported again.
+Responses are cached per table, and all entries of a table are dropped when the table is recreated.
+
+The cache is kept in the memory of the process by default. Each gunicorn worker then has its own cache
+and doesn't see the invalidations made by the others, so the entries are also keyed by the version of the table,
+its OID that changes whenever the table is recreated. The version of a job is looked up with a catalog query and
+remembered for CACHE_VERSION_TTL seconds, 5 by default, so cache hits don't need a database connection. A worker
+that hasn't seen the import then serves responses computed from the previous table for at most that long.
+Set CACHE_REDIS_URL to share the cache, and its invalidations, between the workers.
+The redis package must be installed for that.
+"""
+import functools
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from flask import Response
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Cached response body and its mimetype
+CachedResponse = Tuple[bytes, str]
+
+
+class CacheBackend(ABC):
+    # whether the invalidations reach all processes, otherwise the entries are keyed by the table version
+    is_shared = False
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        pass
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: CachedResponse):
+        pass
+
+    @abstractmethod
+    def invalidate(self, namespace: str):
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Thread-safe LRU cache with a limit on the number of entries and their age.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Tuple[str, str], Tuple[float, CachedResponse]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    def set(self, namespace: str, key: str, value: CachedResponse):
+        with self._lock:
+            self._entries[(namespace, key)] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: str):
+        with self._lock:
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == namespace]:
+                del self._entries[entry_key]
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache shared between processes. The entries of a table are kept in one Redis hash, so they can be dropped
+    at once. Eviction of the least recently used tables is left to Redis' maxmemory policy.
+    """
+
+    is_shared = True
+
+    def __init__(self, url: str, ttl: float):
+        if redis is None:
+            raise RuntimeError("CACHE_REDIS_URL is set, but the redis package is not installed")
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        data = self._client.hmget(self._hash_name(namespace), f"{key}:data", f"{key}:mimetype")
+        if data[0] is None or data[1] is None:
+            return None
+        return data[0], data[1].decode("utf-8")
+
+    def set(self, namespace: str, key: str, value: CachedResponse):
+        hash_name = self._hash_name(namespace)
+        with self._client.pipeline() as pipeline:
+            pipeline.hset(hash_name, mapping={f"{key}:data": value[0], f"{key}:mimetype": value[1]})
+            pipeline.expire(hash_name, int(self.ttl))
+            pipeline.execute()
+
+    def invalidate(self, namespace: str):
+        self._client.delete(self._hash_name(namespace))
+
+    @staticmethod
+    def _hash_name(namespace: str) -> str:
+        return f"kronos:cache:{namespace}"
+
+
+class ResultCache:
+    """
+    Caches successful responses of the decorated views. Views must take the job ID as the jobid argument,
+    the namespace function maps it to the namespace used for the invalidation, e.g., the table name.
+
+    If the backend isn't shared, the version function maps the job ID to the version of its table, or None
+    if there is no table, and responses are cached per version. Responses aren't cached without a version then.
+    Versions are remembered for version_ttl seconds, the versions of missing tables aren't remembered.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        namespace: Callable[[str], str],
+        version: Optional[Callable[[str], Optional[str]]] = None,
+        version_ttl: float = 5,
+        max_versions: int = 1024,
+    ):
+        self.backend = backend
+        self.namespace = namespace
+        self.version = version
+        self.version_ttl = version_ttl
+        self.max_versions = max_versions
+        self._versions: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+        self._versions_lock = threading.Lock()
+
+    @classmethod
+    def from_env(
+        cls, namespace: Callable[[str], str], version: Optional[Callable[[str], Optional[str]]] = None
+    ) -> "ResultCache":
+        ttl = float(os.environ.get("CACHE_TTL", 300))
+        redis_url = os.environ.get("CACHE_REDIS_URL")
+        if redis_url:
+            backend = RedisCacheBackend(redis_url, ttl)
+        else:
+            backend = MemoryCacheBackend(int(os.environ.get("CACHE_MAX_ENTRIES", 1024)), ttl)
+        version_ttl = float(os.environ.get("CACHE_VERSION_TTL", 5))
+        return cls(backend, namespace, version, version_ttl=version_ttl)
+
+    @property
+    def needs_version(self) -> bool:
+        return not self.backend.is_shared
+
+    def known_version(self, jobid: str) -> Optional[str]:
+        """
+        Returns the remembered version of the job's table, or None if it has to be looked up.
+        """
+        with self._versions_lock:
+            entry = self._versions.get(jobid)
+            if entry is None:
+                return None
+            expires_at, version = entry
+            if expires_at < time.monotonic():
+                del self._versions[jobid]
+                return None
+            self._versions.move_to_end(jobid)
+            return version
+
+    def remember_version(self, jobid: str, version: Optional[str]):
+        # a missing table can be created any time, so its absence isn't remembered
+        if version is None:
+            return
+        with self._versions_lock:
+            self._versions[jobid] = (time.monotonic() + self.version_ttl, version)
+            self._versions.move_to_end(jobid)
+            while len(self._versions) > self.max_versions:
+                self._versions.popitem(last=False)
+
+    def get(self, view_name: str, kwargs: dict, version: Optional[str] = None) -> Optional[CachedResponse]:
+        if self.needs_version and version is None:
+            return None
+        return self.backend.get(self.namespace(kwargs["jobid"]), self._key(view_name, kwargs, version))
+
+    def set(self, view_name: str, kwargs: dict, value: CachedResponse, version: Optional[str] = None):
+        if self.needs_version and version is None:
+            return
+        self.backend.set(self.namespace(kwargs["jobid"]), self._key(view_name, kwargs, version), value)
+
+    def cached(self, view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            version = self._get_version(kwargs["jobid"])
+            value = self.get(view.__name__, kwargs, version)
+            if value is not None:
+                return Response(value[0], mimetype=value[1])
+
+            response = view(**kwargs)
+            # error responses are returned as tuples with the status code, only successful responses are cached
+            if isinstance(response, Response) and response.status_code == 200:
+                self.set(view.__name__, kwargs, (response.get_data(), response.mimetype), version)
+            return response
+
+        return wrapper
+
+    def invalidate(self, jobid: str):
+        with self._versions_lock:
+            self._versions.pop(jobid, None)
+        self.backend.invalidate(self.namespace(jobid))
+
+    def _get_version(self, jobid: str) -> Optional[str]:
+        if not self.needs_version or self.version is None:
+            return None
+        version = self.known_version(jobid)
+        if version is None:
+            version = self.version(jobid)
+            self.remember_version(jobid, version)
+        return version
+
+    @staticmethod
+    def _key(view_name: str, kwargs: dict, version: Optional[str] = None) -> str:
+        key = "/".join([view_name] + [f"{name}={kwargs[name]}" for name in sorted(kwargs)])
+        return key if version is None else f"{key}@{version}"
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from urllib.parse import urlparse
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_INERROR
+from psycopg2.extensions import connection as connection_type
+from psycopg2.extensions import cursor as cursor_type
+from psycopg2.pool import ThreadedConnectionPool
+
+from kronos import queries
+from kronos.errors import DatabaseUnavailable, PoolTimeout
+
+
+class DBHandler:
+    """
+    Process-wide pool of PostgreSQL connections.
+
+    Connections are opened lazily on the first checkout and reused afterwards. The pool is bounded by
+    DB_POOL_MAX_SIZE, a caller waits at most DB_POOL_TIMEOUT seconds for a free connection before PoolTimeout
+    is raised. Use DBHandler.connection() or DBHandler.cursor() so connections are always returned to the pool.
+    """
+
+    _pool: Optional[ThreadedConnectionPool] = None
+    _pool_pid: Optional[int] = None
+    _pool_lock = threading.Lock()
+    _slots: Optional[threading.BoundedSemaphore] = None
+
+    min_size = int(os.environ.get("DB_POOL_MIN_SIZE", 1))
+    max_size = int(os.environ.get("DB_POOL_MAX_SIZE", 10))
+    timeout = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+
+    _stats_lock = threading.Lock()
+    _stats = {
+        "in_use": 0,
+        "waiting": 0,
+        "checkouts_total": 0,
+        "timeouts_total": 0,
+        "discarded_total": 0,
+        "wait_seconds_total": 0.0,
+        "wait_seconds_max": 0.0,
+    }
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def sanitize_table_name(name):
+        return queries.sanitize_table_name(name)
+
+    @classmethod
+    @contextmanager
+    def connection(cls) -> Iterator[connection_type]:
+        """
+        Checks a connection out of the pool and returns it when the block exits. The transaction is committed
+        if the block succeeds and rolled back otherwise.
+        """
+        pool = cls._get_pool()
+        conn = cls._checkout(pool)
+        discard = False
+        try:
+            yield conn
+            if conn.get_transaction_status() == TRANSACTION_STATUS_INERROR:
+                conn.rollback()
+            else:
+                conn.commit()
+        except Exception as e:
+            discard = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+            raise
+        finally:
+            cls._checkin(pool, conn, discard=discard or bool(conn.closed))
+
+    @classmethod
+    @contextmanager
+    def cursor(cls) -> Iterator[cursor_type]:
+        """
+        Checks a connection out of the pool and yields a cursor on it.
+        """
+        with cls.connection() as conn:
+            with conn.cursor() as cur:
+                yield cur
+
+    @classmethod
+    def stats(cls) -> dict:
+        """
+        Returns pool saturation metrics of the current process.
+        """
+        with cls._stats_lock:
+            stats = dict(cls._stats)
+        stats["max_size"] = cls.max_size
+        stats["available"] = cls.max_size - stats["in_use"]
+        stats["saturation"] = stats["in_use"] / cls.max_size if cls.max_size > 0 else 1.0
+        return stats
+
+    @classmethod
+    def _get_pool(cls) -> ThreadedConnectionPool:
+        # NOTE: gunicorn forks workers, connections must never be shared between processes
+        if cls._pool is not None and cls._pool_pid == os.getpid():
+            return cls._pool
+
+        with cls._pool_lock:
+            if cls._pool is None or cls._pool_pid != os.getpid():
+                database_url = os.environ.get("DATABASE_URL")
+                if not database_url:
+                    print("DATABASE_URL not set in environment.")
+                    raise DatabaseUnavailable()
+
+                # Parse the DATABASE_URL
+                result = urlparse(database_url)
+                try:
+                    cls._pool = ThreadedConnectionPool(
+                        cls.min_size,
+                        cls.max_size,
+                        database=result.path[1:],  # Trim the leading slash
+                        user=result.username,
+                        password=result.password,
+                        host=result.hostname,
+                        port=result.port,
+                    )
+                except psycopg2.Error as e:
+                    print("Error connecting to the database:", e)
+                    raise DatabaseUnavailable()
+                cls._pool_pid = os.getpid()
+                cls._slots = threading.BoundedSemaphore(cls.max_size)
+        return cls._pool
+
+    @classmethod
+    def _checkout(cls, pool: ThreadedConnectionPool) -> connection_type:
+        with cls._stats_lock:
+            cls._stats["waiting"] += 1
+
+        started_at = time.monotonic()
+        acquired = cls._slots.acquire(timeout=cls.timeout)
+        waited = time.monotonic() - started_at
+
+        with cls._stats_lock:
+            cls._stats["waiting"] -= 1
+            cls._stats["wait_seconds_total"] += waited
+            cls._stats["wait_seconds_max"] = max(cls._stats["wait_seconds_max"], waited)
+            if not acquired:
+                cls._stats["timeouts_total"] += 1
+
+        if not acquired:
+            raise PoolTimeout(cls.timeout)
+
+        try:
+            conn = pool.getconn()
+            if conn.closed:
+                # the server has dropped an idle connection, replace it with a fresh one
+                pool.putconn(conn, close=True)
+                conn = pool.getconn()
+        except psycopg2.Error as e:
+            cls._slots.release()
+            print("Error connecting to the database:", e)
+            raise DatabaseUnavailable()
+
+        with cls._stats_lock:
+            cls._stats["in_use"] += 1
+            cls._stats["checkouts_total"] += 1
+        return conn
+
+    @classmethod
+    def _checkin(cls, pool: ThreadedConnectionPool, conn: connection_type, discard: bool = False):
+        try:
+            pool.putconn(conn, close=discard)
+        finally:
+            cls._slots.release()
+            with cls._stats_lock:
+                cls._stats["in_use"] -= 1
+                if discard:
+                    cls._stats["discarded_total"] += 1
@@ -0,0 +1,16 @@
+from typing import Optional
+
+
+class DatabaseUnavailable(Exception):
+    def __init__(self, message: Optional[str] = None):
+        super().__init__(message or "Could not connect to database")
+
+
+class PoolTimeout(Exception):
+    def __init__(self, timeout: float):
+        super().__init__(f"No database connection became available within {timeout} seconds")
+        self.timeout = timeout
+
+
+def error_response(exception: Exception, message: str = "An error occurred while processing your request") -> dict:
+    return {"error": message, "exception": str(exception)}
@@ -0,0 +1,1013 @@
+"""
+SQL of the Kronos endpoints and the shaping of their results, shared by the Flask app and the ASGI app.
+
+Queries are plain SQL templates with {table}, {rollup} and {column} placeholders for identifiers and %s placeholders
+for parameters. Each app composes them with its own driver: psycopg2 runs the queries of a report one after another
+on a single connection, the ASGI app runs them concurrently on connections from its pool.
+"""
+import csv
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from kronos import rollups
+
+# CSV headers of the WTA transitions report mapped to the database column names
+CSV_HEADER_TO_COLUMN = {
+    "start_time": "starttime",
+    "end_time": "endtime",
+    "source_activity": "sourceactivity",
+    "source_resource": "sourceresource",
+    "destination_activity": "destinationactivity",
+    "destination_resource": "destinationresource",
+    "case_id": "caseid",
+    "wt_total": "wttotal",
+    "wt_contention": "wtcontention",
+    "wt_batching": "wtbatching",
+    "wt_prioritization": "wtprioritization",
+    "wt_unavailability": "wtunavailability",
+    "wt_extraneous": "wtextraneous",
+}
+
+CREATE_RESULT_TABLE = """
+    CREATE TABLE {table} (
+        StartTime TIMESTAMP,
+        EndTime TIMESTAMP,
+        SourceActivity TEXT,
+        SourceResource TEXT,
+        DestinationActivity TEXT,
+        DestinationResource TEXT,
+        CaseID TEXT,
+        WtTotal FLOAT,
+        WtContention FLOAT,
+        WtBatching FLOAT,
+        WtPrioritization FLOAT,
+        WtUnavailability FLOAT,
+        WtExtraneous FLOAT
+    )
+"""
+
+# Indexes created on every result table, they cover the access paths of the read endpoints:
+# per-transition filters, per-resource and per-case grouping, and daily grouping by the start date.
+RESULT_TABLE_INDEXES = [
+    ("transition", "sourceactivity, destinationactivity"),
+    ("resource", "destinationresource"),
+    ("case", "caseid"),
+    ("day", "(DATE(starttime))"),
+]
+
+# Version of the result table for the response cache, the OID changes whenever the table is recreated.
+# The parameter is the quoted table name, NULL is returned if there is no such table.
+TABLE_VERSION = "SELECT to_regclass(%s)::OID"
+
+WT_TYPES = ["batching", "prioritization", "extraneous", "contention", "unavailability"]
+
+
+class InvalidRequest(Exception):
+    pass
+
+
+@dataclass
+class Query:
+    text: str
+    params: Sequence[Any] = ()
+    # rollup of the result table the query reads from, the app builds it if it's missing
+    rollup: Optional[str] = None
+    column: Optional[str] = None
+    fetch_one: bool = False
+
+
+@dataclass
+class Report:
+    """
+    Independent queries of an endpoint and the function shaping their rows into the JSON response.
+    The function gets the row of each fetch_one query and the list of rows of the other ones, keyed by the query name.
+    """
+
+    table_name: str
+    queries: Dict[str, Query]
+    build: Callable[[Dict[str, Any]], Any] = field(repr=False)
+
+
+def sanitize_table_name(name: str) -> str:
+    pattern = re.compile(r"[^a-zA-Z0-9]")
+    return pattern.sub("_", name)
+
+
+def result_table_name(jobid: str) -> str:
+    return f"result_{sanitize_table_name(jobid)}"
+
+
+def index_name(table_name: str, suffix: str) -> str:
+    return f"{table_name}_{suffix}_idx"
+
+
+def csv_columns(csv_header: str) -> List[str]:
+    """
+    Maps the header line of the WTA report to the database column names.
+    """
+    csv_headers = next(csv.reader([csv_header]))
+    unknown_headers = [header for header in csv_headers if header.strip() not in CSV_HEADER_TO_COLUMN]
+    if len(unknown_headers) > 0:
+        raise InvalidRequest(f"Unknown CSV headers: {', '.join(unknown_headers)}")
+    return [CSV_HEADER_TO_COLUMN[header.strip()] for header in csv_headers]
+
+
+def _wt_column(wt_type: str) -> str:
+    if wt_type not in WT_TYPES:
+        raise InvalidRequest("Invalid waiting time type")
+    return "wt" + wt_type
+
+
+def _tuple_or_none(row: Optional[Sequence]) -> Optional[tuple]:
+    return tuple(row) if row is not None else None
+
+
+def _wt_dict(row: Sequence, keys: Sequence[str]) -> dict:
+    return dict(zip(keys, row))
+
+
+_TRANSITION_WT_KEYS = [
+    "source_activity",
+    "target_activity",
+    "total_wt",
+    "contention_wt",
+    "batching_wt",
+    "prioritization_wt",
+    "unavailability_wt",
+    "extraneous_wt",
+]
+
+_ACTIVITY_WT_KEYS = [
+    "activity",
+    "total_wt",
+    "contention_wt",
+    "batching_wt",
+    "prioritization_wt",
+    "unavailability_wt",
+    "extraneous_wt",
+]
+
+_ACTIVITY_RESOURCE_WT_KEYS = [
+    "activity",
+    "resource",
+    "total_wt",
+    "contention_wt",
+    "batching_wt",
+    "prioritization_wt",
+    "unavailability_wt",
+    "extraneous_wt",
+]
+
+_RESOURCE_PAIR_WT_KEYS = [
+    "source_resource",
+    "target_resource",
+    "total_wt",
+    "contention_wt",
+    "batching_wt",
+    "prioritization_wt",
+    "unavailability_wt",
+    "extraneous_wt",
+]
+
+_DAILY_WT_KEYS = [
+    "total_contention_wt",
+    "total_batching_wt",
+    "total_prioritization_wt",
+    "total_unavailability_wt",
+    "total_extraneous_wt",
+]
+
+_ACTIVITY_PAIRS_QUERY = """
+    SELECT DISTINCT
+        sourceactivity,
+        destinationactivity
+    FROM {table}
+    ORDER BY sourceactivity, destinationactivity
+"""
+
+
+def overview(jobid: str) -> Report:
+    def build(results: Dict[str, Any]) -> dict:
+        row = results["overview"]
+        return {
+            "num_cases": row[0],
+            "sums": {
+                "total_contention_wt": row[1],
+                "total_batching_wt": row[2],
+                "total_prioritization_wt": row[3],
+                "total_unavailability_wt": row[4],
+                "total_extraneous_wt": row[5],
+            },
+            "num_activities": row[11],
+            "num_transitions": row[12],
+            "waiting_time": row[13],
+            "processing_time": row[15],
+            "waiting_time_avg": row[14],
+            "processing_time_avg": row[16],
+            "avg": {
+                "avg_contention_wt": row[6],
+                "avg_batching_wt": row[7],
+                "avg_prioritization_wt": row[8],
+                "avg_unavailability_wt": row[9],
+                "avg_extraneous_wt": row[10],
+            },
+        }
+
+    # All the aggregates are computed in a single pass over the table,
+    # activities are counted by a subquery because they come from two columns
+    query = Query(
+        """
+        SELECT
+            COUNT(DISTINCT caseid),
+            SUM(wtcontention),
+            SUM(wtbatching),
+            SUM(wtprioritization),
+            SUM(wtunavailability),
+            SUM(wtextraneous),
+            AVG(wtcontention),
+            AVG(wtbatching),
+            AVG(wtprioritization),
+            AVG(wtunavailability),
+            AVG(wtextraneous),
+            (
+                SELECT COUNT(*) FROM (
+                    SELECT sourceactivity FROM {table}
+                    UNION
+                    SELECT destinationactivity FROM {table}
+                ) AS combined
+            ),
+            COUNT(*),
+            SUM(wttotal),
+            AVG(wttotal),
+            SUM(EXTRACT(EPOCH FROM (endtime - starttime)))::FLOAT,
+            AVG(EXTRACT(EPOCH FROM (endtime - starttime)))::FLOAT
+        FROM {table}
+        """,
+        fetch_one=True,
+    )
+    return Report(result_table_name(jobid), {"overview": query}, build)
+
+
+def wt_overview(jobid: str, wt_type: str) -> Report:
+    column = _wt_column(wt_type)
+
+    def build(results: Dict[str, Any]) -> dict:
+        wt_sum, wt_avg = results["wt"]
+        total_wttotal_sum, total_wttotal_avg = results["total_wt"]
+        return {
+            "wt_sum": wt_sum,
+            "avg_wt": wt_avg,
+            "total_wt_sum": total_wttotal_sum,
+            "avg_total_wt": total_wttotal_avg,
+            "distinct_cases": len(results["cases_with_wt"]),
+            "biggest_source_dest_pair": list(results["biggest_pair_sum"]),
+            "avg_biggest_source_dest_pair": list(results["biggest_pair_avg"]),
+            "biggest_resource": list(results["biggest_resource_sum"]),
+            "avg_biggest_resource": list(results["biggest_resource_avg"]),
+            "cases": results["cases"][0],
+        }
+
+    queries = {
+        # Sum and average of specific wt_type
+        "wt": Query("SELECT SUM({column}), AVG({column}) FROM {table}", column=column, fetch_one=True),
+        # Total wt sum and average
+        "total_wt": Query("SELECT SUM(wttotal), AVG(wttotal) FROM {table}", fetch_one=True),
+        # Unique elements in caseid column
+        "cases": Query("SELECT COUNT(DISTINCT caseid) FROM {table}", fetch_one=True),
+        # Unique caseid where specific wt_type > 0
+        "cases_with_wt": Query("SELECT DISTINCT caseid FROM {table} WHERE {column} > 0", column=column),
+        # The biggest source-destination pair based on SUM
+        "biggest_pair_sum": Query(
+            """
+            SELECT sourceactivity, destinationactivity, SUM({column})
+            FROM {table} GROUP BY sourceactivity, destinationactivity
+            ORDER BY SUM({column}) DESC LIMIT 1
+            """,
+            column=column,
+            fetch_one=True,
+        ),
+        # The biggest source-destination pair based on AVG
+        "biggest_pair_avg": Query(
+            """
+            SELECT sourceactivity, destinationactivity, AVG({column})
+            FROM {table} GROUP BY sourceactivity, destinationactivity
+            ORDER BY AVG({column}) DESC LIMIT 1
+            """,
+            column=column,
+            fetch_one=True,
+        ),
+        # The biggest resource based on SUM
+        "biggest_resource_sum": Query(
+            """
+            SELECT destinationresource, SUM({column})
+            FROM {table} GROUP BY destinationresource
+            ORDER BY SUM({column}) DESC LIMIT 1
+            """,
+            column=column,
+            fetch_one=True,
+        ),
+        # The biggest resource based on AVG
+        "biggest_resource_avg": Query(
+            """
+            SELECT destinationresource, AVG({column})
+            FROM {table} GROUP BY destinationresource
+            ORDER BY AVG({column}) DESC LIMIT 1
+            """,
+            column=column,
+            fetch_one=True,
+        ),
+    }
+    return Report(result_table_name(jobid), queries, build)
+
+
+def wt_overview_activity(jobid: str, wt_type: str, sourceactivity: str, destinationactivity: str) -> Report:
+    column = _wt_column(wt_type)
+    transition = (sourceactivity, destinationactivity)
+
+    def build(results: Dict[str, Any]) -> dict:
+        response_data = {
+            "wt_sum": results["wt_sum"][0],
+            "avg_wt": results["wt_avg"][0],
+            "total_wt_sum": results["total_wt_sum"][0],
+            "avg_total_wt": results["total_wt_avg"][0],
+            "distinct_cases": len(results["cases_with_wt"]),
+            "biggest_source_dest_resource_pair": _tuple_or_none(results["biggest_resource_pair"]),
+            "avg_biggest_source_dest_resource_pair": _tuple_or_none(results["avg_biggest_resource_pair"]),
+            "biggest_resource": _tuple_or_none(results["biggest_resource"]),
+            "avg_biggest_resource": _tuple_or_none(results["avg_biggest_resource"]),
+            "cases": results["cases"][0],
+        }
+        return {key: 0 if value is None else value for key, value in response_data.items()}
+
+    queries = {
+        # Sum of specific wt_type
+        "wt_sum": Query(
+            "SELECT SUM({column}) FROM {table} WHERE sourceactivity = %s AND destinationactivity = %s",
+            transition,
+            column=column,
+            fetch_one=True,
+        ),
+        # Average of specific wt_type
+        "wt_avg": Query(
+            "SELECT AVG({column}) FROM {table} WHERE sourceactivity = %s AND destinationactivity = %s",
+            transition,
+            column=column,
+            fetch_one=True,
+        ),
+        # Total wt
+        "total_wt_sum": Query("SELECT SUM(wttotal) FROM {table}", fetch_one=True),
+        # Average total wt
+        "total_wt_avg": Query("SELECT AVG(wttotal) FROM {table}", fetch_one=True),
+        # Unique elements in caseid column
+        "cases": Query("SELECT COUNT(DISTINCT caseid) FROM {table}", fetch_one=True),
+        # Unique caseid where specific wt_type > 0
+        "cases_with_wt": Query(
+            """
+            SELECT DISTINCT caseid FROM {table} WHERE {column} > 0 AND sourceactivity = %s AND destinationactivity = %s
+            """,
+            transition,
+            column=column,
+        ),
+        # The biggest resource with the specific wt_type
+        "biggest_resource": Query(
+            """
+            SELECT destinationresource, SUM({column})
+            FROM {table} WHERE sourceactivity = %s AND destinationactivity = %s
+            GROUP BY destinationresource
+            ORDER BY SUM({column}) DESC LIMIT 1
+            """,
+            transition,
+            column=column,
+            fetch_one=True,
+        ),
+        # The biggest sourceresource and destinationresource pair with the biggest wt time of our type
+        "biggest_resource_pair": Query(
+            """
+            SELECT sourceresource, destinationresource, SUM({column})
+            FROM {table} WHERE sourceactivity = %s AND destinationactivity = %s
+            GROUP BY sourceresource, destinationresource
+            ORDER BY SUM({column}) DESC LIMIT 1
+            """,
+            transition,
+            column=column,
+            fetch_one=True,
+        ),
+        # The resource with the highest average of the specific wt_type
+        "avg_biggest_resource": Query(
+            """
+            SELECT destinationresource, AVG({column})
+            FROM {table} WHERE sourceactivity = %s AND destinationactivity = %s
+            GROUP BY destinationresource
+            ORDER BY AVG({column}) DESC LIMIT 1
+            """,
+            transition,
+            column=column,
+            fetch_one=True,
+        ),
+        # The sourceresource and destinationresource pair with the highest average wt time of our type
+        "avg_biggest_resource_pair": Query(
+            """
+            SELECT sourceresource, destinationresource, AVG({column})
+            FROM {table} WHERE sourceactivity = %s AND destinationactivity = %s
+            GROUP BY sourceresource, destinationresource
+            ORDER BY AVG({column}) DESC LIMIT 1
+            """,
+            transition,
+            column=column,
+            fetch_one=True,
+        ),
+    }
+    return Report(result_table_name(jobid), queries, build)
+
+
+def potential_cte(jobid: str) -> Report:
+    def build(results: Dict[str, Any]) -> dict:
+        processing_time = results["processing_time"][0]
+        sums = tuple(results["sums"])
+
+        # Calculate percentages
+        total_time = {}
+        keys = ["Contention", "Batching", "Prioritization", "Unavailability", "Extraneous"]
+        for i, key in enumerate(keys):
+            total_time_without_key = sum(sums) - sums[i]
+            percentage = (processing_time / (processing_time + total_time_without_key)) * 100
+            total_time[key] = round(percentage, 1)
+        return total_time
+
+    queries = {
+        "processing_time": Query(
+            "SELECT SUM(EXTRACT(EPOCH FROM (endtime - starttime)))::FLOAT FROM {table}", fetch_one=True
+        ),
+        # The sum of waiting times for each type
+        "sums": Query(
+            """
+            SELECT SUM(wtcontention), SUM(wtbatching), SUM(wtprioritization), SUM(wtunavailability), SUM(wtextraneous)
+            FROM {table}
+            """,
+            fetch_one=True,
+        ),
+    }
+    return Report(result_table_name(jobid), queries, build)
+
+
+def potential_cte_filtered(jobid: str, source_activity: str, destination_activity: str) -> Report:
+    transition = (source_activity, destination_activity)
+
+    def build(results: Dict[str, Any]) -> dict:
+        processing_time = results["processing_time"][0]
+        sums = tuple(results["sums"])
+
+        # Calculate percentages
+        total_time = {}
+        keys = ["Contention", "Batching", "Prioritization", "Unavailability", "Extraneous"]
+        for i, key in enumerate(keys):
+            total_time_without_key = sum(sums) - sums[i]
+            if processing_time + total_time_without_key == 0:
+                percentage = 0.0
+            else:
+                percentage = (processing_time / (processing_time + total_time_without_key)) * 100
+            total_time[key] = round(percentage, 1)
+        return total_time
+
+    queries = {
+        "processing_time": Query(
+            """
+            SELECT COALESCE(SUM(EXTRACT(EPOCH FROM (endtime - starttime)))::FLOAT, 0)
+            FROM {table}
+            WHERE sourceactivity = %s AND destinationactivity = %s
+            """,
+            transition,
+            fetch_one=True,
+        ),
+        # The sum of waiting times for each type
+        "sums": Query(
+            """
+            SELECT
+                COALESCE(SUM(wtcontention), 0),
+                COALESCE(SUM(wtbatching), 0),
+                COALESCE(SUM(wtprioritization), 0),
+                COALESCE(SUM(wtunavailability), 0),
+                COALESCE(SUM(wtextraneous), 0)
+            FROM {table}
+            WHERE sourceactivity = %s AND destinationactivity = %s
+            """,
+            transition,
+            fetch_one=True,
+        ),
+    }
+    return Report(result_table_name(jobid), queries, build)
+
+
+def cte_improvement(jobid: str) -> Report:
+    def build(results: Dict[str, Any]) -> dict:
+        pt_total, wt_total = results["totals"]
+
+        # Calculate the values for each transition
+        data = []
+        for t in results["transitions"]:
+            source, dest, wt, wc, wb, wp, wu, we = t
+            transition_value = pt_total / (pt_total + wt_total - wt)
+            contention_value = pt_total / (pt_total + wt_total - wc)
+            batching_value = pt_total / (pt_total + wt_total - wb)
+            prioritization_value = pt_total / (pt_total + wt_total - wp)
+            unavailability_value = pt_total / (pt_total + wt_total - wu)
+            extraneous_value = pt_total / (pt_total + wt_total - we)
+
+            data.append(
+                {
+                    "source_activity": source,
+                    "target_activity": dest,
+                    "cte_impact_total": transition_value * 100,
+                    "cte_impact": {
+                        "batching_impact": batching_value * 100,
+                        "prioritization_impact": prioritization_value * 100,
+                        "contention_impact": contention_value * 100,
+                        "unavailability_impact": unavailability_value * 100,
+                        "extraneous_impact": extraneous_value * 100,
+                    },
+                    "total_wt": wt,
+                }
+            )
+
+        data.sort(key=lambda x: x["cte_impact_total"], reverse=True)
+        return {"data": data, "total_pt": pt_total, "total_wt": wt_total}
+
+    queries = {
+        "totals": Query(
+            "SELECT SUM(processing_time), SUM(total_wt) FROM {rollup}", rollup=rollups.TRANSITIONS, fetch_one=True
+        ),
+        "transitions": Query(
+            """
+            SELECT
+                sourceactivity,
+                destinationactivity,
+                total_wt,
+                contention_wt,
+                batching_wt,
+                prioritization_wt,
+                unavailability_wt,
+                extraneous_wt
+            FROM {rollup}
+            """,
+            rollup=rollups.TRANSITIONS,
+        ),
+    }
+    return Report(result_table_name(jobid), queries, build)
+
+
+def case_overview(jobid: str, sourceactivity: str, destinationactivity: str) -> Report:
+    transition = (sourceactivity, destinationactivity)
+
+    def build(results: Dict[str, Any]) -> dict:
+        max_pairs = {row[0]: tuple(row)[1:] for row in results["max_pairs"]}
+        row = results["aggregates"]
+        return {
+            "specific_case_count": row[0],
+            "total_case_count": row[1],
+            "specific_wttotal_sum": row[2],
+            "avg_specific_wttotal": row[10],
+            "total_wttotal_sum": row[3],
+            "avg_total_wttotal": row[11],
+            "specific_sums": {
+                "contention_wt": row[4],
+                "batching_wt": row[5],
+                "prioritization_wt": row[6],
+                "unavailability_wt": row[7],
+                "extraneous_wt": row[8],
+            },
+            "specific_avg": {
+                "contention_wt": row[12],
+                "batching_wt": row[13],
+                "prioritization_wt": row[14],
+                "unavailability_wt": row[15],
+                "extraneous_wt": row[16],
+            },
+            "max_wttotal_pair": max_pairs.get("sum"),
+            "processing_time": row[9] if row[9] else 0,
+            "max_wttotal_avg_pair": max_pairs.get("avg"),
+        }
+
+    queries = {
+        # Resource pairs of the transition with the maximum sum and the maximum average of wttotal,
+        # the grouped pairs are computed once and ranked twice
+        "max_pairs": Query(
+            """
+            WITH pairs AS (
+                SELECT sourceresource, destinationresource, SUM(wttotal) AS total_sum, AVG(wttotal) AS avg_value
+                FROM {table} WHERE sourceactivity = %s AND destinationactivity = %s
+                GROUP BY sourceresource, destinationresource
+            )
+            (SELECT 'sum', sourceresource, destinationresource, total_sum FROM pairs ORDER BY total_sum DESC LIMIT 1)
+            UNION ALL
+            (SELECT 'avg', sourceresource, destinationresource, avg_value FROM pairs ORDER BY avg_value DESC LIMIT 1)
+            """,
+            transition,
+        ),
+        # Transition-specific and total aggregates in a single pass over the table
+        "aggregates": Query(
+            """
+            SELECT
+                COUNT(DISTINCT caseid) FILTER (WHERE is_transition),
+                COUNT(DISTINCT caseid),
+                SUM(wttotal) FILTER (WHERE is_transition),
+                SUM(wttotal),
+                SUM(wtcontention) FILTER (WHERE is_transition),
+                SUM(wtbatching) FILTER (WHERE is_transition),
+                SUM(wtprioritization) FILTER (WHERE is_transition),
+                SUM(wtunavailability) FILTER (WHERE is_transition),
+                SUM(wtextraneous) FILTER (WHERE is_transition),
+                EXTRACT(EPOCH FROM SUM(endtime - starttime) FILTER (WHERE is_transition))::FLOAT,
+                AVG(wttotal) FILTER (WHERE is_transition),
+                AVG(wttotal),
+                AVG(wtcontention) FILTER (WHERE is_transition),
+                AVG(wtbatching) FILTER (WHERE is_transition),
+                AVG(wtprioritization) FILTER (WHERE is_transition),
+                AVG(wtunavailability) FILTER (WHERE is_transition),
+                AVG(wtextraneous) FILTER (WHERE is_transition)
+            FROM (
+                SELECT *, (sourceactivity = %s AND destinationactivity = %s) AS is_transition FROM {table}
+            ) AS rows
+            """,
+            transition,
+            fetch_one=True,
+        ),
+    }
+    return Report(result_table_name(jobid), queries, build)
+
+
+def daily_summary(jobid: str) -> Report:
+    def build(results: Dict[str, Any]) -> list:
+        return [
+            {"day": row[0].strftime("%Y-%m-%d"), **_wt_dict(tuple(row)[1:], _DAILY_WT_KEYS)} for row in results["days"]
+        ]
+
+    # Waiting times summed up by day
+    query = Query(
+        """
+        SELECT
+            day,
+            total_contention_wt,
+            total_batching_wt,
+            total_prioritization_wt,
+            total_unavailability_wt,
+            total_extraneous_wt
+        FROM {rollup}
+        ORDER BY day
+        """,
+        rollup=rollups.DAILY,
+    )
+    return Report(result_table_name(jobid), {"days": query}, build)
+
+
+def daily_summary_specific_pair(jobid: str, sourceactivity: str, destinationactivity: str) -> Report:
+    def build(results: Dict[str, Any]) -> list:
+        return [
+            {"day": row[0].strftime("%Y-%m-%d"), **_wt_dict(tuple(row)[1:], _DAILY_WT_KEYS)} for row in results["days"]
+        ]
+
+    # Waiting times summed up by day for the specific sourceactivity and destinationactivity pair
+    query = Query(
+        """
+        SELECT
+            DATE(starttime) as day,
+            SUM(wtcontention) as total_contention_wt,
+            SUM(wtbatching) as total_batching_wt,
+            SUM(wtprioritization) as total_prioritization_wt,
+            SUM(wtunavailability) as total_unavailability_wt,
+            SUM(wtextraneous) as total_extraneous_wt
+        FROM {table}
+        WHERE sourceactivity = %s AND destinationactivity = %s
+        GROUP BY day
+        ORDER BY day
+        """,
+        (sourceactivity, destinationactivity),
+    )
+    return Report(result_table_name(jobid), {"days": query}, build)
+
+
+def all_activity_transitions(jobid: str) -> Report:
+    def build(results: Dict[str, Any]) -> list:
+        return [_wt_dict(row, _TRANSITION_WT_KEYS) for row in results["transitions"]]
+
+    # Waiting times summed up for all combinations of sourceactivity and destinationactivity
+    query = Query(
+        """
+        SELECT
+            sourceactivity,
+            destinationactivity,
+            total_wt,
+            contention_wt,
+            batching_wt,
+            prioritization_wt,
+            unavailability_wt,
+            extraneous_wt
+        FROM {rollup}
+        """,
+        rollup=rollups.TRANSITIONS,
+    )
+    return Report(result_table_name(jobid), {"transitions": query}, build)
+
+
+def activity_wt(jobid: str) -> Report:
+    def build(results: Dict[str, Any]) -> list:
+        return [_wt_dict(row, _ACTIVITY_WT_KEYS) for row in results["activities"]]
+
+    # Waiting times summed up by destinationactivity
+    query = Query(
+        """
+        SELECT
+            destinationactivity,
+            total_wt,
+            contention_wt,
+            batching_wt,
+            prioritization_wt,
+            unavailability_wt,
+            extraneous_wt
+        FROM {rollup}
+        ORDER BY total_wt DESC
+        """,
+        rollup=rollups.ACTIVITIES,
+    )
+    return Report(result_table_name(jobid), {"activities": query}, build)
+
+
+def activity_avg_wt(jobid: str) -> Report:
+    def build(results: Dict[str, Any]) -> list:
+        return [_wt_dict(row, _ACTIVITY_WT_KEYS) for row in results["activities"]]
+
+    # Waiting times averaged by destinationactivity
+    query = Query(
+        """
+        SELECT
+            destinationactivity,
+            avg_total_wt,
+            avg_contention_wt,
+            avg_batching_wt,
+            avg_prioritization_wt,
+            avg_unavailability_wt,
+            avg_extraneous_wt
+        FROM {rollup}
+        ORDER BY avg_total_wt DESC
+        """,
+        rollup=rollups.ACTIVITIES,
+    )
+    return Report(result_table_name(jobid), {"activities": query}, build)
+
+
+def activity_transitions_average(jobid: str) -> Report:
+    def build(results: Dict[str, Any]) -> list:
+        return [_wt_dict(row, _TRANSITION_WT_KEYS) for row in results["transitions"]]
+
+    # Average waiting times for all combinations of sourceactivity and destinationactivity
+    query = Query(
+        """
+        SELECT
+            sourceactivity,
+            destinationactivity,
+            avg_total_wt,
+            avg_contention_wt,
+            avg_batching_wt,
+            avg_prioritization_wt,
+            avg_unavailability_wt,
+            avg_extraneous_wt
+        FROM {rollup}
+        ORDER BY avg_total_wt DESC
+        """,
+        rollup=rollups.TRANSITIONS,
+    )
+    return Report(result_table_name(jobid), {"transitions": query}, build)
+
+
+def activity_transitions_average_case(jobid: str) -> Report:
+    def build(results: Dict[str, Any]) -> list:
+        return [_wt_dict(row, _TRANSITION_WT_KEYS) for row in results["transitions"]]
+
+    # Average waiting times for all combinations of sourceactivity and destinationactivity,
+    # averaged on a per-case basis first
+    query = Query(
+        """
+        SELECT
+            sourceactivity,
+            destinationactivity,
+            case_avg_total_wt,
+            case_avg_contention_wt,
+            case_avg_batching_wt,
+            case_avg_prioritization_wt,
+            case_avg_unavailability_wt,
+            case_avg_extraneous_wt
+        FROM {rollup}
+        ORDER BY case_avg_total_wt DESC
+        """,
+        rollup=rollups.TRANSITIONS,
+    )
+    return Report(result_table_name(jobid), {"transitions": query}, build)
+
+
+def activity_resource_wt(jobid: str) -> Report:
+    def build(results: Dict[str, Any]) -> list:
+        return [_wt_dict(row, _ACTIVITY_RESOURCE_WT_KEYS) for row in results["resources"]]
+
+    # Waiting times summed up by both destinationactivity and destinationresource
+    query = Query(
+        """
+        SELECT
+            destinationactivity,
+            destinationresource,
+            total_wt,
+            contention_wt,
+            batching_wt,
+            prioritization_wt,
+            unavailability_wt,
+            extraneous_wt
+        FROM {rollup}
+        ORDER BY total_wt DESC
+        """,
+        rollup=rollups.RESOURCES,
+    )
+    return Report(result_table_name(jobid), {"resources": query}, build)
+
+
+def activity_transitions_by_resource(jobid: str, sourceactivity: str, destinationactivity: str) -> Report:
+    def build(results: Dict[str, Any]) -> list:
+        return [_wt_dict(row, _RESOURCE_PAIR_WT_KEYS) for row in results["resource_pairs"]]
+
+    # Waiting times summed up for all combinations of sourceresource and targetresource
+    query = Query(
+        """
+        SELECT
+            sourceresource,
+            destinationresource,
+            SUM(wttotal) as total_wt,
+            SUM(wtcontention) as contention_wt,
+            SUM(wtbatching) as batching_wt,
+            SUM(wtprioritization) as prioritization_wt,
+            SUM(wtunavailability) as unavailability_wt,
+            SUM(wtextraneous) as extraneous_wt
+        FROM {table}
+        WHERE sourceactivity = %s AND destinationactivity = %s
+        GROUP BY sourceresource, destinationresource
+        ORDER BY total_wt DESC
+        """,
+        (sourceactivity, destinationactivity),
+    )
+    return Report(result_table_name(jobid), {"resource_pairs": query}, build)
+
+
+def activity_transitions_avg_by_resource(jobid: str, sourceactivity: str, destinationactivity: str) -> Report:
+    def build(results: Dict[str, Any]) -> list:
+        return [_wt_dict(row, _RESOURCE_PAIR_WT_KEYS) for row in results["resource_pairs"]]
+
+    # Average waiting times for all combinations of sourceresource and targetresource
+    query = Query(
+        """
+        SELECT
+            sourceresource,
+            destinationresource,
+            AVG(wttotal) as avg_total_wt,
+            AVG(wtcontention) as avg_contention_wt,
+            AVG(wtbatching) as avg_batching_wt,
+            AVG(wtprioritization) as avg_prioritization_wt,
+            AVG(wtunavailability) as avg_unavailability_wt,
+            AVG(wtextraneous) as avg_extraneous_wt
+        FROM {table}
+        WHERE sourceactivity = %s AND destinationactivity = %s
+        GROUP BY sourceresource, destinationresource
+        ORDER BY avg_total_wt DESC
+        """,
+        (sourceactivity, destinationactivity),
+    )
+    return Report(result_table_name(jobid), {"resource_pairs": query}, build)
+
+
+def specific_activity_transitions(jobid: str, sourceactivity: str, targetactivity: str) -> Report:
+    def build(results: Dict[str, Any]) -> dict:
+        row = results["transition"]
+        if row is None:
+            return {}
+        return _wt_dict(row, _TRANSITION_WT_KEYS)
+
+    # Waiting times summed up for the specific combination of sourceactivity and destinationactivity
+    query = Query(
+        """
+        SELECT
+            sourceactivity,
+            destinationactivity,
+            SUM(wttotal) as total_wt,
+            SUM(wtcontention) as contention_wt,
+            SUM(wtbatching) as batching_wt,
+            SUM(wtprioritization) as prioritization_wt,
+            SUM(wtunavailability) as unavailability_wt,
+            SUM(wtextraneous) as extraneous_wt
+        FROM {table}
+        WHERE sourceactivity = %s AND destinationactivity = %s
+        GROUP BY sourceactivity, destinationactivity
+        """,
+        (sourceactivity, targetactivity),
+        fetch_one=True,
+    )
+    return Report(result_table_name(jobid), {"transition": query}, build)
+
+
+def activity_date_range_global(jobid: str) -> Report:
+    def build(results: Dict[str, Any]) -> dict:
+        earliest_time, latest_time = results["time_range"]
+        return {
+            "activity_pairs": [
+                {"source_activity": row[0], "destination_activity": row[1]} for row in results["activity_pairs"]
+            ],
+            "time_range": {
+                "earliest_time": earliest_time.strftime("%Y-%m-%d %H:%M:%S") if earliest_time else None,
+                "latest_time": latest_time.strftime("%Y-%m-%d %H:%M:%S") if latest_time else None,
+            },
+        }
+
+    queries = {
+        # All combinations of sourceactivity and destinationactivity
+        "activity_pairs": Query(_ACTIVITY_PAIRS_QUERY),
+        # The earliest starttime and latest endtime from the entire table
+        "time_range": Query(
+            """
+            SELECT
+                LEAST(MIN(starttime), MIN(endtime)) as earliest_time,
+                GREATEST(MAX(starttime), MAX(endtime)) as latest_time
+            FROM {table}
+            """,
+            fetch_one=True,
+        ),
+    }
+    return Report(result_table_name(jobid), queries, build)
+
+
+def activity_pairs(jobid: str) -> Report:
+    def build(results: Dict[str, Any]) -> list:
+        return [{"source_activity": row[0], "destination_activity": row[1]} for row in results["activity_pairs"]]
+
+    return Report(result_table_name(jobid), {"activity_pairs": Query(_ACTIVITY_PAIRS_QUERY)}, build)
+
+
+# Reports that can be requested together from the batch endpoint, by the name of their endpoint function
+METRICS: Dict[str, Callable[..., Report]] = {
+    report.__name__: report
+    for report in [
+        overview,
+        wt_overview,
+        wt_overview_activity,
+        potential_cte,
+        potential_cte_filtered,
+        cte_improvement,
+        case_overview,
+        daily_summary,
+        daily_summary_specific_pair,
+        all_activity_transitions,
+        activity_wt,
+        activity_avg_wt,
+        activity_transitions_average,
+        activity_transitions_average_case,
+        activity_resource_wt,
+        activity_transitions_by_resource,
+        activity_transitions_avg_by_resource,
+        specific_activity_transitions,
+        activity_date_range_global,
+        activity_pairs,
+    ]
+}
+
+
+@dataclass
+class Metric:
+    name: str
+    params: Dict[str, str]
+    report: Report
+
+
+def batch_metrics(jobid: str, body: Any) -> List[Metric]:
+    """
+    Parses the body of the batch request, e.g.,
+    {"metrics": [{"name": "overview"}, {"name": "wt_overview", "params": {"wt_type": "batching"}}]}.
+    Params are the arguments of the endpoint except the job ID.
+    """
+    if not isinstance(body, dict) or not isinstance(body.get("metrics"), list):
+        raise InvalidRequest("Expected a JSON object with a list of metrics")
+
+    metrics = []
+    for item in body["metrics"]:
+        if not isinstance(item, dict) or item.get("name") not in METRICS:
+            raise InvalidRequest(f"Unknown metric: {item}")
+        name = item["name"]
+        params = item.get("params") or {}
+        if not isinstance(params, dict) or "jobid" in params:
+            raise InvalidRequest(f"Invalid parameters of metric {name}: {params}")
+        try:
+            report = METRICS[name](jobid, **params)
+        except TypeError:
+            raise InvalidRequest(f"Invalid parameters of metric {name}: {params}")
+        metrics.append(Metric(name, params, report))
+    return metrics
+
+
+def query_key(report: Report, query: Query) -> tuple:
+    """
+    Identifies the query within a batch, reports sharing a query read its rows once.
+    """
+    return report.table_name, query.text, tuple(query.params), query.rollup, query.column
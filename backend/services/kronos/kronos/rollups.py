@@ -0,0 +1,200 @@
+"""
+Summary tables precomputed from a result table right after it's imported.
+
+Result tables are never modified after the import, so the aggregates the dashboard endpoints need can be
+computed once and served from small tables instead of grouping the raw transitions on every page view.
+"""
+from psycopg2 import sql
+from psycopg2.extensions import cursor as cursor_type
+
+# Per-transition rollup: sums, averages and per-case averages of the waiting times,
+# and the processing time, grouped by the activity transition.
+TRANSITIONS = "transitions"
+
+# Per-activity rollup: sums and averages of the waiting times grouped by the destination activity.
+ACTIVITIES = "activities"
+
+# Per-resource rollup: sums of the waiting times grouped by the destination activity and resource.
+RESOURCES = "resources"
+
+# Per-day rollup: sums of the waiting times grouped by the start date.
+DAILY = "daily"
+
+_ROLLUP_QUERIES = {
+    TRANSITIONS: """
+        CREATE TABLE IF NOT EXISTS {rollup} AS
+        WITH totals AS (
+            SELECT
+                sourceactivity,
+                destinationactivity,
+                COUNT(*) AS transitions,
+                SUM(EXTRACT(EPOCH FROM (endtime - starttime)))::FLOAT AS processing_time,
+                SUM(wttotal) AS total_wt,
+                SUM(wtcontention) AS contention_wt,
+                SUM(wtbatching) AS batching_wt,
+                SUM(wtprioritization) AS prioritization_wt,
+                SUM(wtunavailability) AS unavailability_wt,
+                SUM(wtextraneous) AS extraneous_wt,
+                AVG(wttotal) AS avg_total_wt,
+                AVG(wtcontention) AS avg_contention_wt,
+                AVG(wtbatching) AS avg_batching_wt,
+                AVG(wtprioritization) AS avg_prioritization_wt,
+                AVG(wtunavailability) AS avg_unavailability_wt,
+                AVG(wtextraneous) AS avg_extraneous_wt
+            FROM {table}
+            GROUP BY sourceactivity, destinationactivity
+        ),
+        case_avg AS (
+            SELECT
+                sourceactivity,
+                destinationactivity,
+                caseid,
+                AVG(wttotal) AS avg_total_wt_case,
+                AVG(wtcontention) AS avg_contention_wt_case,
+                AVG(wtbatching) AS avg_batching_wt_case,
+                AVG(wtprioritization) AS avg_prioritization_wt_case,
+                AVG(wtunavailability) AS avg_unavailability_wt_case,
+                AVG(wtextraneous) AS avg_extraneous_wt_case
+            FROM {table}
+            GROUP BY sourceactivity, destinationactivity, caseid
+        ),
+        case_totals AS (
+            SELECT
+                sourceactivity,
+                destinationactivity,
+                AVG(avg_total_wt_case) AS case_avg_total_wt,
+                AVG(avg_contention_wt_case) AS case_avg_contention_wt,
+                AVG(avg_batching_wt_case) AS case_avg_batching_wt,
+                AVG(avg_prioritization_wt_case) AS case_avg_prioritization_wt,
+                AVG(avg_unavailability_wt_case) AS case_avg_unavailability_wt,
+                AVG(avg_extraneous_wt_case) AS case_avg_extraneous_wt
+            FROM case_avg
+            GROUP BY sourceactivity, destinationactivity
+        )
+        SELECT
+            totals.*,
+            case_totals.case_avg_total_wt,
+            case_totals.case_avg_contention_wt,
+            case_totals.case_avg_batching_wt,
+            case_totals.case_avg_prioritization_wt,
+            case_totals.case_avg_unavailability_wt,
+            case_totals.case_avg_extraneous_wt
+        FROM totals
+        JOIN case_totals
+            ON case_totals.sourceactivity IS NOT DISTINCT FROM totals.sourceactivity
+            AND case_totals.destinationactivity IS NOT DISTINCT FROM totals.destinationactivity
+    """,
+    ACTIVITIES: """
+        CREATE TABLE IF NOT EXISTS {rollup} AS
+        SELECT
+            destinationactivity,
+            SUM(wttotal) AS total_wt,
+            SUM(wtcontention) AS contention_wt,
+            SUM(wtbatching) AS batching_wt,
+            SUM(wtprioritization) AS prioritization_wt,
+            SUM(wtunavailability) AS unavailability_wt,
+            SUM(wtextraneous) AS extraneous_wt,
+            AVG(wttotal) AS avg_total_wt,
+            AVG(wtcontention) AS avg_contention_wt,
+            AVG(wtbatching) AS avg_batching_wt,
+            AVG(wtprioritization) AS avg_prioritization_wt,
+            AVG(wtunavailability) AS avg_unavailability_wt,
+            AVG(wtextraneous) AS avg_extraneous_wt
+        FROM {table}
+        GROUP BY destinationactivity
+    """,
+    RESOURCES: """
+        CREATE TABLE IF NOT EXISTS {rollup} AS
+        SELECT
+            destinationactivity,
+            destinationresource,
+            SUM(wttotal) AS total_wt,
+            SUM(wtcontention) AS contention_wt,
+            SUM(wtbatching) AS batching_wt,
+            SUM(wtprioritization) AS prioritization_wt,
+            SUM(wtunavailability) AS unavailability_wt,
+            SUM(wtextraneous) AS extraneous_wt
+        FROM {table}
+        GROUP BY destinationactivity, destinationresource
+    """,
+    DAILY: """
+        CREATE TABLE IF NOT EXISTS {rollup} AS
+        SELECT
+            DATE(starttime) AS day,
+            SUM(wttotal) AS total_wt,
+            SUM(wtcontention) AS total_contention_wt,
+            SUM(wtbatching) AS total_batching_wt,
+            SUM(wtprioritization) AS total_prioritization_wt,
+            SUM(wtunavailability) AS total_unavailability_wt,
+            SUM(wtextraneous) AS total_extraneous_wt
+        FROM {table}
+        GROUP BY day
+    """,
+}
+
+
+# All the rollups of a result table
+ROLLUPS = list(_ROLLUP_QUERIES)
+
+# Serializes building a rollup across connections and processes until the end of the transaction.
+# CREATE TABLE IF NOT EXISTS isn't atomic, concurrent builds of the same rollup could fail otherwise.
+LOCK_ROLLUP = "SELECT pg_advisory_xact_lock(hashtext(%s))"
+
+
+def rollup_table_name(table_name: str, rollup: str) -> str:
+    return f"{table_name}_{rollup}"
+
+
+def create_rollups(cur: cursor_type, table_name: str):
+    """
+    Builds all the rollups of the result table, except for the ones built by requests in the meantime.
+    """
+    for rollup in ROLLUPS:
+        cur.execute(LOCK_ROLLUP, (rollup_table_name(table_name, rollup),))
+        _create_rollup(cur, table_name, rollup)
+
+
+def drop_rollups(cur: cursor_type, table_name: str):
+    """
+    Drops all the rollups of the result table, e.g., before the result table is imported again.
+    """
+    for rollup in ROLLUPS:
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(rollup_table_name(table_name, rollup))))
+
+
+def ensure_rollup(cur: cursor_type, table_name: str, rollup: str) -> sql.Identifier:
+    """
+    Returns the identifier of the rollup table and builds the rollup if it's missing,
+    e.g., for result tables imported before the rollups were introduced.
+    """
+    rollup_name = rollup_table_name(table_name, rollup)
+    identifier = sql.Identifier(rollup_name)
+    if _rollup_exists(cur, identifier):
+        return identifier
+
+    # concurrent requests build the rollup once, the others wait for it until the builder's transaction ends
+    cur.execute(LOCK_ROLLUP, (rollup_name,))
+    if not _rollup_exists(cur, identifier):
+        _create_rollup(cur, table_name, rollup)
+    return identifier
+
+
+def rollup_query(rollup: str) -> str:
+    """
+    Returns the SQL template creating the rollup, with {rollup} and {table} placeholders for the identifiers.
+    """
+    return _ROLLUP_QUERIES[rollup]
+
+
+def _rollup_exists(cur: cursor_type, identifier: sql.Identifier) -> bool:
+    cur.execute("SELECT to_regclass(%s)", (identifier.as_string(cur),))
+    return cur.fetchone()[0] is not None
+
+
+def _create_rollup(cur: cursor_type, table_name: str, rollup: str):
+    cur.execute(
+        sql.SQL(rollup_query(rollup)).format(
+            rollup=sql.Identifier(rollup_table_name(table_name, rollup)),
+            table=sql.Identifier(table_name),
+        )
+    )
@@ -0,0 +1,487 @@
+"""
+Responses of the endpoints whose queries have been rewritten, computed with their original queries.
+
+The queries and the building of the responses are copied from the endpoints before they were rewritten into
+single-pass queries and rollups, they're the reference the responses of the rewritten endpoints are compared with.
+"""
+from psycopg2 import sql
+from psycopg2.extensions import cursor as cursor_type
+
+
+def overview(cur: cursor_type, table_name: str) -> dict:
+    cur.execute(sql.SQL("SELECT COUNT(DISTINCT caseid) FROM {}").format(sql.Identifier(table_name)))
+    unique_caseid_count = cur.fetchone()[0]
+
+    cur.execute(
+        sql.SQL(
+            "SELECT SUM(wtcontention), SUM(wtbatching), SUM(wtprioritization), SUM(wtunavailability), "
+            "SUM(wtextraneous) FROM {}"
+        ).format(sql.Identifier(table_name))
+    )
+    sums = cur.fetchone()
+    sum_dict = {
+        "total_contention_wt": sums[0],
+        "total_batching_wt": sums[1],
+        "total_prioritization_wt": sums[2],
+        "total_unavailability_wt": sums[3],
+        "total_extraneous_wt": sums[4],
+    }
+
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT
+                AVG(wtcontention),
+                AVG(wtbatching),
+                AVG(wtprioritization),
+                AVG(wtunavailability),
+                AVG(wtextraneous)
+            FROM {}
+            """
+        ).format(sql.Identifier(table_name))
+    )
+    averages = cur.fetchone()
+    avg_dict = {
+        "avg_contention_wt": averages[0],
+        "avg_batching_wt": averages[1],
+        "avg_prioritization_wt": averages[2],
+        "avg_unavailability_wt": averages[3],
+        "avg_extraneous_wt": averages[4],
+    }
+
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT COUNT(*) FROM (
+                SELECT DISTINCT sourceactivity FROM {}
+                UNION
+                SELECT DISTINCT destinationactivity FROM {}
+            ) AS combined
+            """
+        ).format(sql.Identifier(table_name), sql.Identifier(table_name))
+    )
+    unique_sourceactivity_count = cur.fetchone()[0]
+
+    cur.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(table_name)))
+    total_rows = cur.fetchone()[0]
+
+    cur.execute(sql.SQL("SELECT SUM(wttotal) FROM {}").format(sql.Identifier(table_name)))
+    waiting_time = cur.fetchone()[0]
+
+    cur.execute(sql.SQL("SELECT AVG(wttotal) FROM {}").format(sql.Identifier(table_name)))
+    waiting_time_avg = cur.fetchone()[0]
+
+    cur.execute(
+        sql.SQL("SELECT SUM(EXTRACT(EPOCH FROM (endtime - starttime)))::FLOAT FROM {}").format(
+            sql.Identifier(table_name)
+        )
+    )
+    processing_time = cur.fetchone()[0]
+
+    cur.execute(
+        sql.SQL("SELECT AVG(EXTRACT(EPOCH FROM (endtime - starttime)))::FLOAT FROM {}").format(
+            sql.Identifier(table_name)
+        )
+    )
+    processing_time_avg = cur.fetchone()[0]
+
+    return {
+        "num_cases": unique_caseid_count,
+        "sums": sum_dict,
+        "num_activities": unique_sourceactivity_count,
+        "num_transitions": total_rows,
+        "waiting_time": waiting_time,
+        "processing_time": processing_time,
+        "waiting_time_avg": waiting_time_avg,
+        "processing_time_avg": processing_time_avg,
+        "avg": avg_dict,
+    }
+
+
+def cte_improvement(cur: cursor_type, table_name: str) -> dict:
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT
+                SUM(EXTRACT(EPOCH FROM (endtime - starttime)))::FLOAT,
+                SUM(wttotal)
+            FROM {}
+            """
+        ).format(sql.Identifier(table_name))
+    )
+    pt_total, wt_total = cur.fetchone()
+
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT
+                sourceactivity,
+                destinationactivity,
+                SUM(wttotal),
+                SUM(wtcontention),
+                SUM(wtbatching),
+                SUM(wtprioritization),
+                SUM(wtunavailability),
+                SUM(wtextraneous)
+            FROM {}
+            GROUP BY sourceactivity, destinationactivity
+            """
+        ).format(sql.Identifier(table_name))
+    )
+    transitions = cur.fetchall()
+
+    results = []
+    for source, dest, wt, wc, wb, wp, wu, we in transitions:
+        results.append(
+            {
+                "source_activity": source,
+                "target_activity": dest,
+                "cte_impact_total": pt_total / (pt_total + wt_total - wt) * 100,
+                "cte_impact": {
+                    "batching_impact": pt_total / (pt_total + wt_total - wb) * 100,
+                    "prioritization_impact": pt_total / (pt_total + wt_total - wp) * 100,
+                    "contention_impact": pt_total / (pt_total + wt_total - wc) * 100,
+                    "unavailability_impact": pt_total / (pt_total + wt_total - wu) * 100,
+                    "extraneous_impact": pt_total / (pt_total + wt_total - we) * 100,
+                },
+                "total_wt": wt,
+            }
+        )
+    results.sort(key=lambda x: x["cte_impact_total"], reverse=True)
+
+    return {"data": results, "total_pt": pt_total, "total_wt": wt_total}
+
+
+def case_overview(cur: cursor_type, table_name: str, sourceactivity: str, destinationactivity: str) -> dict:
+    params = (sourceactivity, destinationactivity)
+
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT sourceresource, destinationresource, SUM(wttotal) as total_sum
+            FROM {} WHERE sourceactivity = %s AND destinationactivity = %s
+            GROUP BY sourceresource, destinationresource
+            ORDER BY total_sum DESC
+            LIMIT 1
+            """
+        ).format(sql.Identifier(table_name)),
+        params,
+    )
+    max_wttotal_pair = cur.fetchone()
+
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT sourceresource, destinationresource, AVG(wttotal) as avg_value
+            FROM {} WHERE sourceactivity = %s AND destinationactivity = %s
+            GROUP BY sourceresource, destinationresource
+            ORDER BY avg_value DESC
+            LIMIT 1
+            """
+        ).format(sql.Identifier(table_name)),
+        params,
+    )
+    max_wttotal_avg_pair = cur.fetchone()
+
+    cur.execute(
+        sql.SQL("SELECT COUNT(DISTINCT caseid) FROM {} WHERE sourceactivity = %s AND destinationactivity = %s").format(
+            sql.Identifier(table_name)
+        ),
+        params,
+    )
+    specific_caseid_count = cur.fetchone()[0]
+
+    cur.execute(sql.SQL("SELECT COUNT(DISTINCT caseid) FROM {}").format(sql.Identifier(table_name)))
+    total_caseid_count = cur.fetchone()[0]
+
+    cur.execute(
+        sql.SQL("SELECT SUM(wttotal) FROM {} WHERE sourceactivity = %s AND destinationactivity = %s").format(
+            sql.Identifier(table_name)
+        ),
+        params,
+    )
+    specific_wttotal_sum = cur.fetchone()[0]
+
+    cur.execute(sql.SQL("SELECT SUM(wttotal) FROM {}").format(sql.Identifier(table_name)))
+    total_wttotal_sum = cur.fetchone()[0]
+
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT SUM(wtcontention), SUM(wtbatching), SUM(wtprioritization), SUM(wtunavailability), SUM(wtextraneous)
+            FROM {} WHERE sourceactivity = %s AND destinationactivity = %s
+            """
+        ).format(sql.Identifier(table_name)),
+        params,
+    )
+    specific_sums = cur.fetchone()
+    specific_sum_dict = {
+        "contention_wt": specific_sums[0],
+        "batching_wt": specific_sums[1],
+        "prioritization_wt": specific_sums[2],
+        "unavailability_wt": specific_sums[3],
+        "extraneous_wt": specific_sums[4],
+    }
+
+    cur.execute(
+        sql.SQL(
+            "SELECT SUM(endtime - starttime) FROM {} WHERE sourceactivity = %s AND destinationactivity = %s"
+        ).format(sql.Identifier(table_name)),
+        params,
+    )
+    fetch_result = cur.fetchone()
+    time_diff = fetch_result[0] if fetch_result is not None else None
+    processing_time = time_diff.total_seconds() if time_diff else 0
+
+    cur.execute(
+        sql.SQL("SELECT AVG(wttotal) FROM {} WHERE sourceactivity = %s AND destinationactivity = %s").format(
+            sql.Identifier(table_name)
+        ),
+        params,
+    )
+    avg_specific_wttotal = cur.fetchone()[0]
+
+    cur.execute(sql.SQL("SELECT AVG(wttotal) FROM {}").format(sql.Identifier(table_name)))
+    avg_total_wttotal = cur.fetchone()[0]
+
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT AVG(wtcontention), AVG(wtbatching), AVG(wtprioritization), AVG(wtunavailability), AVG(wtextraneous)
+            FROM {} WHERE sourceactivity = %s AND destinationactivity = %s
+            """
+        ).format(sql.Identifier(table_name)),
+        params,
+    )
+    specific_avg = cur.fetchone()
+    specific_avg_dict = {
+        "contention_wt": specific_avg[0],
+        "batching_wt": specific_avg[1],
+        "prioritization_wt": specific_avg[2],
+        "unavailability_wt": specific_avg[3],
+        "extraneous_wt": specific_avg[4],
+    }
+
+    return {
+        "specific_case_count": specific_caseid_count,
+        "total_case_count": total_caseid_count,
+        "specific_wttotal_sum": specific_wttotal_sum,
+        "avg_specific_wttotal": avg_specific_wttotal,
+        "total_wttotal_sum": total_wttotal_sum,
+        "avg_total_wttotal": avg_total_wttotal,
+        "specific_sums": specific_sum_dict,
+        "specific_avg": specific_avg_dict,
+        "max_wttotal_pair": max_wttotal_pair,
+        "processing_time": processing_time,
+        "max_wttotal_avg_pair": max_wttotal_avg_pair,
+    }
+
+
+def daily_summary(cur: cursor_type, table_name: str) -> list:
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT
+                DATE(starttime) as day,
+                SUM(wtcontention) as total_contention_wt,
+                SUM(wtbatching) as total_batching_wt,
+                SUM(wtprioritization) as total_prioritization_wt,
+                SUM(wtunavailability) as total_unavailability_wt,
+                SUM(wtextraneous) as total_extraneous_wt
+            FROM {}
+            GROUP BY day
+            ORDER BY day
+            """
+        ).format(sql.Identifier(table_name))
+    )
+    return [
+        {
+            "day": row[0].strftime("%Y-%m-%d"),
+            "total_contention_wt": row[1],
+            "total_batching_wt": row[2],
+            "total_prioritization_wt": row[3],
+            "total_unavailability_wt": row[4],
+            "total_extraneous_wt": row[5],
+        }
+        for row in cur.fetchall()
+    ]
+
+
+def all_activity_transitions(cur: cursor_type, table_name: str) -> list:
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT
+                sourceactivity,
+                destinationactivity,
+                SUM(wttotal) as total_wt,
+                SUM(wtcontention) as contention_wt,
+                SUM(wtbatching) as batching_wt,
+                SUM(wtprioritization) as prioritization_wt,
+                SUM(wtunavailability) as unavailability_wt,
+                SUM(wtextraneous) as extraneous_wt
+            FROM {}
+            GROUP BY sourceactivity, destinationactivity
+            """
+        ).format(sql.Identifier(table_name))
+    )
+    return [_transition_wt(row) for row in cur.fetchall()]
+
+
+def activity_wt(cur: cursor_type, table_name: str) -> list:
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT
+                destinationactivity,
+                SUM(wttotal) as total_wt,
+                SUM(wtcontention) as contention_wt,
+                SUM(wtbatching) as batching_wt,
+                SUM(wtprioritization) as prioritization_wt,
+                SUM(wtunavailability) as unavailability_wt,
+                SUM(wtextraneous) as extraneous_wt
+            FROM {}
+            GROUP BY destinationactivity
+            ORDER BY total_wt DESC
+            """
+        ).format(sql.Identifier(table_name))
+    )
+    return [_activity_wt(row) for row in cur.fetchall()]
+
+
+def activity_avg_wt(cur: cursor_type, table_name: str) -> list:
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT
+                destinationactivity,
+                AVG(wttotal) as total_wt,
+                AVG(wtcontention) as contention_wt,
+                AVG(wtbatching) as batching_wt,
+                AVG(wtprioritization) as prioritization_wt,
+                AVG(wtunavailability) as unavailability_wt,
+                AVG(wtextraneous) as extraneous_wt
+            FROM {}
+            GROUP BY destinationactivity
+            ORDER BY total_wt DESC
+            """
+        ).format(sql.Identifier(table_name))
+    )
+    return [_activity_wt(row) for row in cur.fetchall()]
+
+
+def activity_transitions_average(cur: cursor_type, table_name: str) -> list:
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT
+                sourceactivity,
+                destinationactivity,
+                AVG(wttotal) as avg_total_wt,
+                AVG(wtcontention) as avg_contention_wt,
+                AVG(wtbatching) as avg_batching_wt,
+                AVG(wtprioritization) as avg_prioritization_wt,
+                AVG(wtunavailability) as avg_unavailability_wt,
+                AVG(wtextraneous) as avg_extraneous_wt
+            FROM {}
+            GROUP BY sourceactivity, destinationactivity
+            ORDER BY avg_total_wt DESC
+            """
+        ).format(sql.Identifier(table_name))
+    )
+    return [_transition_wt(row) for row in cur.fetchall()]
+
+
+def activity_transitions_average_case(cur: cursor_type, table_name: str) -> list:
+    cur.execute(
+        sql.SQL(
+            """
+            WITH case_avg AS (
+                SELECT
+                    sourceactivity,
+                    destinationactivity,
+                    caseid,
+                    AVG(wttotal) as avg_total_wt_case,
+                    AVG(wtcontention) as avg_contention_wt_case,
+                    AVG(wtbatching) as avg_batching_wt_case,
+                    AVG(wtprioritization) as avg_prioritization_wt_case,
+                    AVG(wtunavailability) as avg_unavailability_wt_case,
+                    AVG(wtextraneous) as avg_extraneous_wt_case
+                FROM {}
+                GROUP BY sourceactivity, destinationactivity, caseid
+            )
+            SELECT
+                sourceactivity,
+                destinationactivity,
+                AVG(avg_total_wt_case) as avg_total_wt,
+                AVG(avg_contention_wt_case) as avg_contention_wt,
+                AVG(avg_batching_wt_case) as avg_batching_wt,
+                AVG(avg_prioritization_wt_case) as avg_prioritization_wt,
+                AVG(avg_unavailability_wt_case) as avg_unavailability_wt,
+                AVG(avg_extraneous_wt_case) as avg_extraneous_wt
+            FROM case_avg
+            GROUP BY sourceactivity, destinationactivity
+            ORDER BY avg_total_wt DESC
+            """
+        ).format(sql.Identifier(table_name))
+    )
+    return [_transition_wt(row) for row in cur.fetchall()]
+
+
+def activity_resource_wt(cur: cursor_type, table_name: str) -> list:
+    cur.execute(
+        sql.SQL(
+            """
+            SELECT
+                destinationactivity,
+                destinationresource,
+                SUM(wttotal) as total_wt,
+                SUM(wtcontention) as contention_wt,
+                SUM(wtbatching) as batching_wt,
+                SUM(wtprioritization) as prioritization_wt,
+                SUM(wtunavailability) as unavailability_wt,
+                SUM(wtextraneous) as extraneous_wt
+            FROM {}
+            GROUP BY destinationactivity, destinationresource
+            ORDER BY total_wt DESC
+            """
+        ).format(sql.Identifier(table_name))
+    )
+    return [
+        {
+            "activity": row[0],
+            "resource": row[1],
+            "total_wt": row[2],
+            "contention_wt": row[3],
+            "batching_wt": row[4],
+            "prioritization_wt": row[5],
+            "unavailability_wt": row[6],
+            "extraneous_wt": row[7],
+        }
+        for row in cur.fetchall()
+    ]
+
+
+def _transition_wt(row: tuple) -> dict:
+    return {
+        "source_activity": row[0],
+        "target_activity": row[1],
+        "total_wt": row[2],
+        "contention_wt": row[3],
+        "batching_wt": row[4],
+        "prioritization_wt": row[5],
+        "unavailability_wt": row[6],
+        "extraneous_wt": row[7],
+    }
+
+
+def _activity_wt(row: tuple) -> dict:
+    return {
+        "activity": row[0],
+        "total_wt": row[1],
+        "contention_wt": row[2],
+        "batching_wt": row[3],
+        "prioritization_wt": row[4],
+        "unavailability_wt": row[5],
+        "extraneous_wt": row[6],
+    }
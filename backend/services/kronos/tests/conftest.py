@@ -0,0 +1,177 @@
+import csv
+import io
+import os
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Iterator, Optional
+
+import psycopg2
+import pytest
+from psycopg2 import sql
+from psycopg2.extensions import cursor as cursor_type
+
+# the apps read the database URL when they open their pools, the tests needing a database are skipped without it
+TEST_DATABASE_URL = os.environ.get("KRONOS_TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+ACTIVITIES = ["Register", "Check", "Approve", "Reject", "Notify", "Archive"]
+RESOURCES = ["Ann", "Bob", "Carl", "Dana", "Eve"]
+CSV_HEADER = [
+    "start_time",
+    "end_time",
+    "source_activity",
+    "source_resource",
+    "destination_activity",
+    "destination_resource",
+    "case_id",
+    "wt_total",
+    "wt_contention",
+    "wt_batching",
+    "wt_prioritization",
+    "wt_unavailability",
+    "wt_extraneous",
+]
+
+
+def make_report_csv(num_cases: int = 40, seed: int = 42) -> bytes:
+    """
+    Makes a waiting time analysis report with random transitions spread over several days.
+    """
+    rng = random.Random(seed)
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    for case in range(num_cases):
+        time = datetime(2023, 10, 2, 8) + timedelta(hours=rng.uniform(0, 24 * 7))
+        source_activity, source_resource = ACTIVITIES[0], rng.choice(RESOURCES)
+        for _ in range(rng.randint(2, 8)):
+            destination_activity, destination_resource = rng.choice(ACTIVITIES[1:]), rng.choice(RESOURCES)
+            # some waiting time types are absent from a transition, as in real reports
+            wts = [rng.uniform(0, 3600) if rng.random() < 0.7 else 0.0 for _ in range(5)]
+            start_time = time + timedelta(seconds=sum(wts))
+            end_time = start_time + timedelta(seconds=rng.uniform(60, 7200))
+            writer.writerow(
+                [
+                    start_time.isoformat(sep=" "),
+                    end_time.isoformat(sep=" "),
+                    source_activity,
+                    source_resource,
+                    destination_activity,
+                    destination_resource,
+                    f"case-{case}",
+                    repr(sum(wts)),
+                    *map(repr, wts),
+                ]
+            )
+            time = end_time
+            source_activity, source_resource = destination_activity, destination_resource
+    return output.getvalue().encode("utf-8")
+
+
+@dataclass
+class Response:
+    status_code: int
+    json: Any
+
+
+class FlaskClient:
+    def __init__(self):
+        from kronos.app import app
+
+        self._client = app.test_client()
+
+    def get(self, path: str) -> Response:
+        response = self._client.get(path)
+        return Response(response.status_code, response.get_json())
+
+    def post(self, path: str, content: Optional[bytes] = None, **kwargs) -> Response:
+        response = self._client.post(path, data=content, **kwargs)
+        return Response(response.status_code, response.get_json())
+
+
+class AsgiClient:
+    def __init__(self, client):
+        self._client = client
+
+    def get(self, path: str) -> Response:
+        response = self._client.get(path)
+        return Response(response.status_code, response.json())
+
+    def post(self, path: str, content: Optional[bytes] = None, **kwargs) -> Response:
+        response = self._client.post(path, content=content, **kwargs)
+        return Response(response.status_code, response.json())
+
+
+@pytest.fixture(scope="session")
+def report_csv() -> bytes:
+    return make_report_csv()
+
+
+@pytest.fixture
+def db_cursor() -> Iterator[cursor_type]:
+    if not TEST_DATABASE_URL:
+        pytest.skip("KRONOS_TEST_DATABASE_URL is not set")
+    conn = psycopg2.connect(TEST_DATABASE_URL)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            yield cur
+    finally:
+        conn.close()
+
+
+@pytest.fixture(params=["flask", "asgi"])
+def client(request, db_cursor: cursor_type) -> Iterator[Any]:
+    if request.param == "flask":
+        yield FlaskClient()
+        return
+
+    from fastapi.testclient import TestClient
+
+    from kronos.asgi import app
+
+    with TestClient(app) as client:
+        yield AsgiClient(client)
+
+
+@pytest.fixture
+def new_jobid(db_cursor: cursor_type) -> Iterator[str]:
+    """
+    Job without a result table, the tables imported for it are dropped after the test.
+    """
+    from kronos import queries, rollups
+
+    jobid = str(uuid.uuid4())
+
+    yield jobid
+
+    table_name = queries.result_table_name(jobid)
+    rollups.drop_rollups(db_cursor, table_name)
+    db_cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table_name)))
+
+
+@pytest.fixture(params=["uploaded", "imported_without_rollups"])
+def jobid(request, client, db_cursor: cursor_type, new_jobid: str, report_csv: bytes) -> str:
+    """
+    Job whose report is imported into a result table. Tables imported before the rollups were introduced have no
+    rollups, the endpoints build them on first access.
+    """
+    from kronos import queries
+
+    if request.param == "uploaded":
+        response = client.post(f"/create_table/{new_jobid}", report_csv)
+        assert response.status_code == 200, response.json
+    else:
+        table_name = queries.result_table_name(new_jobid)
+        header, _, rows = report_csv.decode("utf-8").partition("\n")
+        db_cursor.execute(sql.SQL(queries.CREATE_RESULT_TABLE).format(table=sql.Identifier(table_name)))
+        db_cursor.copy_expert(
+            sql.SQL("COPY {} ({}) FROM STDIN WITH CSV").format(
+                sql.Identifier(table_name), sql.SQL(", ").join(map(sql.Identifier, queries.csv_columns(header)))
+            ),
+            io.StringIO(rows),
+        )
+    return new_jobid
@@ -0,0 +1,50 @@
+import pytest
+
+METRICS = [
+    ("overview", {}, "/overview/{jobid}"),
+    ("wt_overview", {"wt_type": "batching"}, "/wt_overview/{jobid}/batching"),
+    (
+        "case_overview",
+        {"sourceactivity": "Register", "destinationactivity": "Check"},
+        "/case_overview/{jobid}/Register/Check",
+    ),
+    ("activity_wt", {}, "/activity_wt/{jobid}"),
+    ("daily_summary", {}, "/daily_summary/{jobid}"),
+]
+
+
+def test_results_match_the_endpoints(client, jobid: str):
+    response = client.post(
+        f"/batch/{jobid}", json={"metrics": [{"name": name, "params": params} for name, params, _ in METRICS]}
+    )
+
+    assert response.status_code == 200, response.json
+    results = response.json["results"]
+    assert [(result["name"], result["params"], result["status"]) for result in results] == [
+        (name, params, 200) for name, params, _ in METRICS
+    ]
+    for result, (_, _, path) in zip(results, METRICS):
+        assert result["data"] == client.get(path.format(jobid=jobid)).json
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        None,
+        {"metrics": [{"name": "unknown"}]},
+        {"metrics": [{"name": "wt_overview", "params": {"unknown": "batching"}}]},
+        {"metrics": [{"name": "overview", "params": {"jobid": "other"}}]},
+    ],
+)
+def test_rejects_invalid_metrics(client, new_jobid: str, body):
+    response = client.post(f"/batch/{new_jobid}", json=body)
+
+    assert response.status_code == 400
+
+
+def test_failing_metric_does_not_fail_the_batch(client, new_jobid: str):
+    # the job has no table, so every query fails
+    response = client.post(f"/batch/{new_jobid}", json={"metrics": [{"name": "overview"}, {"name": "activity_pairs"}]})
+
+    assert response.status_code == 200, response.json
+    assert [result["status"] for result in response.json["results"]] == [500, 500]
@@ -0,0 +1,119 @@
+import pytest
+from flask import Response
+
+from kronos.cache import CacheBackend, MemoryCacheBackend, ResultCache
+
+
+class Versions:
+    def __init__(self):
+        self.versions = {"job": "1"}
+        self.lookups = 0
+
+    def __call__(self, jobid: str):
+        self.lookups += 1
+        return self.versions.get(jobid)
+
+
+@pytest.fixture
+def versions() -> Versions:
+    return Versions()
+
+
+@pytest.fixture
+def cache(versions: Versions) -> ResultCache:
+    return ResultCache(MemoryCacheBackend(max_entries=10, ttl=60), namespace=lambda jobid: jobid, version=versions)
+
+
+def make_view():
+    calls = []
+
+    def overview(jobid: str):
+        calls.append(jobid)
+        return Response(f'{{"calls": {len(calls)}}}', mimetype="application/json")
+
+    return overview, calls
+
+
+def test_backend_must_implement_all_methods():
+    class IncompleteBackend(CacheBackend):
+        def get(self, namespace, key):
+            return None
+
+    with pytest.raises(TypeError):
+        IncompleteBackend()
+
+
+def test_memory_backend_evicts_least_recently_used_entries():
+    backend = MemoryCacheBackend(max_entries=2, ttl=60)
+    backend.set("job", "a", (b"a", "text/plain"))
+    backend.set("job", "b", (b"b", "text/plain"))
+    backend.get("job", "a")
+
+    backend.set("job", "c", (b"c", "text/plain"))
+
+    assert backend.get("job", "a") is not None
+    assert backend.get("job", "b") is None
+    assert backend.get("job", "c") is not None
+
+
+def test_hits_skip_the_view_and_the_version_lookup(cache: ResultCache, versions: Versions):
+    view, calls = make_view()
+    cached_view = cache.cached(view)
+
+    first = cached_view(jobid="job")
+    second = cached_view(jobid="job")
+
+    assert first.get_data() == second.get_data() == b'{"calls": 1}'
+    assert calls == ["job"]
+    assert versions.lookups == 1
+
+
+def test_recreated_table_misses_once_its_version_expires(versions: Versions):
+    cache = ResultCache(
+        MemoryCacheBackend(max_entries=10, ttl=60), namespace=lambda jobid: jobid, version=versions, version_ttl=0
+    )
+    view, calls = make_view()
+    cached_view = cache.cached(view)
+    cached_view(jobid="job")
+
+    versions.versions["job"] = "2"
+    cached_view(jobid="job")
+
+    assert calls == ["job", "job"]
+
+
+def test_invalidate_drops_responses_and_remembered_version(cache: ResultCache, versions: Versions):
+    view, calls = make_view()
+    cached_view = cache.cached(view)
+    cached_view(jobid="job")
+
+    cache.invalidate("job")
+    cached_view(jobid="job")
+
+    assert calls == ["job", "job"]
+    assert versions.lookups == 2
+
+
+def test_responses_for_missing_tables_are_not_cached(cache: ResultCache, versions: Versions):
+    view, calls = make_view()
+    cached_view = cache.cached(view)
+
+    cached_view(jobid="missing")
+    cached_view(jobid="missing")
+
+    assert calls == ["missing", "missing"]
+    assert versions.lookups == 2
+
+
+def test_error_responses_are_not_cached(cache: ResultCache):
+    calls = []
+
+    def overview(jobid: str):
+        calls.append(jobid)
+        return Response("{}", mimetype="application/json"), 500
+
+    cached_view = cache.cached(overview)
+    cached_view(jobid="job")
+    cached_view(jobid="job")
+
+    assert calls == ["job", "job"]
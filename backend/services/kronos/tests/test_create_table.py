@@ -0,0 +1,93 @@
+import csv
+import gzip
+import io
+
+from psycopg2 import sql
+from psycopg2.extensions import cursor as cursor_type
+
+from kronos import queries, rollups
+
+
+def table_rows(db_cursor: cursor_type, jobid: str) -> list:
+    db_cursor.execute(
+        sql.SQL("SELECT * FROM {} ORDER BY caseid, starttime").format(sql.Identifier(queries.result_table_name(jobid)))
+    )
+    return db_cursor.fetchall()
+
+
+def table_exists(db_cursor: cursor_type, table_name: str) -> bool:
+    db_cursor.execute("SELECT to_regclass(%s)", (table_name,))
+    return db_cursor.fetchone()[0] is not None
+
+
+def reorder_columns(report_csv: bytes) -> bytes:
+    rows = list(csv.reader(io.StringIO(report_csv.decode("utf-8"))))
+    output = io.StringIO()
+    csv.writer(output, lineterminator="\n").writerows([list(reversed(row)) for row in rows])
+    return output.getvalue().encode("utf-8")
+
+
+def test_imports_report_with_indexes_and_rollups(client, db_cursor: cursor_type, new_jobid: str, report_csv: bytes):
+    response = client.post(f"/create_table/{new_jobid}", report_csv)
+
+    table_name = queries.result_table_name(new_jobid)
+    assert response.status_code == 200, response.json
+    assert response.json["table_name"] == table_name
+    assert len(table_rows(db_cursor, new_jobid)) == report_csv.count(b"\n") - 1
+    for suffix, _ in queries.RESULT_TABLE_INDEXES:
+        assert table_exists(db_cursor, queries.index_name(table_name, suffix))
+    for rollup in rollups.ROLLUPS:
+        assert table_exists(db_cursor, rollups.rollup_table_name(table_name, rollup))
+
+
+def test_gzip_and_reordered_reports_import_the_same_rows(
+    client, db_cursor: cursor_type, new_jobid: str, report_csv: bytes
+):
+    assert client.post(f"/create_table/{new_jobid}", report_csv).status_code == 200
+    expected = table_rows(db_cursor, new_jobid)
+
+    response = client.post(
+        f"/create_table/{new_jobid}", gzip.compress(report_csv), headers={"Content-Encoding": "gzip"}
+    )
+    assert response.status_code == 200, response.json
+    assert table_rows(db_cursor, new_jobid) == expected
+
+    response = client.post(f"/create_table/{new_jobid}", reorder_columns(report_csv))
+    assert response.status_code == 200, response.json
+    assert table_rows(db_cursor, new_jobid) == expected
+
+
+def test_upload_replaces_the_table_and_its_responses(client, db_cursor: cursor_type, new_jobid: str, report_csv: bytes):
+    header, _, rows = report_csv.partition(b"\n")
+    assert client.post(f"/create_table/{new_jobid}", report_csv).status_code == 200
+    assert client.get(f"/overview/{new_jobid}").json["num_transitions"] == rows.count(b"\n")
+
+    first_rows = b"\n".join(rows.split(b"\n")[:5]) + b"\n"
+    assert client.post(f"/create_table/{new_jobid}", header + b"\n" + first_rows).status_code == 200
+
+    assert len(table_rows(db_cursor, new_jobid)) == 5
+    assert client.get(f"/overview/{new_jobid}").json["num_transitions"] == 5
+    assert client.get(f"/activity_transitions/{new_jobid}").status_code == 200
+
+
+def test_rejects_unknown_headers(client, db_cursor: cursor_type, new_jobid: str):
+    response = client.post(f"/create_table/{new_jobid}", b"case_id,unknown\n1,2\n")
+
+    assert response.status_code == 400
+    assert not table_exists(db_cursor, queries.result_table_name(new_jobid))
+
+
+def test_rejects_empty_and_invalid_gzip_body(client, db_cursor: cursor_type, new_jobid: str):
+    empty = client.post(f"/create_table/{new_jobid}", b"")
+    invalid_gzip = client.post(f"/create_table/{new_jobid}", b"not gzip", headers={"Content-Encoding": "gzip"})
+
+    assert empty.status_code == 400
+    assert invalid_gzip.status_code == 400
+    assert not table_exists(db_cursor, queries.result_table_name(new_jobid))
+
+
+def test_failed_import_leaves_no_table(client, db_cursor: cursor_type, new_jobid: str, report_csv: bytes):
+    response = client.post(f"/create_table/{new_jobid}", report_csv + b"not a timestamp,,,,,,,,,,,,\n")
+
+    assert response.status_code == 500
+    assert not table_exists(db_cursor, queries.result_table_name(new_jobid))
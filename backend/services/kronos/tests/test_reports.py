@@ -0,0 +1,89 @@
+import json
+from typing import Any
+
+import baseline
+import pytest
+from psycopg2.extensions import cursor as cursor_type
+
+from kronos import queries, rollups
+
+
+def assert_same(actual: Any, expected: Any, path: str = "response"):
+    """
+    Compares JSON values, floats only approximately because the rewritten queries sum in a different order.
+    """
+    if isinstance(expected, float) and isinstance(actual, (int, float)):
+        assert actual == pytest.approx(expected, rel=1e-9, abs=1e-6), path
+    elif isinstance(expected, dict):
+        assert isinstance(actual, dict) and actual.keys() == expected.keys(), path
+        for key in expected:
+            assert_same(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, list):
+        assert isinstance(actual, list) and len(actual) == len(expected), path
+        for i, (actual_item, expected_item) in enumerate(zip(actual, expected)):
+            assert_same(actual_item, expected_item, f"{path}[{i}]")
+    else:
+        assert actual == expected, path
+
+
+def as_json(value: Any) -> Any:
+    return json.loads(json.dumps(value))
+
+
+@pytest.mark.parametrize(
+    "endpoint, original",
+    [
+        ("overview", baseline.overview),
+        ("cte_improvement", baseline.cte_improvement),
+        ("daily_summary", baseline.daily_summary),
+        ("activity_wt", baseline.activity_wt),
+        ("activity_avg_wt", baseline.activity_avg_wt),
+        ("activity_transitions_average", baseline.activity_transitions_average),
+        ("activity_transitions_average_case", baseline.activity_transitions_average_case),
+        ("activity_resource_wt", baseline.activity_resource_wt),
+    ],
+)
+def test_matches_original_queries(client, db_cursor: cursor_type, jobid: str, endpoint: str, original):
+    response = client.get(f"/{endpoint}/{jobid}")
+
+    assert response.status_code == 200, response.json
+    assert_same(response.json, as_json(original(db_cursor, queries.result_table_name(jobid))))
+
+
+def test_activity_transitions_match_original_queries(client, db_cursor: cursor_type, jobid: str):
+    response = client.get(f"/activity_transitions/{jobid}")
+
+    # the original query has no order
+    def key(transition: dict):
+        return transition["source_activity"], transition["target_activity"]
+
+    assert response.status_code == 200, response.json
+    expected = as_json(baseline.all_activity_transitions(db_cursor, queries.result_table_name(jobid)))
+    assert_same(sorted(response.json, key=key), sorted(expected, key=key))
+
+
+@pytest.mark.parametrize(
+    "sourceactivity, destinationactivity", [("Register", "Check"), ("Check", "Approve"), ("Register", "Unknown")]
+)
+def test_case_overview_matches_original_queries(
+    client, db_cursor: cursor_type, jobid: str, sourceactivity: str, destinationactivity: str
+):
+    response = client.get(f"/case_overview/{jobid}/{sourceactivity}/{destinationactivity}")
+
+    assert response.status_code == 200, response.json
+    expected = baseline.case_overview(db_cursor, queries.result_table_name(jobid), sourceactivity, destinationactivity)
+    assert_same(response.json, as_json(expected))
+
+
+def test_rollups_are_built_once(client, db_cursor: cursor_type, jobid: str):
+    rollup_table_name = rollups.rollup_table_name(queries.result_table_name(jobid), rollups.ACTIVITIES)
+
+    assert client.get(f"/activity_wt/{jobid}").status_code == 200
+    db_cursor.execute("SELECT to_regclass(%s)::oid", (rollup_table_name,))
+    oid = db_cursor.fetchone()[0]
+    assert oid is not None
+
+    # the second endpoint reads the rollup built for the first one
+    assert client.get(f"/activity_avg_wt/{jobid}").status_code == 200
+    db_cursor.execute("SELECT to_regclass(%s)::oid", (rollup_table_name,))
+    assert db_cursor.fetchone()[0] == oid
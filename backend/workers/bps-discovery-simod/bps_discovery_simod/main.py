@@ -1,4 +1,3 @@
-import asyncio
 import json
 import logging
 import uuid
@@ -6,6 +5,7 @@ import uuid
 import pix_portal_lib.open_telemetry_utils as open_telemetry_utils
 from kafka import KafkaConsumer
 from pix_portal_lib.service_clients.processing_request import ProcessingRequest
+from pix_portal_lib.worker_runtime import WorkerRuntime
 
 from bps_discovery_simod.settings import settings
 from bps_discovery_simod.simod import SimodService
@@ -36,16 +36,16 @@ logger.info(
 
 simod_service = SimodService()
 
-event_loop = asyncio.new_event_loop()
-asyncio.set_event_loop(event_loop)
+runtime = WorkerRuntime(name="bps-discovery-simod")
 
 # Simod processing can be resource demanding, so we don't want to run several of them processes concurrently.
-# Still, we need to wrap async code in asyncio.run().
-for message in consumer:
-    try:
-        logger.info(f"Kafka consumer {consumer_id} received a message from Kafka: {message}")
-        processing_request_payload = ProcessingRequest(**message.value)
-        event_loop.run_until_complete(simod_service.process(processing_request_payload))
-        logger.info(f"Kafka consumer {consumer_id} finished processing the message: {message}")
-    except Exception as e:
-        logger.exception(f"Kafka consumer {consumer_id} failed to process the message: {message}")
+# Messages are processed one by one on the runtime's event loop, which lives as long as the worker.
+with runtime:
+    for message in consumer:
+        try:
+            logger.info(f"Kafka consumer {consumer_id} received a message from Kafka: {message}")
+            processing_request_payload = ProcessingRequest(**message.value)
+            runtime.run(simod_service.process(processing_request_payload))
+            logger.info(f"Kafka consumer {consumer_id} finished processing the message: {message}")
+        except Exception as e:
+            logger.exception(f"Kafka consumer {consumer_id} failed to process the message: {message}")
@@ -75,10 +75,9 @@ class SimodService:
             )
 
             # download assets
-            assets = [
-                await self._asset_service_client.download_asset(asset_id, self._assets_base_dir, is_internal=True)
-                for asset_id in processing_request.input_assets_ids
-            ]
+            assets = await self._asset_service_client.download_assets(
+                processing_request.input_assets_ids, self._assets_base_dir, is_internal=True
+            )
             for asset in assets:
                 if asset.files is not None:
                     files_to_delete.extend(asset.files)
@@ -149,12 +148,6 @@ class SimodService:
                 logger.info(f"Deleting directory: {dir}")
                 shutil.rmtree(dir, ignore_errors=True)
 
-        # set token to None to force re-authentication, because the token might have expired
-        self._asset_service_client.nullify_token()
-        self._asset_service_client._file_client.nullify_token()
-        self._project_service_client.nullify_token()
-        self._processing_request_service_client.nullify_token()
-
     def update_configuration(self, assets: list[Asset], processing_request: ProcessingRequest):
         """
         Updates the Simod configuration file to include the correct event log path, process model.
@@ -279,7 +272,10 @@ class SimodService:
 
         content = yaml.dump(config)
 
-        config_path.write_bytes(content.encode("utf-8"))
+        # the downloaded file can be shared with the asset cache, so it's replaced instead of modified in place
+        tmp_path = config_path.with_name(f"{config_path.name}.tmp")
+        tmp_path.write_bytes(content.encode("utf-8"))
+        tmp_path.replace(config_path)
 
     @staticmethod
     def _find_simod_results_file_paths(results_dir: Path, event_log_path: Path) -> tuple[Path, Path]:
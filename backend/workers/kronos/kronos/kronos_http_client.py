@@ -1,12 +1,23 @@
+import asyncio
+import logging
+import zlib
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Union
+from typing import AsyncIterator, BinaryIO, Optional, Union
 from urllib.parse import urljoin
 
 import httpx
 
 from kronos.settings import settings
 
+logger = logging.getLogger()
+
+# Status codes returned by the proxy or the service when the upload is worth retrying
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+# Reading the response can take a while for large reports, the service indexes the table before answering
+UPLOAD_TIMEOUT = httpx.Timeout(10.0, read=600.0)
+
 
 @dataclass
 class KronosHTTPResponse:
@@ -24,10 +35,88 @@ class KronosHTTPClient:
         if not self._base_url.endswith("/"):
             self._base_url += "/"
 
+    async def aclose(self):
+        await self._http_client.aclose()
+
     async def create_table(self, processing_request_id: str, wta_report_csv: Union[bytes, str]) -> KronosHTTPResponse:
         url = urljoin(self._base_url, f"create_table/{processing_request_id}")
         response = await self._http_client.post(url, content=wta_report_csv)
+        return self._parse_create_table_response(response)
+
+    async def create_table_from_path(self, processing_request_id: str, wta_report_csv_path: Path) -> KronosHTTPResponse:
+        """
+        Streams the report from disk in chunks, so the report is never loaded into memory as a whole.
+
+        The service imports the report in a single transaction, so a failed upload leaves nothing behind
+        and is retried by streaming the file from the start.
+        """
+        url = urljoin(self._base_url, f"create_table/{processing_request_id}")
+        headers = {"Content-Type": "text/csv"}
+        if settings.kronos_upload_gzip:
+            headers["Content-Encoding"] = "gzip"
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = await self._http_client.post(
+                    url,
+                    content=self._read_chunks(wta_report_csv_path),
+                    headers=headers,
+                    timeout=UPLOAD_TIMEOUT,
+                )
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return self._parse_create_table_response(response)
+                error = f"status_code={response.status_code}, response={response.text}"
+            except httpx.TransportError as e:
+                error = repr(e)
 
+            if attempt > settings.kronos_upload_max_retries:
+                return KronosHTTPResponse(
+                    error=f"Uploading the report to Kronos failed after {attempt} attempts: {error}"
+                )
+
+            delay = settings.kronos_upload_retry_delay * 2 ** (attempt - 1)
+            logger.warning(
+                f"Uploading the report to Kronos failed, retrying in {delay} seconds: "
+                f"processing_request_id={processing_request_id}, attempt={attempt}, error={error}"
+            )
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _read_chunks(path: Path) -> AsyncIterator[bytes]:
+        total_size = path.stat().st_size
+        sent_size = 0
+        next_progress = 10
+        # reading and compressing run in a thread to not block the event loop
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if settings.kronos_upload_gzip else None
+
+        def read_chunk(f: BinaryIO) -> tuple[int, bytes]:
+            chunk = f.read(settings.kronos_upload_chunk_size)
+            size = len(chunk)
+            if chunk and compressor is not None:
+                chunk = compressor.compress(chunk)
+            return size, chunk
+
+        with path.open("rb") as f:
+            while True:
+                size, chunk = await asyncio.to_thread(read_chunk, f)
+                if size == 0:
+                    break
+                sent_size += size
+                if chunk:
+                    yield chunk
+
+                progress = sent_size * 100 // total_size
+                if progress >= next_progress:
+                    logger.info(f"Uploading the report to Kronos: path={path}, progress={progress}%")
+                    next_progress = progress // 10 * 10 + 10
+
+        if compressor is not None:
+            yield compressor.flush()
+
+    @staticmethod
+    def _parse_create_table_response(response: httpx.Response) -> KronosHTTPResponse:
         try:
             if response.status_code == 200:
                 response_data = response.json()
@@ -36,7 +125,3 @@ class KronosHTTPClient:
                 return KronosHTTPResponse(error=response.text)
         except Exception as e:
             return KronosHTTPResponse(error=str(e))
-
-    async def create_table_from_path(self, processing_request_id: str, wta_report_csv_path: Path) -> KronosHTTPResponse:
-        wta_report_csv = wta_report_csv_path.read_bytes()
-        return await self.create_table(processing_request_id, wta_report_csv)
@@ -53,6 +53,9 @@ class KronosService:
         self._assets_base_dir.mkdir(parents=True, exist_ok=True)
         self._kronos_results_base_dir.mkdir(parents=True, exist_ok=True)
 
+    async def aclose(self):
+        await self._kronos_http_client.aclose()
+
     async def process(self, processing_request: ProcessingRequest):
         """
         Downloads the input assets, runs Kronos (WTA), and uploads the output assets
@@ -69,10 +72,9 @@ class KronosService:
             )
 
             # download assets
-            assets = [
-                await self._asset_service_client.download_asset(asset_id, self._assets_base_dir, is_internal=True)
-                for asset_id in processing_request.input_assets_ids
-            ]
+            assets = await self._asset_service_client.download_assets(
+                processing_request.input_assets_ids, self._assets_base_dir, is_internal=True
+            )
             for asset in assets:
                 if asset.files is not None:
                     files_to_delete.extend(asset.files)
@@ -177,12 +179,6 @@ class KronosService:
                 logger.info(f"Deleting directory: path={dir}")
                 shutil.rmtree(dir, ignore_errors=True)
 
-        # set token to None to force re-authentication, because the token might have expired
-        self._asset_service_client.nullify_token()
-        self._asset_service_client._file_client.nullify_token()
-        self._project_service_client.nullify_token()
-        self._processing_request_service_client.nullify_token()
-
     def _extract_input_files(self, assets: list[Asset]) -> tuple[Optional[File_], Optional[File_]]:
         files: list[File_] = []
         for asset in assets:
@@ -20,6 +20,10 @@ class Settings(BaseSettings):
     processing_request_service_url: HttpUrl
     project_service_url: HttpUrl
     kronos_service_url: HttpUrl
+    kronos_upload_chunk_size: int = 1024 * 1024
+    kronos_upload_gzip: bool = True
+    kronos_upload_max_retries: int = 3
+    kronos_upload_retry_delay: float = 1.0
 
     model_config = SettingsConfigDict(env_file=Path(__file__).parent.parent / ".env", extra="allow")
 
@@ -1,5 +1,3 @@
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import json
 import logging
 import uuid
@@ -8,12 +6,10 @@ import signal
 import pix_portal_lib.open_telemetry_utils as open_telemetry_utils
 from kafka import KafkaConsumer
 from pix_portal_lib.service_clients.processing_request import ProcessingRequest
+from pix_portal_lib.worker_runtime import WorkerRuntime
 
 from optimos_worker.optimos_service import OptimosService
 from optimos_worker.settings import settings
-import nest_asyncio
-
-nest_asyncio.apply()
 
 logger = logging.getLogger()
 
@@ -47,8 +43,8 @@ logger.info(
 
 optimos_service = OptimosService()
 
-# Initialize thread pool executor
-executor = ThreadPoolExecutor(max_workers=5)
+# Requests are processed concurrently on the runtime's event loop, the optimizations themselves run in threads
+runtime = WorkerRuntime(name="optimos")
 
 # Dictionary to store task_id and corresponding future
 running_requests = {}
@@ -66,7 +62,7 @@ signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
 
 
-async def process_message(message):
+def process_message(message):
     logger.info(f"Kafka consumer {consumer_id} received a message from Kafka: {message}")
     if message.topic == settings.kafka_topic_cancellations:
         processing_request_id = message.value["processing_request_id"]
@@ -85,7 +81,8 @@ async def process_message(message):
         task_id = request.processing_request_id
         try:
             running_requests[task_id] = request
-            executor.submit(asyncio.run, optimos_service.process(request))
+            future = runtime.submit(optimos_service.process(request))
+            future.add_done_callback(lambda _: running_requests.pop(task_id, None))
 
             logger.info(f"Kafka consumer {consumer_id} finished processing the message: {message}")
         except Exception as e:
@@ -93,14 +90,9 @@ async def process_message(message):
             del running_requests[task_id]
 
 
-async def main():
+with runtime:
     for message in consumer:
         try:
-            if not asyncio.get_event_loop() or asyncio.get_event_loop().is_closed():
-                asyncio.set_event_loop(asyncio.new_event_loop())
-            await process_message(message)
+            process_message(message)
         except Exception as e:
             logger.exception(f"Kafka consumer {consumer_id} failed to process the message: {message}, error: {e}")
-
-
-asyncio.run(main())
@@ -14,6 +14,7 @@ from uuid import UUID
 import tempfile
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import yaml
 from pix_portal_lib.kafka_clients.email_producer import EmailNotificationProducer, EmailNotificationRequest
@@ -67,6 +68,8 @@ class OptimosService:
         self._assets_base_dir.mkdir(parents=True, exist_ok=True)
         self._optimos_results_base_dir.mkdir(parents=True, exist_ok=True)
         self._initial_solution: Optional[SolutionJson] = None
+        # Optimizations are blocking and run in their own threads, so the event loop keeps serving other requests
+        self._optimization_executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix="optimization")
 
     async def process(self, processing_request: ProcessingRequest):
         """
@@ -89,10 +92,9 @@ class OptimosService:
             )
 
             # download assets
-            assets = [
-                await self._asset_service_client.download_asset(asset_id, self._assets_base_dir, is_internal=True)
-                for asset_id in processing_request.input_assets_ids
-            ]
+            assets = await self._asset_service_client.download_assets(
+                processing_request.input_assets_ids, self._assets_base_dir, is_internal=True
+            )
             for asset in assets:
                 if asset.files is not None:
                     files_to_delete.extend(asset.files)
@@ -163,12 +165,6 @@ class OptimosService:
                 logger.info(f"Deleting directory: {dir}")
                 shutil.rmtree(dir, ignore_errors=True)
 
-        # set token to None to force re-authentication, because the token might have expired
-        self._asset_service_client.nullify_token()
-        self._asset_service_client._file_client.nullify_token()
-        self._project_service_client.nullify_token()
-        self._processing_request_service_client.nullify_token()
-
     async def optimization_task(self, processing_request: ProcessingRequest, assets: list[Asset], output_asset_id: str):
         config = self._get_config(assets)
         model_filename = config["model_filename"]
@@ -210,7 +206,9 @@ class OptimosService:
             start_time=datetime.utcnow(),
         )
 
-        output = run_optimization(
+        output = await asyncio.get_running_loop().run_in_executor(
+            self._optimization_executor,
+            run_optimization,
             model_path,
             sim_param_path,
             constraints_path,
@@ -287,7 +285,10 @@ class OptimosService:
 
         content = yaml.dump(config)
 
-        config_path.write_bytes(content.encode("utf-8"))
+        # the downloaded file can be shared with the asset cache, so it's replaced instead of modified in place
+        tmp_path = config_path.with_name(f"{config_path.name}.tmp")
+        tmp_path.write_bytes(content.encode("utf-8"))
+        tmp_path.replace(config_path)
 
     def _get_config(self, assets: list[Asset]):
         files: list[File_] = []
@@ -322,9 +323,11 @@ class OptimosService:
 
     def get_iteration_callback(self, output_asset_id: str):
         print("Iteration callback called (sync)")
-        return lambda iteration_info, approach, iteration: asyncio.run(
-            self.async_iteration_callback(iteration_info, approach, output_asset_id, iteration)
-        )
+        # the callback is called from the optimization thread, the upload runs on the worker's event loop
+        loop = asyncio.get_running_loop()
+        return lambda iteration_info, approach, iteration: asyncio.run_coroutine_threadsafe(
+            self.async_iteration_callback(iteration_info, approach, output_asset_id, iteration), loop
+        ).result()
 
     async def async_iteration_callback(
         self, iteration_info: IterationNextType, approach: str, output_asset_id: str, iteration: int
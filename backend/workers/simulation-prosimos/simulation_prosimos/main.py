@@ -1,4 +1,3 @@
-import asyncio
 import json
 import logging
 import uuid
@@ -6,6 +5,7 @@ import uuid
 import pix_portal_lib.open_telemetry_utils as open_telemetry_utils
 from kafka import KafkaConsumer
 from pix_portal_lib.service_clients.processing_request import ProcessingRequest
+from pix_portal_lib.worker_runtime import WorkerRuntime
 
 from simulation_prosimos.prosimos_service import ProsimosService
 from simulation_prosimos.settings import settings
@@ -36,6 +36,8 @@ logger.info(
 
 prosimos_service = ProsimosService()
 
+runtime = WorkerRuntime(name="prosimos")
+
 
 async def process_message(message):
     logger.info(f"Kafka consumer {consumer_id} received a message from Kafka: {message}")
@@ -47,14 +49,10 @@ async def process_message(message):
         logger.exception(f"Kafka consumer {consumer_id} failed to process the message: {message}, error: {e}")
 
 
-async def main():
+# The event loop lives as long as the worker, so the HTTP connections are reused between messages
+with runtime:
     for message in consumer:
         try:
-            if not asyncio.get_event_loop() or asyncio.get_event_loop().is_closed():
-                asyncio.set_event_loop(asyncio.new_event_loop())
-            await asyncio.create_task(process_message(message))
+            runtime.run(process_message(message))
         except Exception as e:
             logger.exception(f"Kafka consumer {consumer_id} failed to process the message: {message}, error: {e}")
-
-
-asyncio.run(main())
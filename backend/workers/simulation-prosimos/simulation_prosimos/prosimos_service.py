@@ -88,10 +88,9 @@ class ProsimosService:
             )
 
             # download assets
-            assets = [
-                await self._asset_service_client.download_asset(asset_id, self._assets_base_dir, is_internal=True)
-                for asset_id in processing_request.input_assets_ids
-            ]
+            assets = await self._asset_service_client.download_assets(
+                processing_request.input_assets_ids, self._assets_base_dir, is_internal=True
+            )
             for asset in assets:
                 if asset.files is not None:
                     files_to_delete.extend(asset.files)
@@ -193,12 +192,6 @@ class ProsimosService:
                     logger.info(f"Deleting file: {file_path}")
                     file_path.unlink()
 
-        # set token to None to force re-authentication, because the token might have expired
-        self._asset_service_client.nullify_token()
-        self._asset_service_client._file_client.nullify_token()
-        self._project_service_client.nullify_token()
-        self._processing_request_service_client.nullify_token()
-
     def _extract_input_files(self, assets: list[Asset]) -> tuple[Optional[File_], Optional[File_]]:
         files: list[File_] = []
         for asset in assets: